@@ -0,0 +1,157 @@
+"""
+Parsing large csv files in a pool of worker processes.
+The file is split into one chunk per process on line boundaries, every worker parses the bytes of its chunk, and the
+parsed chunks are concatenated. The dtypes of the columns are inferred once from a sample of the file and are shared
+with the workers, so a chunk that, e.g., only contains numbers in a string column is not parsed differently from the
+rest of the file. A quoted value can contain a line break, so a chunk boundary can be inside a value. Every worker
+counts the quote characters of its chunk first, the first chunk with a boundary inside a quoted value has an odd
+number of them, and the file is parsed serially. Small files, compressed files, and the read_csv parameters that
+depend on the position of the rows (nrows, skiprows, index_col, ...) or change the quoting use the serial path, and so
+does a file whose chunks do not match the shared dtypes.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+
+# the read_csv parameters that can be applied to every chunk separately
+CHUNK_PARAMETERS = {'sep', 'delimiter', 'usecols', 'dtype', 'na_values', 'keep_default_na', 'na_filter',
+                    'parse_dates', 'date_format', 'true_values', 'false_values', 'decimal', 'thousands',
+                    'encoding', 'low_memory', 'float_precision'}
+# the encodings in which a line break is a single byte
+ASCII_COMPATIBLE_ENCODINGS = {'utf-8', 'utf8', 'latin-1', 'latin1', 'iso-8859-1', 'ascii', 'cp1252'}
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.zip', '.xz', '.zst', '.tar')
+# the default quotechar of read_csv, the quoting parameters are not among the CHUNK_PARAMETERS
+QUOTE_CHARACTER = b'"'
+
+
+def parse_chunk(loc, start, end, names, params):
+    """
+    parses the bytes [start, end) of the file in a worker process
+    :param names: names of all the columns of the file
+    :return: the parsed chunk (pd.DataFrame) or None if the chunk starts or ends inside a quoted value
+    """
+    with open(loc, 'rb') as d_input:
+        d_input.seek(start)
+        content = d_input.read(end - start)
+    if content.count(QUOTE_CHARACTER) % 2 == 1:
+        return None
+    return pd.read_csv(io.BytesIO(content), header=None, names=names, **params)
+
+
+class ParallelCsvReader(object):
+    def __init__(self, processes, min_size=64 * 1024 * 1024, sample_rows=10000):
+        """
+        :param processes: number of worker processes, the processes are started with the first parallel parse
+        :param min_size: files smaller than this (in bytes) are parsed serially
+        :param sample_rows: number of rows that the dtypes of the columns are inferred from
+        """
+        self.processes = processes
+        self.min_size = min_size
+        self.sample_rows = sample_rows
+        self.executor = None
+        # files can be parsed by the threads of the workload dag at the same time, only one creates the executor
+        self.executor_lock = threading.Lock()
+
+    def is_parallel(self, loc, extra_params):
+        if self.processes < 2 or not isinstance(loc, str) or loc.endswith(COMPRESSED_SUFFIXES):
+            return False
+        if not set(extra_params).issubset(CHUNK_PARAMETERS) or callable(extra_params.get('usecols')):
+            return False
+        if str(extra_params.get('encoding', 'utf-8')).lower() not in ASCII_COMPATIBLE_ENCODINGS:
+            return False
+        return os.path.getsize(loc) >= self.min_size
+
+    def read(self, loc, extra_params):
+        """
+        parses the csv file, in parallel if possible
+        :rtype: pd.DataFrame
+        """
+        if self.is_parallel(loc, extra_params):
+            try:
+                data = self.read_parallel(loc, extra_params)
+            except (ValueError, TypeError, OverflowError):
+                # a chunk does not match the shared dtypes (or is not a valid csv file on its own), the errors of the
+                # file itself are raised by the serial parse
+                data = None
+            if data is not None:
+                return data
+        return pd.read_csv(loc, **extra_params)
+
+    def shared_dtypes(self, loc, extra_params):
+        """
+        infers the dtypes of the columns from the first rows of the file. The string columns are parsed as strings and
+        the float columns as floats by every chunk, the other columns (e.g., integer columns that may contain missing
+        values in other chunks) are inferred by the chunks and unified by the concatenation
+        """
+        if 'dtype' in extra_params and not isinstance(extra_params['dtype'], dict):
+            # one dtype for all the columns
+            return extra_params['dtype']
+        sample = pd.read_csv(loc, nrows=self.sample_rows, **extra_params)
+        dtypes = {}
+        for c in sample.columns:
+            column = sample[c]
+            if column.dtype.kind == 'f' and column.notna().any():
+                dtypes[c] = column.dtype
+            elif column.dtype == object or isinstance(column.dtype, pd.StringDtype):
+                dtypes[c] = column.dtype
+        # the dtypes given by the caller override the inferred ones
+        dtypes.update(extra_params.get('dtype') or {})
+        return dtypes
+
+    def chunk_boundaries(self, loc):
+        """
+        :return: list of (start, end) byte offsets of the chunks, every chunk starts at the beginning of a line, or an
+                 empty list if the header contains a line break
+        """
+        size = os.path.getsize(loc)
+        with open(loc, 'rb') as d_input:
+            if d_input.readline().count(QUOTE_CHARACTER) % 2 == 1:
+                return []
+            data_start = d_input.tell()
+            offsets = [data_start]
+            chunk_size = max(1, (size - data_start) // self.processes)
+            for i in range(1, self.processes):
+                d_input.seek(max(data_start + i * chunk_size, offsets[-1]))
+                d_input.readline()
+                offsets.append(d_input.tell())
+        offsets.append(size)
+        return [(offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1) if offsets[i] < offsets[i + 1]]
+
+    def get_executor(self):
+        with self.executor_lock:
+            if self.executor is None:
+                # the workers are spawned, forking a process that runs the threads of the workload dag is not safe
+                self.executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context('spawn'))
+            return self.executor
+
+    def read_parallel(self, loc, extra_params):
+        """
+        :return: the parsed csv file or None if it has to be parsed serially
+        """
+        boundaries = self.chunk_boundaries(loc)
+        if not boundaries:
+            return None
+        names = list(pd.read_csv(loc, nrows=0, **dict(extra_params, usecols=None)).columns)
+        params = dict(extra_params, dtype=self.shared_dtypes(loc, extra_params))
+        executor = self.get_executor()
+        futures = [executor.submit(parse_chunk, loc, start, end, names, params) for start, end in boundaries]
+        chunks = []
+        # the chunks after the first one with a boundary inside a quoted value are not valid csv files
+        for future in futures:
+            chunk = future.result()
+            if chunk is None:
+                for f in futures:
+                    f.cancel()
+                return None
+            chunks.append(chunk)
+        return pd.concat(chunks, ignore_index=True)
+
+    def shutdown(self):
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
@@ -1,8 +1,20 @@
+import copy
+import hashlib
+import os
 from abc import abstractmethod
+from collections import OrderedDict
 
 import pandas as pd
 
 from experiment_graph.graph.auxilary import Pandas, DataFrame, DataSeries
+from experiment_graph.storage_managers.column_codecs import EncodedColumn, encode_column, decode_column, \
+    encoded_size
+from experiment_graph.storage_managers.column_fingerprints import fingerprint_column
+from experiment_graph.storage_managers.column_files import ColumnFile, EncodedColumnFile, write_column_file, \
+    read_column_file, remove_column_file, write_encoded_column_file, read_encoded_column_file
+from experiment_graph.storage_managers.object_blobs import ObjectBlob, ObjectFile, serialize_object, \
+    deserialize_object, content_hash, write_object_file, read_object_file, read_blob_file, remove_object_file
+from experiment_graph.storage_managers.segment_store import SegmentStore, DiskSegmentStore, pack_blob, unpack_blob
 
 AS_KB = 1024.0
 
@@ -11,7 +23,16 @@ class StorageManager(object):
     """ DataStorage class
         The super class of different Storage Manager classes.
         Responsible for actual storage of the data.
+        Artifacts that are not datasets or features (models, aggregates, ...) are stored as serialized blobs (see
+        object_blobs) using put_object, get_object, and delete_object. Blobs are deduplicated by their content hash.
+        Blobs smaller than SMALL_OBJECT_SIZE (e.g., shapes, scalars, and scores) are packed into the shared segments
+        of the segment store instead of being kept one by one.
+        detached_copy is used for saving the history lazily, the content of the storage manager is written to
+        payload files and the pickled storage manager only contains their location. After loading, every blob (and
+        column) is read from its file the first time it is used.
     """
+    # in KB
+    SMALL_OBJECT_SIZE = 16.0
 
     def __init__(self):
         """
@@ -19,10 +40,35 @@ class StorageManager(object):
         """
         self.key_value = {}
         self.key_value_size = {}
+        # key -> content hash of the blob
+        self.object_keys = {}
+        # content hash -> blob, reference count, and size of the blob
+        self.object_store = {}
+        self.object_count = {}
+        self.object_size = {}
+        # running total of object_size
+        self.objects_size = 0.0
+        self.segment_store = SegmentStore()
+        # folder of the payload files written by detached_copy and key (column or blob hash) -> location of the file
+        self.payload_folder = None
+        self.payload_files = {}
+
+    def get(self, key, columns=None):
+        """
 
-    def get(self, key):
+        :param key:
+        :param columns: list of column hashes, if given, only these columns of the stored dataframe are returned
+        """
         return self.key_value[key]
 
+    @abstractmethod
+    def get_dtypes(self, key):
+        """
+        returns the dtypes of the columns of the dataframe stored under the key without loading the data
+        :param key:
+        """
+        raise Exception('{} class cannot be instantiated'.format(self.__class__.__name__))
+
     @abstractmethod
     def put(self, key, artifact):
         """
@@ -48,6 +94,137 @@ class StorageManager(object):
         """
         raise Exception('{} class cannot be instantiated'.format(self.__class__.__name__))
 
+    def put_object(self, key, obj):
+        if key in self.object_keys:
+            print('warning: key exists, abort put!!!')
+            return
+        blob = serialize_object(obj)
+        blob_hash = content_hash(blob)
+        if blob_hash in self.object_count:
+            self.object_count[blob_hash] += 1
+        else:
+            self.write_object(blob_hash, blob)
+            self.object_count[blob_hash] = 1
+            self.object_size[blob_hash] = blob.size()
+            self.objects_size += self.object_size[blob_hash]
+        self.object_keys[key] = blob_hash
+
+    def get_object(self, key):
+        return self.read_object(self.object_keys[key])
+
+    def delete_object(self, key):
+        blob_hash = self.object_keys.pop(key)
+        if self.object_count[blob_hash] == 1:
+            del self.object_count[blob_hash]
+            self.objects_size -= self.object_size.pop(blob_hash)
+            self.remove_object(blob_hash)
+        else:
+            self.object_count[blob_hash] -= 1
+
+    def write_object(self, blob_hash, blob):
+        if blob.size() < self.SMALL_OBJECT_SIZE:
+            self.segment_store.append(blob_hash, pack_blob(blob))
+        else:
+            self.object_store[blob_hash] = self.write_blob(blob_hash, blob)
+
+    def read_object(self, blob_hash):
+        if blob_hash in self.segment_store:
+            payload, buffers = unpack_blob(self.segment_store.read(blob_hash))
+            return deserialize_object(ObjectBlob(payload, buffers))
+        return self.read_blob(self.object_store[blob_hash])
+
+    def remove_object(self, blob_hash):
+        if blob_hash in self.segment_store:
+            self.segment_store.remove(blob_hash)
+            if self.segment_store.dead_bytes() > self.segment_store.segment_size:
+                self.segment_store.compact()
+        else:
+            self.delete_blob(self.object_store.pop(blob_hash))
+
+    def write_blob(self, blob_hash, blob):
+        """
+        physically stores a large blob. Subclasses override write_blob, read_blob, and delete_blob to change where
+        the blobs are kept
+        :return: what is kept in the object store for the blob
+        """
+        return blob
+
+    def read_blob(self, stored_blob):
+        if isinstance(stored_blob, ObjectFile):
+            # the blob of a lazily loaded history
+            return read_object_file(stored_blob)
+        return deserialize_object(stored_blob)
+
+    def delete_blob(self, stored_blob):
+        pass
+
+    def detached_copy(self, payload_folder):
+        """
+        returns a shallow copy of the storage manager whose large blobs are replaced by the location of their
+        payload files inside payload_folder, used by save_history(lazy=True). Files written by a previous call with
+        the same folder are reused and files of removed blobs are deleted
+        """
+        self.start_payload(payload_folder)
+        detached = copy.copy(self)
+        detached.object_store = self.detach_objects()
+        self.remove_unused_payload(set(detached.object_store))
+        detached.payload_files = dict(self.payload_files)
+        return detached
+
+    def start_payload(self, payload_folder):
+        if not os.path.exists(payload_folder):
+            os.makedirs(payload_folder)
+        if self.payload_folder != payload_folder:
+            self.payload_folder = payload_folder
+            self.payload_files = {}
+
+    def detach_objects(self):
+        object_store = {}
+        for blob_hash, stored_blob in self.object_store.items():
+            if blob_hash not in self.payload_files:
+                if isinstance(stored_blob, ObjectFile):
+                    stored_blob = read_blob_file(stored_blob)
+                self.payload_files[blob_hash] = write_object_file(self.payload_folder, blob_hash, stored_blob)
+            object_store[blob_hash] = self.payload_files[blob_hash]
+        return object_store
+
+    def remove_unused_payload(self, used_keys):
+        for key in [k for k in self.payload_files if k not in used_keys]:
+            for path in self.payload_files.pop(key).paths():
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def objects_total_size(self):
+        """
+        the size of the stored blobs, each blob is counted once
+        """
+        return self.objects_size
+
+    def record_access_frequency(self, key, frequency):
+        """
+        hint from the experiment graph about how often the artifact stored under the key is used (meta_freq).
+        storage managers that do not make placement decisions ignore it
+        :param key:
+        :param frequency:
+        """
+        pass
+
+    def storage_tier(self, key=None):
+        """
+        returns where the artifact stored under the key is kept ('memory' or 'disk'), used by the load cost model
+        :param key: if None, the tier where a new artifact is stored
+        """
+        return 'memory'
+
+    def column_storage_size(self, column_hash, data_series, raw_size):
+        """
+        returns how much storage a column needs inside the storage manager, used by the materializers
+        :param column_hash:
+        :param data_series:
+        :param raw_size: size of the column in memory
+        """
+        return raw_size
+
     @staticmethod
     def invalid_artifact(artifact):
         raise Exception('Invalid artifact type: {}'.format(artifact.__class__.__name__))
@@ -69,32 +246,92 @@ class DedupedStorageManager(StorageManager):
         Deduplication is done using the hash of the columns passes to the save functions.
         Essentially, it is a simple dictionary of column hash and Series.
         This ensures no column are stored more than once
+        When compress is set, every column is encoded (see column_codecs) before it is put in the column store and
+        column_size reports the encoded size.
+        When fingerprint is set, columns with a new hash are also compared by content (see column_fingerprints).
+        A column that is byte-identical to a stored column (e.g., the columns of the left side of a merge, which
+        receive random hashes) becomes an alias of the stored column (the canonical column) instead of being stored
+        again. The reference count and the size of the column are kept under the canonical column.
+        get assembles dataframes from the stored columns without copying them (see assemble_frame). When
+        frame_cache_size is set, the most recently assembled dataframes are cached by their column hashes.
     """
 
-    def __init__(self):
+    def __init__(self, compress=False, stdlib_codec='zlib', fingerprint=False, frame_cache_size=0):
         """
         initialize the column store.
         A key value store that stores every column using the unique key
+        :param compress: encode the columns with the smallest applicable codec
+        :param stdlib_codec: general purpose codec for numeric columns ('zlib' or 'lzma')
+        :param fingerprint: deduplicate the columns by content as well as by hash
+        :param frame_cache_size: number of assembled dataframes to cache
         """
         super(DedupedStorageManager, self).__init__()
         self.column_store = {}
         self.column_count = {}
         self.column_size = {}
+        # running total of column_size
+        self.columns_size = 0.0
+        self.column_dtype = {}
+        self.compress = compress
+        self.stdlib_codec = stdlib_codec
+        # encoded sizes of the columns that are considered by the materializer but are not stored yet
+        self.estimated_size = {}
+        self.fingerprint = fingerprint
+        # fingerprint -> canonical column hash and canonical column hash -> fingerprint
+        self.fingerprints = {}
+        self.column_fingerprint = {}
+        # column hash -> (canonical column hash, name of the column) and canonical column hash -> its aliases
+        self.column_alias = {}
+        self.canonical_aliases = {}
+        self.frame_cache_size = frame_cache_size
+        # tuple of column hashes -> dataframe, ordered from the least recently to the most recently used dataframe
+        self.frame_cache = OrderedDict()
 
     def update_size(self, key, artifact):
         self.key_value_size[key] = artifact.get_size()
         if isinstance(artifact, DataFrame):
             for ch in artifact.get_column_hash():
+                ch = self.resolve(ch)
                 if ch not in self.column_size:
-                    self.column_size[ch] = artifact.column_sizes[ch]
+                    self.column_size[ch] = self.stored_size(ch, artifact.column_sizes[ch])
+                    self.columns_size += self.column_size[ch]
+                    self.estimated_size.pop(ch, None)
 
         elif isinstance(artifact, DataSeries):
-            column_hash = artifact.get_column_hash()
+            column_hash = self.resolve(artifact.get_column_hash())
             if column_hash not in self.column_size:
-                self.column_size[column_hash] = artifact.size
+                self.column_size[column_hash] = self.stored_size(column_hash, artifact.size)
+                self.columns_size += self.column_size[column_hash]
+                self.estimated_size.pop(column_hash, None)
         else:
             self.invalid_artifact(artifact)
 
+    def stored_size(self, column_hash, raw_size):
+        """
+        size of a column inside the column store
+        :param column_hash:
+        :param raw_size: size of the column in memory
+        """
+        if self.compress:
+            return encoded_size(self.column_store[column_hash])
+        return raw_size
+
+    def column_storage_size(self, column_hash, data_series, raw_size):
+        """
+        returns how much storage a column needs inside the column store, used by the materializers
+        :param column_hash:
+        :param data_series:
+        :param raw_size: size of the column in memory
+        """
+        column_hash = self.resolve(column_hash)
+        if column_hash in self.column_size:
+            return self.column_size[column_hash]
+        if self.compress:
+            if column_hash not in self.estimated_size:
+                self.estimated_size[column_hash] = encoded_size(encode_column(data_series, self.stdlib_codec))
+            return self.estimated_size[column_hash]
+        return raw_size
+
     def put(self, key, artifact):
         if key not in self.key_value:
             if isinstance(artifact, DataFrame):
@@ -114,36 +351,185 @@ class DedupedStorageManager(StorageManager):
         else:
             print('warning: key exists, abort put!!!')
 
-    def get(self, key):
+    def get(self, key, columns=None):
         column_hashes = self.key_value[key]
+        if isinstance(column_hashes, list) and columns is not None:
+            missing = set(columns).difference(column_hashes)
+            if missing:
+                raise Exception('Columns {} are not part of {}'.format(list(missing), key))
+            column_hashes = list(columns)
         if isinstance(column_hashes, list):  # dataframe
+            frame_key = tuple(column_hashes)
+            if frame_key in self.frame_cache:
+                self.frame_cache.move_to_end(frame_key)
+                # a shallow copy, adding or removing columns does not change the cached dataframe
+                return self.frame_cache[frame_key].copy(deep=False)
             cache = []
             for i in range(len(column_hashes)):
-                cache.append(self.column_store[column_hashes[i]])
-            return pd.concat(cache, axis=1)
+                cache.append(self.read_aliased_column(column_hashes[i]))
+            frame = self.assemble_frame(cache)
+            if self.frame_cache_size > 0:
+                self.frame_cache[frame_key] = frame
+                while len(self.frame_cache) > self.frame_cache_size:
+                    self.frame_cache.popitem(last=False)
+                return frame.copy(deep=False)
+            return frame
         elif isinstance(column_hashes, str):  # dataseries
-            return pd.Series(self.column_store[column_hashes])
+            return pd.Series(self.read_aliased_column(column_hashes))
+
+    def get_dtypes(self, key):
+        column_hashes = self.key_value[key]
+        if isinstance(column_hashes, str):
+            column_hashes = [column_hashes]
+        return [self.column_dtype[self.resolve(ch)] for ch in column_hashes]
+
+    @staticmethod
+    def assemble_frame(columns):
+        """
+        builds a dataframe from a list of columns. pd.concat copies every column into consolidated blocks, instead,
+        the dataframe is constructed from the columns with copy=False, so every column keeps its own buffer
+        (e.g., a memory-mapped file). Columns with different indices are aligned using pd.concat.
+        :type columns: list[pd.Series]
+        """
+        if len(columns) == 0:
+            return pd.DataFrame()
+        index = columns[0].index
+        for c in columns[1:]:
+            if c.index is not index and not c.index.equals(index):
+                return pd.concat(columns, axis=1)
+        frame = pd.DataFrame({i: c for i, c in enumerate(columns)}, index=index, copy=False)
+        frame.columns = [c.name if c.name is not None else i for i, c in enumerate(columns)]
+        return frame
 
     def delete(self, key):
         column_hashes = self.key_value[key]
         if type(column_hashes) == str:
             column_hashes = [column_hashes]
+        else:
+            self.frame_cache.pop(tuple(column_hashes), None)
         for ch in column_hashes:
+            ch = self.resolve(ch)
             if self.column_count[ch] == 1:
                 del self.column_count[ch]
-                del self.column_store[ch]
-                del self.column_size[ch]
+                self.remove_column(ch)
+                self.columns_size -= self.column_size.pop(ch)
+                del self.column_dtype[ch]
+                self.invalidate_frames(ch)
+                self.remove_fingerprint(ch)
             elif self.column_count[ch] > 1:
                 self.column_count[ch] -= 1
 
         del self.key_value[key]
 
     def store_dataseries(self, column_hash, data_series):
+        column_hash = self.canonical_hash(column_hash, data_series)
         if column_hash in self.column_store.keys():
             self.column_count[column_hash] += 1
         else:
-            self.column_store[column_hash] = data_series
+            self.write_column(column_hash, data_series)
             self.column_count[column_hash] = 1
+            self.column_dtype[column_hash] = data_series.dtype
+
+    def resolve(self, column_hash):
+        """
+        returns the hash under which the column is stored
+        """
+        if column_hash in self.column_alias:
+            return self.column_alias[column_hash][0]
+        return column_hash
+
+    def canonical_hash(self, column_hash, data_series):
+        """
+        returns the hash under which a new column should be stored. If fingerprinting is enabled and a column with
+        the same content is already stored, the new column becomes an alias of the stored column
+        """
+        if not self.fingerprint or column_hash in self.column_store or column_hash in self.column_alias:
+            return self.resolve(column_hash)
+        fingerprint = fingerprint_column(data_series)
+        if fingerprint in self.fingerprints:
+            canonical = self.fingerprints[fingerprint]
+            self.column_alias[column_hash] = (canonical, data_series.name)
+            self.canonical_aliases.setdefault(canonical, []).append(column_hash)
+            return canonical
+        self.fingerprints[fingerprint] = column_hash
+        self.column_fingerprint[column_hash] = fingerprint
+        return column_hash
+
+    def remove_fingerprint(self, column_hash):
+        if column_hash in self.column_fingerprint:
+            del self.fingerprints[self.column_fingerprint.pop(column_hash)]
+            for alias in self.canonical_aliases.pop(column_hash, []):
+                del self.column_alias[alias]
+
+    def invalidate_frames(self, column_hash):
+        """
+        drops the cached dataframes that contain the removed column, either under its own hash or one of its aliases
+        """
+        removed = set(self.canonical_aliases.get(column_hash, []))
+        removed.add(column_hash)
+        for frame_key in [k for k in self.frame_cache if not removed.isdisjoint(k)]:
+            del self.frame_cache[frame_key]
+
+    def read_aliased_column(self, column_hash):
+        if column_hash in self.column_alias:
+            canonical, name = self.column_alias[column_hash]
+            data_series = self.read_column(canonical)
+            return data_series if data_series.name == name else data_series.rename(name)
+        return self.read_column(column_hash)
+
+    def write_column(self, column_hash, data_series):
+        """
+        physically stores a new column. Subclasses override write_column, read_column, and remove_column to change
+        where and how the columns are kept, the reference counting and size accounting stays the same
+        """
+        if self.compress:
+            self.column_store[column_hash] = encode_column(data_series, self.stdlib_codec)
+        else:
+            self.column_store[column_hash] = data_series
+
+    def read_column(self, column_hash):
+        return decode_column(self.stored_column(column_hash))
+
+    def stored_column(self, column_hash):
+        """
+        returns the column as it is kept in the column store. The columns of a lazily loaded history are read from
+        their payload file the first time they are used
+        """
+        stored = self.column_store[column_hash]
+        if isinstance(stored, ColumnFile):
+            stored = self.column_store[column_hash] = read_column_file(stored)
+        elif isinstance(stored, EncodedColumnFile):
+            stored = self.column_store[column_hash] = read_encoded_column_file(stored)
+        return stored
+
+    def remove_column(self, column_hash):
+        del self.column_store[column_hash]
+
+    def detached_copy(self, payload_folder):
+        """
+        the columns are written to payload files as well, every column to its own file
+        """
+        self.start_payload(payload_folder)
+        detached = copy.copy(self)
+        detached.object_store = self.detach_objects()
+        detached.column_store = self.detach_columns()
+        detached.frame_cache = OrderedDict()
+        self.remove_unused_payload(set(detached.object_store).union(detached.column_store))
+        detached.payload_files = dict(self.payload_files)
+        return detached
+
+    def detach_columns(self):
+        column_store = {}
+        for column_hash in self.column_store:
+            if column_hash not in self.payload_files:
+                stored = self.stored_column(column_hash)
+                if isinstance(stored, EncodedColumn):
+                    location = write_encoded_column_file(self.payload_folder, column_hash, stored)
+                else:
+                    location = write_column_file(self.payload_folder, column_hash, stored)
+                self.payload_files[column_hash] = location
+            column_store[column_hash] = self.payload_files[column_hash]
+        return column_store
 
     def store_dataframe(self, column_hashes, dataframe):
         for i in range(len(column_hashes)):
@@ -154,7 +540,7 @@ class DedupedStorageManager(StorageManager):
         this return the compressed size not the total size of the artifacts
         :return:
         """
-        return sum(self.column_size.values())
+        return self.columns_size
 
     def artifacts_total_size(self):
         """
@@ -175,13 +561,203 @@ class DedupedStorageManager(StorageManager):
             column_hashes = artifact.get_column_hash()
             s = 0
             for c in column_hashes:
-                s += self.column_size.get(c, default=0.0)
+                s += self.column_size.get(self.resolve(c), default=0.0)
         elif isinstance(artifact, DataSeries):
-            return self.column_size.get(artifact.get_column_hash(), 0.0)
+            return self.column_size.get(self.resolve(artifact.get_column_hash()), 0.0)
         else:
             self.invalid_artifact(artifact)
 
 
+class DiskDedupedStorageManager(DedupedStorageManager):
+    """ DiskDedupedStorageManager
+        A deduplicated storage manager that keeps every column in its own binary file inside the storage folder.
+        Numeric, boolean, and datetime columns are stored as .npy files and are memory-mapped when they are read, so
+        loading a materialized artifact does not copy the data. Other columns (e.g., strings) are pickled.
+        Blobs of the other artifacts are written to the same folder, the out-of-band buffers of a blob (e.g., the
+        arrays of a model) are memory-mapped when it is loaded. Small blobs are appended to segment files.
+        The column store only contains the location of the column files, therefore, the size of the storage
+        manager in memory (and when pickled by save_history) does not depend on the size of the data.
+    """
+
+    def __init__(self, storage_folder, fingerprint=False):
+        """
+        :param storage_folder: folder for storing the column files, created if it does not exist
+        :param fingerprint: deduplicate the columns by content as well as by hash
+        """
+        super(DiskDedupedStorageManager, self).__init__(compress=False, fingerprint=fingerprint)
+        self.storage_folder = storage_folder
+        if not os.path.exists(storage_folder):
+            os.makedirs(storage_folder)
+        self.segment_store = DiskSegmentStore(storage_folder)
+
+    def write_column(self, column_hash, data_series):
+        self.column_store[column_hash] = write_column_file(self.storage_folder, column_hash, data_series)
+
+    def read_column(self, column_hash):
+        return read_column_file(self.column_store[column_hash])
+
+    def remove_column(self, column_hash):
+        remove_column_file(self.column_store[column_hash])
+        del self.column_store[column_hash]
+
+    def write_blob(self, blob_hash, blob):
+        return write_object_file(self.storage_folder, blob_hash, blob)
+
+    def read_blob(self, stored_blob):
+        return read_object_file(stored_blob)
+
+    def delete_blob(self, stored_blob):
+        remove_object_file(stored_blob)
+
+    def detached_copy(self, payload_folder):
+        # the storage manager only keeps the location of the files inside the storage folder
+        return self
+
+    def storage_tier(self, key=None):
+        return 'disk'
+
+
+class TieredStorageManager(DiskDedupedStorageManager):
+    """ TieredStorageManager
+        A deduplicated storage manager with a bounded in-memory tier in front of the disk tier.
+        New columns are kept in memory. When the memory tier exceeds the memory budget, the coldest columns are
+        demoted to disk (they are written to disk at that point). Reading a column from the disk tier promotes it
+        back into the memory tier.
+        The coldest column is selected using either LRU (least recently accessed) or LFU (least frequently
+        accessed, where the frequency of a column is incremented every time it is read and raised to the meta_freq of
+        the artifacts it belongs to, i.e., it is the maximum of the two).
+        tier_stats holds the number of hits and misses of every tier, which can be used to size the memory tier.
+    """
+    LRU = 'lru'
+    LFU = 'lfu'
+
+    def __init__(self, storage_folder, memory_budget, eviction_policy=LRU, fingerprint=False):
+        """
+        :param storage_folder: folder for the disk tier
+        :param memory_budget: size of the memory tier in KB (same unit as the artifact sizes)
+        :param eviction_policy: 'lru' or 'lfu'
+        :param fingerprint: deduplicate the columns by content as well as by hash
+        """
+        super(TieredStorageManager, self).__init__(storage_folder, fingerprint=fingerprint)
+        if eviction_policy not in [TieredStorageManager.LRU, TieredStorageManager.LFU]:
+            raise Exception('Unknown eviction policy: {}'.format(eviction_policy))
+        self.memory_budget = memory_budget
+        self.eviction_policy = eviction_policy
+        # column hash -> Series, ordered from the least recently to the most recently used column
+        self.memory_tier = OrderedDict()
+        self.memory_tier_size = 0.0
+        self.column_freq = {}
+        self.tier_stats = {'memory': {'hit': 0, 'miss': 0}, 'disk': {'hit': 0, 'miss': 0}}
+
+    def put(self, key, artifact):
+        super(TieredStorageManager, self).put(key, artifact)
+        self.enforce_memory_budget()
+
+    def write_column(self, column_hash, data_series):
+        # the column is only written to disk once it is demoted from the memory tier
+        self.column_store[column_hash] = None
+        self.memory_tier[column_hash] = data_series
+        self.column_freq[column_hash] = 0
+
+    def read_column(self, column_hash):
+        self.column_freq[column_hash] = self.column_freq.get(column_hash, 0) + 1
+        if column_hash in self.memory_tier:
+            self.tier_stats['memory']['hit'] += 1
+            self.memory_tier.move_to_end(column_hash)
+            return self.memory_tier[column_hash]
+
+        self.tier_stats['memory']['miss'] += 1
+        column_file = self.column_store.get(column_hash)
+        if column_file is None:
+            self.tier_stats['disk']['miss'] += 1
+            raise KeyError(column_hash)
+        self.tier_stats['disk']['hit'] += 1
+        data_series = read_column_file(column_file)
+        self.promote(column_hash, data_series)
+        return data_series
+
+    def remove_column(self, column_hash):
+        if column_hash in self.memory_tier:
+            del self.memory_tier[column_hash]
+            self.memory_tier_size -= self.column_size.get(column_hash, 0.0)
+        if self.column_store[column_hash] is not None:
+            remove_column_file(self.column_store[column_hash])
+        del self.column_store[column_hash]
+        del self.column_freq[column_hash]
+
+    def detached_copy(self, payload_folder):
+        """
+        the columns that are only kept in the memory tier are written to the disk tier first. The copy refers to the
+        files of the disk tier, starts with an empty memory tier, and has its own bookkeeping, so it does not change
+        when this storage manager does
+        """
+        for column_hash, data_series in self.memory_tier.items():
+            if self.column_store[column_hash] is None:
+                self.column_store[column_hash] = write_column_file(self.storage_folder, column_hash, data_series)
+        detached = copy.copy(self)
+        # the bookkeeping only holds hashes and file locations, the loaded segments are not copied either (see
+        # DiskSegmentStore.__getstate__)
+        for name, value in vars(self).items():
+            if name not in ['memory_tier', 'frame_cache']:
+                setattr(detached, name, copy.deepcopy(value))
+        detached.memory_tier = OrderedDict()
+        detached.memory_tier_size = 0.0
+        detached.frame_cache = OrderedDict()
+        return detached
+
+    def update_size(self, key, artifact):
+        new_columns = [ch for ch in self.memory_tier if ch not in self.column_size]
+        super(TieredStorageManager, self).update_size(key, artifact)
+        for ch in new_columns:
+            self.memory_tier_size += self.column_size.get(ch, 0.0)
+
+    def record_access_frequency(self, key, frequency):
+        column_hashes = self.key_value[key]
+        if isinstance(column_hashes, str):
+            column_hashes = [column_hashes]
+        for ch in column_hashes:
+            ch = self.resolve(ch)
+            self.column_freq[ch] = max(self.column_freq[ch], frequency)
+
+    def promote(self, column_hash, data_series):
+        # the file on disk is kept, so demoting the column again does not require a write
+        self.memory_tier[column_hash] = data_series
+        self.memory_tier_size += self.column_size.get(column_hash, 0.0)
+        self.enforce_memory_budget()
+
+    def demote(self, column_hash):
+        data_series = self.memory_tier.pop(column_hash)
+        self.memory_tier_size -= self.column_size.get(column_hash, 0.0)
+        if self.column_store[column_hash] is None:
+            self.column_store[column_hash] = write_column_file(self.storage_folder, column_hash, data_series)
+
+    def select_victim(self):
+        if self.eviction_policy == TieredStorageManager.LRU:
+            return next(iter(self.memory_tier))
+        else:
+            # min returns the first of the equally frequent columns, i.e., the least recently used one
+            return min(self.memory_tier, key=lambda ch: self.column_freq[ch])
+
+    def enforce_memory_budget(self):
+        while self.memory_tier and self.memory_tier_size > self.memory_budget:
+            self.demote(self.select_victim())
+
+    def in_memory(self, column_hash):
+        return column_hash in self.memory_tier
+
+    def storage_tier(self, key=None):
+        if key is None:
+            # new columns are kept in the memory tier
+            return 'memory'
+        if key not in self.key_value:
+            # blobs are always written to disk
+            return 'disk'
+        column_hashes = self.key_value[key]
+        if isinstance(column_hashes, str):
+            column_hashes = [column_hashes]
+        return 'memory' if all(self.in_memory(self.resolve(ch)) for ch in column_hashes) else 'disk'
+
+
 class SimpleStorageManager(StorageManager):
     """
         Naively store every column or dataset under the given hash
@@ -191,6 +767,9 @@ class SimpleStorageManager(StorageManager):
 
     def __init__(self):
         super(SimpleStorageManager, self).__init__()
+        self.key_column_hashes = {}
+        # running total of key_value_size
+        self.artifacts_size = 0.0
 
     def put(self, key, artifact):
         self.is_supported(artifact)
@@ -198,22 +777,78 @@ class SimpleStorageManager(StorageManager):
             data = artifact.get_data()
             self.key_value[key] = data
             self.key_value_size[key] = artifact.get_size()
+            self.artifacts_size += self.key_value_size[key]
+            self.key_column_hashes[key] = artifact.get_column_hash()
         else:
             print('warning: key exists, abort put!!!')
 
+    def get(self, key, columns=None):
+        data = self.loaded_artifact(key)
+        if columns is None or isinstance(data, pd.Series):
+            return data
+        column_hashes = self.key_column_hashes[key]
+        missing = set(columns).difference(column_hashes)
+        if missing:
+            raise Exception('Columns {} are not part of {}'.format(list(missing), key))
+        return data.iloc[:, [column_hashes.index(ch) for ch in columns]]
+
+    def get_dtypes(self, key):
+        data = self.loaded_artifact(key)
+        if isinstance(data, pd.Series):
+            return [data.dtype]
+        return data.dtypes.tolist()
+
+    def loaded_artifact(self, key):
+        data = self.key_value[key]
+        if isinstance(data, ObjectFile):
+            # the artifact of a lazily loaded history
+            data = read_object_file(data)
+            self.key_value[key] = data
+        return data
+
     def delete(self, key):
         del self.key_value[key]
-        del self.key_value_size[key]
+        self.artifacts_size -= self.key_value_size.pop(key)
+        del self.key_column_hashes[key]
 
     def total_size(self):
-        return sum(self.key_value_size.values())
+        return self.artifacts_size
+
+    def detached_copy(self, payload_folder):
+        """
+        every stored dataframe and series is written to its own payload file as well
+        """
+        self.start_payload(payload_folder)
+        detached = copy.copy(self)
+        detached.object_store = self.detach_objects()
+        detached.key_value = self.detach_artifacts()
+        used_keys = set(detached.object_store).union([self.payload_key(key) for key in detached.key_value])
+        self.remove_unused_payload(used_keys)
+        detached.payload_files = dict(self.payload_files)
+        return detached
+
+    def detach_artifacts(self):
+        key_value = {}
+        for key in self.key_value:
+            payload_key = self.payload_key(key)
+            if payload_key not in self.payload_files:
+                blob = serialize_object(self.loaded_artifact(key))
+                self.payload_files[payload_key] = write_object_file(self.payload_folder, payload_key, blob)
+            key_value[key] = self.payload_files[payload_key]
+        return key_value
+
+    @staticmethod
+    def payload_key(key):
+        # the keys are vertex ids, which are not valid file names
+        return 'artifact-' + hashlib.md5(key.encode('utf-8')).hexdigest()
 
 
 class StorageManagerFactory:
     def __init__(self):
         pass
 
-    valid_storage_types = {'simple': SimpleStorageManager(), 'dedup': DedupedStorageManager()}
+    valid_storage_types = {'simple': SimpleStorageManager(), 'dedup': DedupedStorageManager(),
+                           'dedup_fingerprint': DedupedStorageManager(fingerprint=True)}
 
     @staticmethod
     def get_storage(storage_type):
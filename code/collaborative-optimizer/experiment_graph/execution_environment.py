@@ -1,8 +1,14 @@
 import os
 import pickle
+import threading
 
 from experiment_graph.data_storage import SimpleStorageManager
+from experiment_graph.graph.compact_graph import CompactGraph
 from experiment_graph.graph.graph_representations import WorkloadDag, ExperimentGraph
+from experiment_graph.graph.history_log import log_path, append_records, read_records, truncate_log, remove_log
+from experiment_graph.csv_ingestion import ParallelCsvReader
+from experiment_graph.model_training import ModelTrainingPool
+from experiment_graph.storage_managers.parse_cache import ParseCache
 # Reserved word for representing super graph.
 # Do not use combine as an operation name
 from experiment_graph.graph.node import *
@@ -18,11 +24,35 @@ class ExecutionEnvironment(object):
         return loc[loc.rfind('/') + 1:] + str(extra_params)
 
     def __init__(self, data_storage=SimpleStorageManager(), scheduler_type=HashBasedCollaborativeScheduler.NAME,
-                 reuse_type=LinearTimeReuse.NAME):
+                 reuse_type=LinearTimeReuse.NAME, workers=1, training_processes=0, lazy_roots=False,
+                 parse_cache_folder=None, parse_processes=0, release_intermediates=False):
+        """
+        :param workers: number of threads that execute the independent operations of a workload in parallel (see
+                        WorkloadDag.execute_in_parallel), used by the workload dags that are created afterwards
+        :param training_processes: if positive, the models are fitted in a pool of worker processes with this many
+                                   processes (see model_training), otherwise they are fitted inline
+        :param lazy_roots: if True, the new roots are created from the header of the csv file and only the columns
+                           that the executed operations use are parsed (see load and load_root_columns)
+        :param parse_cache_folder: if given, the parsed csv files of the roots are cached in this folder (see
+                                   parse_cache) and the next loads of unchanged files read them from the cache
+        :param parse_processes: if larger than one, the large csv files are parsed in a pool of worker processes with
+                                this many processes (see csv_ingestion), otherwise they are parsed serially
+        :param release_intermediates: release the intermediate results of the chains of row preserving operations as
+                                      soon as they are used (see WorkloadDag.releasable_vertices), used by the workload
+                                      dags that are created afterwards
+        """
         self.scheduler = CollaborativeScheduler.get_scheduler(scheduler_type, reuse_type)
-        self.workload_dag = WorkloadDag()
+        self.workers = workers
+        self.release_intermediates = release_intermediates
+        self.training_pool = ModelTrainingPool(training_processes) if training_processes > 0 else None
+        self.lazy_roots = lazy_roots
+        self.parse_cache = ParseCache(parse_cache_folder) if parse_cache_folder is not None else None
+        self.csv_reader = ParallelCsvReader(parse_processes) if parse_processes > 1 else None
+        self.workload_dag = self.create_workload_dag()
         self.experiment_graph = ExperimentGraph(data_storage=data_storage)
         self.time_manager = dict()
+        # the threads of the workload dag (see WorkloadDag.execute_in_parallel) update the times at the same time
+        self.time_lock = threading.Lock()
 
     def get_benchmark_results(self, keys=None):
         if BenchmarkMetrics.TOTAL_EXECUTION not in self.time_manager:
@@ -35,10 +65,11 @@ class ExecutionEnvironment(object):
             return ','.join([self.time_manager[key] for key in keys])
 
     def update_time(self, oper_type, seconds):
-        if oper_type in self.time_manager:
-            self.time_manager[oper_type] = self.time_manager[oper_type] + seconds
-        else:
-            self.time_manager[oper_type] = seconds
+        with self.time_lock:
+            if oper_type in self.time_manager:
+                self.time_manager[oper_type] = self.time_manager[oper_type] + seconds
+            else:
+                self.time_manager[oper_type] = seconds
 
     def update_history(self):
         start = datetime.now()
@@ -48,26 +79,65 @@ class ExecutionEnvironment(object):
     def mock_update_history(self):
         self.experiment_graph.mock_extend(self.workload_dag)
 
-    def save_history(self, environment_folder, overwrite=False, skip_history_update=False):
-        if os.path.exists(environment_folder) and not overwrite:
+    def save_history(self, environment_folder, overwrite=False, skip_history_update=False, incremental=False,
+                     compaction_ratio=1.0, lazy=False, compact=False):
+        """
+        :param incremental: if the folder contains the snapshot this history was loaded from (or last saved to), only
+                            the changes since then are appended to the log of the folder (see history_log). Otherwise,
+                            a new snapshot is written and the following saves are incremental
+        :param compaction_ratio: a new snapshot is written instead of appending to the log, when the log is larger
+                                 than compaction_ratio times the snapshot of the graph
+        :param lazy: write the content of the storage manager to payload files inside the folder, so that
+                     load_history_from_disk only loads the graph and the metadata of the storage manager and the
+                     content of every artifact is read the first time the artifact is retrieved
+        :param compact: pickle the graph as a compact graph (see compact_graph)
+        """
+        # an incremental save may only append to the folder of the change log of the graph
+        if os.path.exists(environment_folder) and not overwrite and \
+                not (incremental and self.experiment_graph.change_log_folder == environment_folder):
             raise Exception('Directory already exists and overwrite is not allowed')
+        if incremental and self.experiment_graph.change_log_folder == environment_folder and \
+                os.path.exists(log_path(environment_folder)) and \
+                os.path.getsize(log_path(environment_folder)) <= \
+                compaction_ratio * os.path.getsize(environment_folder + '/graph'):
+            start_save_log = datetime.now()
+            append_records(log_path(environment_folder), self.experiment_graph.pop_change_log())
+            self.save_load_cost_model(environment_folder)
+            self.update_time(BenchmarkMetrics.SAVE_HISTORY, (datetime.now() - start_save_log).total_seconds())
+            return
         if not os.path.exists(environment_folder):
             os.makedirs(environment_folder)
         start_save_graph = datetime.now()
 
         with open(environment_folder + '/graph', 'wb') as output:
-            pickle.dump(self.experiment_graph.graph, output, pickle.HIGHEST_PROTOCOL)
+            graph = self.experiment_graph.compact_snapshot() if compact else self.experiment_graph.graph
+            pickle.dump(graph, output, pickle.HIGHEST_PROTOCOL)
 
         with open(environment_folder + '/roots', 'wb') as output:
             pickle.dump(self.experiment_graph.roots, output, pickle.HIGHEST_PROTOCOL)
+        self.save_load_cost_model(environment_folder)
 
         end_save_graph = datetime.now()
 
         self.update_time(BenchmarkMetrics.SAVE_HISTORY, (end_save_graph - start_save_graph).total_seconds())
+        data_storage = self.experiment_graph.data_storage
+        if lazy:
+            data_storage = data_storage.detached_copy(environment_folder + '/payload')
         with open(environment_folder + '/storage', 'wb') as output:
-            pickle.dump(self.experiment_graph.data_storage, output, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data_storage, output, pickle.HIGHEST_PROTOCOL)
 
         self.update_time(BenchmarkMetrics.SAVE_DATA_STORE, (datetime.now() - end_save_graph).total_seconds())
+        # the log of the folder belongs to the previous snapshot
+        if incremental:
+            truncate_log(log_path(environment_folder))
+            self.experiment_graph.start_change_log(environment_folder)
+        else:
+            remove_log(log_path(environment_folder))
+
+    def save_load_cost_model(self, environment_folder):
+        # the model is small and is not part of the change log, every save writes all of it
+        with open(environment_folder + '/load_cost_model', 'wb') as output:
+            pickle.dump(self.experiment_graph.load_cost_model, output, pickle.HIGHEST_PROTOCOL)
 
     def compute_total_reuse_optimization_time(self):
         # optimizer.times has  the form {vertex_id:(execution time, optimization time)}
@@ -80,6 +150,39 @@ class ExecutionEnvironment(object):
         self.update_time(BenchmarkMetrics.TOTAL_REUSE, total_reuse_time)
         self.update_time(BenchmarkMetrics.TOTAL_HISTORY_READ, self.scheduler.history_reads)
 
+    def fit_model(self, model, x, y=None):
+        """
+        fits the model on the data, in the training pool if the environment has one
+        :return: the fitted model, which is a copy of the given model if it is fitted in the training pool
+        """
+        if self.training_pool is not None:
+            return self.training_pool.fit(model, x, y)
+        if y is None:
+            model.fit(x)
+        else:
+            model.fit(x, y)
+        return model
+
+    def close(self):
+        """
+        shuts down the worker processes of the training pool and the csv reader. The workers of the training pool
+        may keep the shared memory blocks of the training data mapped (see fit_shared), the blocks are only released
+        when the processes exit. The processes are started again when they are needed, i.e., the environment can
+        still be used after closing it
+        """
+        if self.training_pool is not None:
+            self.training_pool.shutdown()
+        if self.csv_reader is not None:
+            self.csv_reader.shutdown()
+
+    def create_workload_dag(self):
+        can_estimate = self.can_estimate_load_cost if self.release_intermediates else None
+        return WorkloadDag(workers=self.workers, release_intermediates=can_estimate)
+
+    def can_estimate_load_cost(self, node_type):
+        # the experiment graph (and its load cost model) is replaced when a history is loaded
+        return self.experiment_graph.load_cost_model.can_estimate(node_type)
+
     def new_workload(self):
         """
         call this function if you want to keep the history graph and start a new workload in the same execution
@@ -87,7 +190,7 @@ class ExecutionEnvironment(object):
         :return:
         """
         del self.workload_dag
-        self.workload_dag = WorkloadDag()
+        self.workload_dag = self.create_workload_dag()
         del self.time_manager
         self.time_manager = dict()
         scheduler_type = self.scheduler.NAME
@@ -99,11 +202,19 @@ class ExecutionEnvironment(object):
         self.experiment_graph = history
 
     def load_history_from_disk(self, environment_folder):
+        """
+        histories saved with lazy=True are opened lazily, only the graph (topology and metadata of the vertices) and
+        the metadata of the storage manager are loaded here
+        """
         start_graph_load = datetime.now()
         if not os.path.isdir(environment_folder):
             os.makedirs(environment_folder)
         with open(environment_folder + '/graph', 'rb') as g_input:
             graph = pickle.load(g_input)
+        compact_graph = None
+        if isinstance(graph, CompactGraph):
+            compact_graph = graph
+            graph = compact_graph.to_graph()
 
         with open(environment_folder + '/roots', 'rb') as g_input:
             roots = pickle.load(g_input)
@@ -111,6 +222,14 @@ class ExecutionEnvironment(object):
         with open(environment_folder + '/storage', 'rb') as d_input:
             data_storage = pickle.load(d_input)
         self.experiment_graph = ExperimentGraph(data_storage, graph, roots)
+        self.experiment_graph.compact_graph = compact_graph
+        # histories saved before the load cost model was part of the folder start with an empty model
+        if os.path.exists(environment_folder + '/load_cost_model'):
+            with open(environment_folder + '/load_cost_model', 'rb') as m_input:
+                self.experiment_graph.load_cost_model = pickle.load(m_input)
+        if os.path.exists(log_path(environment_folder)):
+            self.experiment_graph.replay(read_records(log_path(environment_folder)))
+            self.experiment_graph.start_change_log(environment_folder)
 
         self.update_time(BenchmarkMetrics.LOAD_HISTORY, (datetime.now() - start_graph_load).total_seconds())
 
@@ -131,7 +250,7 @@ class ExecutionEnvironment(object):
         if self.workload_dag.has_node(root_hash):
             # print 'loading root node {} from workload graph'.format(root_hash)
             return self.workload_dag.get_node(root_hash)['data']
-        elif self.experiment_graph.has_node(root_hash):
+        elif self.experiment_graph.has_node(root_hash) and self.experiment_graph.graph.nodes[root_hash]['mat']:
             # print 'loading root node {} from history graph'.format(root_hash)
             root = copy.deepcopy(self.experiment_graph.graph.nodes[root_hash])
             root['data'].execution_environment = self
@@ -141,10 +260,16 @@ class ExecutionEnvironment(object):
             return root['data']
         else:
             print('creating a new root node')
-            start = datetime.now()
-            initial_data = pd.read_csv(loc, **extra_params)
-            end = datetime.now()
-            self.update_time(BenchmarkMetrics.LOAD_DATASET, (end - start).total_seconds())
+            # the names of the columns are used for parsing a subset of the columns, which does not work together with
+            # an index column or a callable usecols
+            lazy = self.lazy_roots and 'index_col' not in extra_params and not callable(extra_params.get('usecols'))
+            if lazy:
+                # only the header is parsed, the columns are parsed when the operations that use them are executed
+                start = datetime.now()
+                initial_data = pd.read_csv(loc, **dict(extra_params, nrows=0))
+                self.update_time(BenchmarkMetrics.LOAD_DATASET, (datetime.now() - start).total_seconds())
+            else:
+                initial_data = self.read_csv(loc, extra_params)
             c_name = []
             c_hash = []
             # create the md5 hash values for columns
@@ -156,8 +281,12 @@ class ExecutionEnvironment(object):
                 c_hash.append(Node.md5(root_hash + c))
 
             # self.data_storage.store_dataset(c_hash, initial_data[c_name])
-            df = DataFrame(column_names=c_name, column_hashes=c_hash, pandas_df=initial_data[c_name])
+            df = DataFrame(column_names=c_name, column_hashes=c_hash, pandas_df=None if lazy else initial_data[c_name])
             nextnode = Dataset(root_hash, self, underlying_data=df)
+            if lazy:
+                # a partially parsed root is not materialized, the next workloads parse the csv file again
+                nextnode.computed = False
+                nextnode.unmaterializable = True
             node_size_start = datetime.now()
             # size = nextnode.compute_size()
             self.update_time(BenchmarkMetrics.NODE_SIZE_COMPUTATION,
@@ -166,9 +295,61 @@ class ExecutionEnvironment(object):
             self.workload_dag.add_node(root_hash, **{'root': True, 'type': 'Dataset', 'data': nextnode,
                                                      'loc': loc,
                                                      'extra_params': extra_params,
+                                                     'lazy': lazy,
+                                                     'columns': c_name,
                                                      'size': None})
             return nextnode
 
+    def load_root_columns(self, root_hash, columns=None):
+        """
+        parses the columns of a lazy root (see load) that are not parsed yet. The root keeps the parsed columns in the
+        order of the csv file and their hashes are the same as if the whole file was parsed
+        :param root_hash: id of the root in the workload dag
+        :param columns: names of the columns that the executed operations use, None for all the columns
+        """
+        node = self.workload_dag.get_node(root_hash)
+        root = node['data']
+        header = node['columns']
+        loaded = root.underlying_data.get_column() if root.computed else []
+        needed = set(header if columns is None else columns).union(loaded)
+        positions = [i for i in range(len(header)) if header[i] in needed]
+        missing = [header[i] for i in positions if header[i] not in loaded]
+        if missing:
+            parsed = self.read_csv(node['loc'], node['extra_params'], missing)
+            if root.computed:
+                parsed = pd.concat([root.underlying_data.pandas_df, parsed], axis=1)
+            c_name = [header[i] for i in positions]
+            c_hash = [Node.md5(root_hash + c) for c in c_name]
+            root.underlying_data = DataFrame(column_names=c_name, column_hashes=c_hash, pandas_df=parsed[c_name])
+        root.computed = True
+        if len(positions) == len(header):
+            node['lazy'] = False
+            root.unmaterializable = False
+
+    def read_csv(self, loc, extra_params, columns=None):
+        """
+        parses the csv file or reads it from the parse cache (if any). Only the complete files are added to the cache
+        :param columns: names of the columns to parse (in the order of the file), None for all the columns. The names
+                        are the ones of the parsed file, i.e., a subset of the usecols of extra_params if it has any
+        :rtype: pd.DataFrame
+        """
+        start = datetime.now()
+        data = None if self.parse_cache is None else self.parse_cache.get(loc, extra_params, columns)
+        if data is None:
+            data = self.parse_csv(loc, extra_params if columns is None else dict(extra_params, usecols=columns))
+            if columns is None and self.parse_cache is not None:
+                self.parse_cache.put(loc, extra_params, data)
+        self.update_time(BenchmarkMetrics.LOAD_DATASET, (datetime.now() - start).total_seconds())
+        return data
+
+    def parse_csv(self, loc, extra_params):
+        """
+        parses the csv file, the large files are parsed in parallel if the environment has parse processes
+        """
+        if self.csv_reader is None:
+            return pd.read_csv(loc, **extra_params)
+        return self.csv_reader.read(loc, extra_params)
+
     def load_from_pandas(self, df, identifier):
         if self.workload_dag.has_node(identifier):
             return self.workload_dag.get_node(identifier)['data']
@@ -7,7 +7,8 @@ from experiment_graph.materialization_algorithms.materialization_methods import
     StorageAwareMaterializer, HelixMaterializer
 from experiment_graph.optimizations.Reuse import HelixReuse
 from experiment_graph.workload import Workload
-from heuristics import compute_recreation_cost, compute_vertex_potential, compute_load_costs
+from heuristics import compute_cost_and_potential, compute_load_costs, HEURISTIC_ATTRIBUTES, \
+    HEURISTIC_EDGE_ATTRIBUTES
 
 
 class Executor:
@@ -82,15 +83,21 @@ class CollaborativeExecutor(Executor):
     DEFAULT_PROFILE = {"Agg": 0.08959999999999999, "SK_Model": 0.0002258063871079322, "Evaluation": 0.02909090909090909,
                        "Feature": 2.5703229163279242e-05, "Dataset": 0.0005039403928584662}
 
-    def __init__(self, execution_environment, cost_profile=None, materializer=None):
+    def __init__(self, execution_environment, cost_profile=None, materializer=None, pruning_horizon=None,
+                 pruning_max_potential=0.0):
         """
 
         :type execution_environment: ExecutionEnvironment
+        :param pruning_horizon: if given, the cold vertices that are not part of the last pruning_horizon workloads are
+                                pruned after the materialization (see ExperimentGraph.prune)
+        :param pruning_max_potential: vertices with a higher potential are never pruned
         """
         Executor.__init__(self)
         self.cost_profile = CollaborativeExecutor.DEFAULT_PROFILE if cost_profile is None else cost_profile
         self.execution_environment = execution_environment
         self.materializer = AllMaterializer() if materializer is None else materializer
+        self.pruning_horizon = pruning_horizon
+        self.pruning_max_potential = pruning_max_potential
         # storage aware materialization only works with deduped storage manager
         if isinstance(self.materializer, StorageAwareMaterializer):
             assert isinstance(execution_environment.experiment_graph.data_storage, DedupedStorageManager)
@@ -132,9 +139,11 @@ class CollaborativeExecutor(Executor):
         self.execution_environment.experiment_graph.extend(self.execution_environment.workload_dag)
         # TODO: implementing this in a truly online manner, i.e., only computing nodes which are
         # affected is a bit of work. For now, we recompute for the entire graph
-        self.compute_heuristics(self.execution_environment.experiment_graph.graph, self.cost_profile)
+        self.compute_heuristics(self.execution_environment.experiment_graph, self.cost_profile)
         self.materializer.run_and_materialize(self.execution_environment.experiment_graph,
                                               self.execution_environment.workload_dag)
+        if self.pruning_horizon is not None:
+            self.execution_environment.experiment_graph.prune(self.pruning_horizon, self.pruning_max_potential)
         return True
 
     def cleanup(self):
@@ -166,10 +175,14 @@ class CollaborativeExecutor(Executor):
             return ','.join([self.time_manager[key] for key in keys])
 
     @staticmethod
-    def compute_heuristics(graph, profile):
-        compute_load_costs(graph, profile)
-        compute_recreation_cost(graph)
-        compute_vertex_potential(graph)
+    def compute_heuristics(experiment_graph, profile):
+        """
+        :type experiment_graph: ExperimentGraph
+        """
+        compute_load_costs(experiment_graph.graph, profile)
+        # the snapshot is kept by the experiment graph and reused by save_history(compact=True)
+        compute_cost_and_potential(experiment_graph.graph,
+                                   experiment_graph.compact_snapshot(HEURISTIC_ATTRIBUTES, HEURISTIC_EDGE_ATTRIBUTES))
 
 
 class HelixExecutor(Executor):
@@ -225,7 +238,7 @@ class HelixExecutor(Executor):
         self.execution_environment.experiment_graph.extend(self.execution_environment.workload_dag)
         # TODO: implementing this in a truly online manner, i.e., only computing nodes which are
         # affected is a bit of work. For now, we recompute for the entire graph
-        self.compute_heuristics(self.execution_environment.experiment_graph.graph, self.cost_profile)
+        self.compute_heuristics(self.execution_environment.experiment_graph, self.cost_profile)
         self.materializer.run_and_materialize(self.execution_environment.experiment_graph,
                                               self.execution_environment.workload_dag)
         return True
@@ -259,10 +272,14 @@ class HelixExecutor(Executor):
             return ','.join([self.time_manager[key] for key in keys])
 
     @staticmethod
-    def compute_heuristics(graph, profile):
-        compute_load_costs(graph, profile)
-        compute_recreation_cost(graph)
-        compute_vertex_potential(graph)
+    def compute_heuristics(experiment_graph, profile):
+        """
+        :type experiment_graph: ExperimentGraph
+        """
+        compute_load_costs(experiment_graph.graph, profile)
+        # the snapshot is kept by the experiment graph and reused by save_history(compact=True)
+        compute_cost_and_potential(experiment_graph.graph,
+                                   experiment_graph.compact_snapshot(HEURISTIC_ATTRIBUTES, HEURISTIC_EDGE_ATTRIBUTES))
 
 
 class BaselineExecutor(Executor):
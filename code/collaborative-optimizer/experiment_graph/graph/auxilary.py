@@ -47,7 +47,8 @@ class DataFrame(Pandas):
         self.column_hashes = column_hashes
         self.pandas_df = pandas_df
         self.column_sizes = {}
-        self.pandas_df.columns = column_names
+        if pandas_df is not None:
+            self.pandas_df.columns = column_names
 
     # TODO check if get_size is always going to be called for every object, if it is we can move the computation code to
     # the constructor
@@ -68,6 +69,15 @@ class DataFrame(Pandas):
     def get_data(self):
         return self.pandas_df
 
+    def schema(self):
+        """
+        returns a copy without the data, only the column names, hashes, and sizes are kept
+        """
+        schema = DataFrame(self.column_names, self.column_hashes)
+        schema.column_sizes = self.column_sizes
+        schema.size = self.size
+        return schema
+
 
 class DataSeries(Pandas):
     def __init__(self, column_name, column_hash, pandas_series):
@@ -89,3 +99,11 @@ class DataSeries(Pandas):
 
     def get_data(self):
         return self.pandas_series
+
+    def schema(self):
+        """
+        returns a copy without the data, only the column name, hash, and size are kept
+        """
+        schema = DataSeries(self.column_name, self.column_hash, None)
+        schema.size = self.size
+        return schema
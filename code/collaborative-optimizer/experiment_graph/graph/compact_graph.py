@@ -0,0 +1,254 @@
+"""
+Array based snapshot of an experiment graph.
+The vertex hashes are interned to integer ids (the position of the vertex in the graph), the edges are kept in CSR
+form (out_indptr and out_indices, where the out edges of vertex i are the positions out_indptr[i] to
+out_indptr[i + 1]) together with the reverse CSR for the in edges, and the numeric attributes of the vertices and
+edges (sizes, costs, frequencies, ...) are kept in typed numpy columns. The other attributes (type, data, args, ...)
+are kept as they are.
+The heuristics (see heuristics.compute_cost_and_potential) run over the arrays of the snapshot, and save_history
+can pickle the snapshot instead of the networkx graph, which writes a few arrays instead of one dictionary per
+vertex and edge.
+"""
+import networkx as nx
+import numpy as np
+
+VERTEX_COLUMNS = {'size': np.float64, 'load_cost': np.float64, 'compute_cost': np.float64,
+                  'recreation_cost': np.float64, 'n_recreation_cost': np.float64, 'potential': np.float64,
+                  'n_potential': np.float64, 'score': np.float64, 'pruned_potential': np.float64,
+                  'meta_freq': np.int64, 'last_workload': np.int64, 'mat': np.bool_, 'root': np.bool_}
+EDGE_COLUMNS = {'execution_time': np.float64, 'freq': np.int64, 'executed': np.bool_}
+# marks the vertices (or edges) that do not have an attribute, see AttributeTable.set_values
+MISSING = object()
+
+
+def fits(value, dtype):
+    """
+    checks if the value can be kept in a column of the given dtype without changing its meaning
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return dtype == np.bool_
+    if isinstance(value, (int, np.integer)):
+        return dtype != np.bool_
+    if isinstance(value, (float, np.floating)):
+        return dtype == np.float64
+    return False
+
+
+class AttributeTable(object):
+    """
+    attributes of the vertices (or edges) of a compact graph. An entry of a column is only defined if the vertex has
+    the attribute and the value fits the column (e.g., a size of None does not), every other value is kept in the
+    objects dictionary, {attribute: {position: value}}
+    """
+
+    def __init__(self, dtypes, count):
+        self.columns = {name: np.zeros(count, dtype=dtype) for name, dtype in dtypes.items()}
+        self.defined = {name: np.zeros(count, dtype=bool) for name in dtypes}
+        self.objects = {}
+
+    def set(self, position, attributes):
+        for name, value in attributes.items():
+            if name in self.columns and fits(value, self.columns[name].dtype):
+                self.columns[name][position] = value
+                self.defined[name][position] = True
+            else:
+                self.objects.setdefault(name, {})[position] = value
+
+    def set_values(self, name, values):
+        """
+        replaces the attribute at every position
+        :param values: the value of the attribute at every position, MISSING where it is not set
+        """
+        self.objects.pop(name, None)
+        column = self.columns.get(name)
+        if column is not None:
+            column[:] = 0
+            self.defined[name][:] = False
+        for position, value in enumerate(values):
+            if value is MISSING:
+                continue
+            if column is not None and fits(value, column.dtype):
+                column[position] = value
+                self.defined[name][position] = True
+            else:
+                self.objects.setdefault(name, {})[position] = value
+
+    def get(self, position):
+        attributes = {}
+        for name, column in self.columns.items():
+            if self.defined[name][position]:
+                attributes[name] = column[position].item()
+        for name, values in self.objects.items():
+            if position in values:
+                attributes[name] = values[position]
+        return attributes
+
+    def set_column(self, name, values):
+        self.columns[name] = np.asarray(values, dtype=self.columns[name].dtype)
+        self.defined[name] = np.ones(len(values), dtype=bool)
+        if name in self.objects:
+            del self.objects[name]
+
+
+class CompactGraph(object):
+    def __init__(self, graph):
+        """
+        builds the snapshot of the graph, the ids of the vertices follow the order of graph.nodes
+        :type graph: nx.DiGraph
+        """
+        self.vertices = list(graph.nodes)
+        self.vertex_ids = {v: i for i, v in enumerate(self.vertices)}
+        vertex_count = len(self.vertices)
+        self.out_indptr = np.zeros(vertex_count + 1, dtype=np.int64)
+        self.out_indptr[1:] = np.cumsum([len(graph.adj[v]) for v in self.vertices])
+        self.out_indices = np.fromiter((self.vertex_ids[d] for v in self.vertices for d in graph.adj[v]),
+                                       dtype=np.int64, count=graph.number_of_edges())
+        self.build_in_edges()
+        self.refresh(graph)
+
+    def refresh(self, graph, names=None, edge_names=None):
+        """
+        reads the attributes of the vertices and the edges from the graph again. The graph must have the vertices and
+        the edges of the snapshot (in the same order), only their attributes may have changed
+        :param names: the vertex attributes to read, None for all of them
+        :param edge_names: the edge attributes to read, None for all of them
+        """
+        # the attributes of the graph itself (e.g., the summaries of the pruned vertices)
+        self.graph_attributes = dict(graph.graph)
+        if names is None:
+            self.vertex_attributes = AttributeTable(VERTEX_COLUMNS, len(self.vertices))
+            for i, (_, attributes) in enumerate(graph.nodes(data=True)):
+                self.vertex_attributes.set(i, attributes)
+        else:
+            for name in names:
+                self.vertex_attributes.set_values(name, (value for _, value in
+                                                         graph.nodes(data=name, default=MISSING)))
+        # graph.edges follows the same order as the CSR arrays
+        if edge_names is None:
+            self.edge_attributes = AttributeTable(EDGE_COLUMNS, len(self.out_indices))
+            for position, (_, _, attributes) in enumerate(graph.edges(data=True)):
+                self.edge_attributes.set(position, attributes)
+        else:
+            for name in edge_names:
+                self.edge_attributes.set_values(name, (value for _, _, value in
+                                                       graph.edges(data=name, default=MISSING)))
+
+    def build_in_edges(self):
+        """
+        the reverse CSR: the in edges of vertex i are the positions in_indptr[i] to in_indptr[i + 1] of in_indices
+        (the sources) and in_edges (the positions of the edges in the out arrays)
+        """
+        vertex_count = len(self.vertices)
+        sources = np.repeat(np.arange(vertex_count), np.diff(self.out_indptr))
+        self.in_edges = np.argsort(self.out_indices, kind='stable')
+        self.in_indices = sources[self.in_edges]
+        self.in_indptr = np.zeros(vertex_count + 1, dtype=np.int64)
+        self.in_indptr[1:] = np.cumsum(np.bincount(self.out_indices, minlength=vertex_count))
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def __getstate__(self):
+        # the vertex ids and the reverse CSR are recomputed when the snapshot is loaded
+        state = self.__dict__.copy()
+        for name in ['vertex_ids', 'in_edges', 'in_indices', 'in_indptr']:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('graph_attributes', {})
+        self.__dict__.update(state)
+        self.vertex_ids = {v: i for i, v in enumerate(self.vertices)}
+        self.build_in_edges()
+
+    def column(self, name):
+        return self.vertex_attributes.columns[name]
+
+    def defined(self, name):
+        return self.vertex_attributes.defined[name]
+
+    def edge_column(self, name):
+        return self.edge_attributes.columns[name]
+
+    def vertices_of_type(self, vertex_type):
+        """
+        :return: boolean mask of the vertices with the given type
+        """
+        mask = np.zeros(len(self.vertices), dtype=bool)
+        types = self.vertex_attributes.objects.get('type', {})
+        mask[[i for i, t in types.items() if t == vertex_type]] = True
+        return mask
+
+    def successors(self, vertex_id):
+        return self.out_indices[self.out_indptr[vertex_id]:self.out_indptr[vertex_id + 1]]
+
+    def predecessors(self, vertex_id):
+        return self.in_indices[self.in_indptr[vertex_id]:self.in_indptr[vertex_id + 1]]
+
+    @staticmethod
+    def expand(indptr, vertex_ids):
+        """
+        :return: positions of the CSR entries of all the given vertices and the vertex every position belongs to
+        """
+        starts = indptr[vertex_ids]
+        counts = indptr[vertex_ids + 1] - starts
+        owners = np.repeat(vertex_ids, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets, owners
+
+    def out_edges(self, vertex_ids):
+        """
+        :return: (edge positions, sources, destinations) of the out edges of the given vertices
+        """
+        positions, sources = self.expand(self.out_indptr, vertex_ids)
+        return positions, sources, self.out_indices[positions]
+
+    def in_edges_of(self, vertex_ids):
+        """
+        :return: (edge positions, sources, destinations) of the in edges of the given vertices
+        """
+        positions, destinations = self.expand(self.in_indptr, vertex_ids)
+        return self.in_edges[positions], self.in_indices[positions], destinations
+
+    def topological_levels(self):
+        """
+        groups the vertices into levels, all the predecessors of a vertex are in the earlier levels
+        :return: list of arrays of vertex ids
+        """
+        in_degree = np.diff(self.in_indptr)
+        frontier = np.flatnonzero(in_degree == 0)
+        levels = []
+        visited = 0
+        while len(frontier) > 0:
+            levels.append(frontier)
+            visited += len(frontier)
+            _, _, destinations = self.out_edges(frontier)
+            np.subtract.at(in_degree, destinations, 1)
+            destinations = np.unique(destinations)
+            frontier = destinations[in_degree[destinations] == 0]
+        if visited != len(self.vertices):
+            raise Exception('The graph contains a cycle')
+        return levels
+
+    def to_graph(self):
+        """
+        :rtype: nx.DiGraph
+        """
+        graph = nx.DiGraph(**self.graph_attributes)
+        graph.add_nodes_from((v, self.vertex_attributes.get(i)) for i, v in enumerate(self.vertices))
+        sources = np.repeat(np.arange(len(self.vertices)), np.diff(self.out_indptr))
+        graph.add_edges_from((self.vertices[s], self.vertices[d], self.edge_attributes.get(position))
+                             for position, (s, d) in enumerate(zip(sources, self.out_indices)))
+        return graph
+
+    def write_back(self, graph, names):
+        """
+        copies the given vertex columns of the snapshot to the attributes of the vertices of the graph
+        :type graph: nx.DiGraph
+        """
+        for name in names:
+            column = self.column(name).tolist()
+            defined = self.defined(name)
+            for i, v in enumerate(self.vertices):
+                if defined[i]:
+                    graph.nodes[v][name] = column[i]
@@ -1,5 +1,7 @@
+import bisect
 import copy
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
 import networkx as nx
@@ -11,6 +13,9 @@ import numpy as np
 from experiment_graph.graph.auxilary import DataFrame, DataSeries
 from experiment_graph.data_storage import SimpleStorageManager
 from experiment_graph.globals import COMBINE_OPERATION_IDENTIFIER
+from experiment_graph.graph.compact_graph import CompactGraph
+from experiment_graph.heuristics import compute_cost_and_potential, HEURISTIC_ATTRIBUTES, HEURISTIC_EDGE_ATTRIBUTES
+from experiment_graph.load_cost_model import LoadCostModel, dtype_class
 
 
 class BaseGraph(object):
@@ -23,6 +28,16 @@ class BaseGraph(object):
             self.roots = []
         else:
             self.roots = roots
+        # (source vertex, edge hash) -> child vertex, finding an existing operation does not scan the out edges
+        self.edge_index = {}
+        for source, destination, edge_hash in self.graph.edges(data='hash'):
+            self.index_edge(source, destination, edge_hash)
+        # (type, materialized) -> total size of the vertices, the size queries (e.g., get_artifact_sizes) read the
+        # totals instead of scanning the graph. The sizes and the materialization states of the vertices should be
+        # changed through add_node, update_node, set_size, and set_materialized to keep the totals up to date
+        self.size_totals = {}
+        for _, attributes in self.graph.nodes(data=True):
+            self.count_size(attributes, 1)
 
     def set_environment(self, env):
         for node in self.graph.nodes(data='data'):
@@ -33,14 +48,56 @@ class BaseGraph(object):
         return len(self.graph) == 0
 
     def add_node(self, node_id, **meta):
+        if node_id in self.graph:
+            self.count_size(self.graph.nodes[node_id], -1)
         self.graph.add_node(node_id, **meta)
+        self.count_size(self.graph.nodes[node_id], 1)
+
+    def update_node(self, node_id, attributes):
+        node = self.graph.nodes[node_id]
+        self.count_size(node, -1)
+        node.update(attributes)
+        self.count_size(node, 1)
+
+    def remove_node(self, node_id):
+        self.count_size(self.graph.nodes[node_id], -1)
+        for source, _, edge_hash in self.graph.in_edges(node_id, data='hash'):
+            self.edge_index.pop((source, edge_hash), None)
+        for _, _, edge_hash in self.graph.out_edges(node_id, data='hash'):
+            self.edge_index.pop((node_id, edge_hash), None)
+        self.graph.remove_node(node_id)
+
+    def set_size(self, node_id, size):
+        self.update_node(node_id, {'size': size})
+
+    def set_materialized(self, node_id, mat):
+        self.update_node(node_id, {'mat': mat})
+
+    def count_size(self, attributes, sign):
+        """
+        adds (sign = 1) or removes (sign = -1) the size of a vertex to the totals
+        """
+        if attributes.get('size') is None:
+            return
+        key = (attributes['type'], attributes.get('mat', False))
+        self.size_totals[key] = self.size_totals.get(key, 0.0) + sign * attributes['size']
+
+    def index_edge(self, source, destination, edge_hash):
+        self.edge_index[(source, edge_hash)] = destination
+
+    def child(self, source, edge_hash):
+        """
+        returns the vertex that is the result of applying the operation with the given hash to the source vertex or
+        None if the operation is not in the graph
+        """
+        return self.edge_index.get((source, edge_hash))
 
     def add_edge(self, start_id, end_id, nextnode, meta, ntype):
-        for e in self.graph.out_edges(start_id, data=True):
-            if e[2]['hash'] == meta['hash']:
-                exist = self.graph.nodes[e[1]]['data']
-                e[2]['freq'] = e[2]['freq'] + 1
-                return exist
+        child = self.child(start_id, meta['hash'])
+        if child is not None:
+            edge = self.graph.edges[start_id, child]
+            edge['freq'] = edge['freq'] + 1
+            return self.graph.nodes[child]['data']
         params = {'type': ntype, 'root': False, 'data': nextnode, 'size': 0.0}
 
         if ntype == 'SK_Model':
@@ -49,6 +106,7 @@ class BaseGraph(object):
         self.add_node(end_id, **params)
         meta['freq'] = 1
         self.graph.add_edge(start_id, end_id, **meta)
+        self.index_edge(start_id, end_id, meta['hash'])
         return None
 
     def plot_graph(self, plt, figsize=(12, 12), labels_for_vertex=['size'], labels_for_edges=['name'], vertex_size=1000,
@@ -151,28 +209,18 @@ class BaseGraph(object):
             line.set_linewidth(4.0)
 
     def get_artifact_sizes(self, for_types=None, exclude_types=None, mat_only=False):
-        def none_to_zero(value):
-            return 0 if value is None else value
-
         t_size = 0
         # both cannot have some values
         assert for_types is None or exclude_types is None
 
-        if exclude_types is None:
-            if for_types is None:
-                for node in self.graph.nodes(data=True):
-                    if not mat_only or node[1]['mat']:
-                        t_size += none_to_zero(node[1]['size'])
-            else:
-                for node in self.graph.nodes(data=True):
-                    if node[1]['type'] in for_types:
-                        if not mat_only or node[1]['mat']:
-                            t_size += none_to_zero(node[1]['size'])
-        else:
-            for node in self.graph.nodes(data=True):
-                if node[1]['type'] not in exclude_types:
-                    if not mat_only or node[1]['mat']:
-                        t_size += none_to_zero(node[1]['size'])
+        for (node_type, mat), size in self.size_totals.items():
+            if mat_only and not mat:
+                continue
+            if for_types is not None and node_type not in for_types:
+                continue
+            if exclude_types is not None and node_type in exclude_types:
+                continue
+            t_size += size
 
         return t_size
 
@@ -199,9 +247,49 @@ class BaseGraph(object):
 
 
 class WorkloadDag(BaseGraph):
-    def __init__(self, graph=None, roots=None):
+    # operations that keep the rows of their only input and compute every row (or column) on its own
+    ROW_PRESERVING_OPERATIONS = {'p_project', 'p_drop', 'p_select_dtypes', 'p_set_columns', 'p_rename', 'p_copy',
+                                 'p_abs', 'p_isnull', 'p_notna', 'p_ffill', 'p_setname', 'p_fillna', 'p_astype',
+                                 'p_replace', 'p_binning', 'p___mul__', 'p___rmul__', 'p___truediv__',
+                                 'p___rtruediv__', 'p___itruediv__', 'p___add__', 'p___radd__', 'p___sub__',
+                                 'p___rsub__', 'p___lt__', 'p___le__', 'p___eq__', 'p___ne__', 'p___gt__',
+                                 'p___ge__', 'p___and__'}
+
+    def __init__(self, graph=None, roots=None, workers=1, release_intermediates=None):
+        """
+        :param workers: number of threads that execute the independent edges of a schedule in parallel, with 1 the
+                        edges are executed one after the other
+        :param release_intermediates: None or a function that returns whether the load cost of the vertices of the
+                                      given type can be estimated, if given, the intermediate results of the chains
+                                      of row preserving operations are released (see releasable_vertices)
+        """
         super(WorkloadDag, self).__init__(graph, roots)
+        self.workers = workers
+        self.release_intermediates = release_intermediates
         self.post_processed = False
+        # vertex -> position in a topological order of the graph. A vertex is added after its parents, so the order
+        # in which the vertices are added is a topological order. The positions are recomputed when an edge to an
+        # existing vertex is added or when vertices are added to the graph directly
+        self.vertex_positions = {}
+        self.positions_valid = True
+
+    def add_node(self, node_id, **meta):
+        if node_id not in self.vertex_positions:
+            self.vertex_positions[node_id] = len(self.vertex_positions)
+        super(WorkloadDag, self).add_node(node_id, **meta)
+
+    def add_edge(self, start_id, end_id, nextnode, meta, ntype):
+        existing_vertex = end_id in self.vertex_positions
+        exist = super(WorkloadDag, self).add_edge(start_id, end_id, nextnode, meta, ntype)
+        if exist is None and existing_vertex:
+            self.positions_valid = False
+        return exist
+
+    def topological_positions(self):
+        if not self.positions_valid or len(self.vertex_positions) != len(self.graph):
+            self.vertex_positions = {v: i for i, v in enumerate(nx.topological_sort(self.graph))}
+            self.positions_valid = True
+        return self.vertex_positions
 
     def post_process(self):
         """
@@ -211,20 +299,24 @@ class WorkloadDag(BaseGraph):
         # for node in self.graph.nodes(data=True):
         #     node[1]['freq'] = node[1]['data'].get_freq()
         prev_node = None
-        for n in list(nx.topological_sort(self.graph)):
+        # the vertex positions are ordered by their position
+        for n in list(self.topological_positions()):
             node = self.graph.nodes[n]
             if node['data'].computed:
                 if node['type'] == 'SK_Model':
                     node['score'] = node['data'].get_model_score()
                 if node['type'] == 'GroupBy':
-                    node['size'] = prev_node['size']
+                    self.set_size(n, prev_node['size'])
                 elif node['type'] is not 'SuperNode':
-                    node['size'] = node['data'].compute_size()
+                    self.set_size(n, node['data'].compute_size())
                 else:
-                    node['size'] = None
+                    self.set_size(n, None)
                 prev_node = node
+            elif node.get('released', False):
+                # the size is computed before the content is released
+                self.set_size(n, node['data'].size)
             else:
-                node['size'] = None
+                self.set_size(n, None)
 
         self.post_processed = True
 
@@ -316,43 +408,139 @@ class WorkloadDag(BaseGraph):
         :return:
         """
         # schedule the computation of graph
-        # schedule = self.schedule(compute_paths)
-        schedule = list(nx.topological_sort(nx.line_graph(subgraph)))
+        # an edge is executed after all the edges of its source vertex, i.e., the edges are ordered by the topological
+        # position of their source
+        positions = self.topological_positions()
+        schedule = sorted(subgraph.edges(), key=lambda e: positions[e[0]])
 
+        releasable = self.releasable_vertices(subgraph) if self.release_intermediates else set()
         # execute the computation based on the schedule
-        for pair in schedule:
+        if self.workers > 1 and len(schedule) > 1:
+            self.execute_in_parallel(schedule, verbose, releasable)
+        else:
+            for pair in schedule:
+                self.execute_edge(pair, verbose, releasable)
+        return schedule
+
+    def releasable_vertices(self, subgraph):
+        """
+        finds the intermediate vertices of the chains of row preserving operations in the subgraph. Such a vertex is a
+        dataset or feature that is computed by a row preserving operation from its only parent and is only used by one
+        row preserving operation, which is executed in the same subgraph. The content of the vertex is released as soon
+        as its child is computed, so a chain keeps at most two intermediate results in memory. The vertex stays in the
+        graph with its columns and size (and is added to the experiment graph), but it is not computed anymore: it
+        cannot be materialized by this workload and, if it is requested later, it is recomputed.
+        Only the vertices whose load cost can be estimated (see release_intermediates) are released, so the released
+        vertices are materialization candidates of the next workloads like the other vertices
+        :return: set of the vertices that are released after their child is computed
+        """
+        releasable = set()
+        for n in subgraph.nodes:
+            node = self.graph.nodes[n]
+            if node['root'] or node['data'].computed or node['type'] not in ['Dataset', 'Feature']:
+                continue
+            if not self.release_intermediates(node['type']):
+                continue
+            if self.graph.in_degree(n) != 1 or self.graph.out_degree(n) != 1:
+                continue
+            (_, _, in_operation), = self.graph.in_edges(n, data='oper')
+            (_, child, out_operation), = self.graph.out_edges(n, data='oper')
+            if in_operation in self.ROW_PRESERVING_OPERATIONS and out_operation in self.ROW_PRESERVING_OPERATIONS \
+                    and child in subgraph and not self.graph.nodes[child]['data'].computed:
+                releasable.add(n)
+        return releasable
+
+    def release(self, node_id):
+        """
+        releases the content of an intermediate vertex, only the columns and the size of the vertex are kept
+        """
+        node = self.graph.nodes[node_id]
+        node['data'].compute_size()
+        node['data'].underlying_data = node['data'].underlying_data.schema()
+        node['data'].computed = False
+        node['released'] = True
+
+    def execute_edge(self, pair, verbose=0, releasable=()):
+        self.apply_edge_result(pair, self.compute_edge(pair, verbose), releasable)
+
+    def compute_edge(self, pair, verbose=0):
+        """
+        computes the content of the destination of the edge without changing the graph, so it can run in the threads
+        of execute_in_parallel
+        :return: (content, execution time in ms) or None if there is nothing to compute
+        """
+        cur_node = self.graph.nodes[pair[1]]
+        prev_node = self.graph.nodes[pair[0]]
+        edge = self.graph.edges[pair[0], pair[1]]
+
+        # combine is logical and we do not execute it
+        if edge['oper'] == COMBINE_OPERATION_IDENTIFIER or cur_node['data'].computed:
+            return None
+        # print the path while executing
+        if verbose == 1:
+            print(str(pair[0]) + '--' + edge['hash'] + '->' + str(pair[1]))
+        # TODO: Data Storage only stores the data for Dataset and Feature for now
+        # TODO: Later on maybe we want to consider storing models and aggregates on the data storage as well
+        start_time = datetime.now()
+        underlying_data = self.compute_next(prev_node, edge)
+        return underlying_data, (datetime.now() - start_time).total_seconds() * 1000.0
+
+    def apply_edge_result(self, pair, result, releasable=()):
+        """
+        updates the destination and the edge with the result of compute_edge, the graph is only changed by the calling
+        thread of execute_in_parallel
+        """
+        edge = self.graph.edges[pair[0], pair[1]]
+        if edge['oper'] == COMBINE_OPERATION_IDENTIFIER:
+            edge['execution_time'] = 0.0
+            edge['executed'] = True
+            self.set_size(pair[1], None)
+        elif result is not None:
             cur_node = self.graph.nodes[pair[1]]
-            prev_node = self.graph.nodes[pair[0]]
-            edge = self.graph.edges[pair[0], pair[1]]
-
-            # combine is logical and we do not execute it
-            if edge['oper'] != COMBINE_OPERATION_IDENTIFIER:
-                if not cur_node['data'].computed:
-                    # print the path while executing
-                    if verbose == 1:
-                        print(str(pair[0]) + '--' + edge['hash'] + '->' + str(pair[1]))
-                    # TODO: Data Storage only stores the data for Dataset and Feature for now
-                    # TODO: Later on maybe we want to consider storing models and aggregates on the data storage as well
-                    if cur_node['type'] == 'Dataset' or cur_node['type'] == 'Feature':
-                        start_time = datetime.now()
-                        cur_node['data'].underlying_data = self.compute_next(prev_node, edge)
-                        cur_node['data'].computed = True
-                        total_time = (datetime.now() - start_time).microseconds / 1000.0
-                        # cur_node['size'] = cur_node['data'].compute_size()
-                    # all the other node types they contain the data themselves
-                    else:
-                        start_time = datetime.now()
-                        cur_node['data'].underlying_data = self.compute_next(prev_node, edge)
-                        cur_node['data'].computed = True
-                        total_time = (datetime.now() - start_time).microseconds / 1000.0
+            cur_node['data'].underlying_data, edge['execution_time'] = result
+            cur_node['data'].computed = True
+            edge['executed'] = True
+            if pair[0] in releasable:
+                self.release(pair[0])
 
-                    edge['execution_time'] = total_time
-                    edge['executed'] = True
-            else:
-                edge['execution_time'] = 0.0
-                edge['executed'] = True
-                cur_node['size'] = None
-        return schedule
+    def execute_in_parallel(self, schedule, verbose=0, releasable=()):
+        """
+        executes the edges of the schedule with a pool of threads. An edge is submitted as soon as all the edges of
+        the schedule that end in its source are executed, so the independent branches of the schedule (e.g., the
+        transformations of the train and test datasets) run at the same time. Most pandas and numpy kernels release
+        the GIL. The threads only compute the results of the edges, the calling thread applies them to the graph (see
+        apply_edge_result) and executes the combine edges, since they only update the graph
+        """
+        # vertex -> number of the edges of the schedule that end in the vertex and are not executed yet
+        pending = {}
+        children = {}
+        for pair in schedule:
+            pending[pair[1]] = pending.get(pair[1], 0) + 1
+            children.setdefault(pair[0], []).append(pair)
+        ready = deque(pair for pair in schedule if pair[0] not in pending)
+
+        def complete(executed):
+            pending[executed[1]] -= 1
+            if pending[executed[1]] == 0:
+                ready.extend(children.get(executed[1], []))
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while ready or running:
+                while ready:
+                    pair = ready.popleft()
+                    if self.graph.edges[pair]['oper'] == COMBINE_OPERATION_IDENTIFIER:
+                        self.execute_edge(pair, verbose)
+                        complete(pair)
+                    else:
+                        running[pool.submit(self.compute_edge, pair, verbose)] = pair
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pair = running.pop(future)
+                        # raises the exception of the operation, if any
+                        self.apply_edge_result(pair, future.result(), releasable)
+                        complete(pair)
 
     def compute_result(self, v_id, verbose=0):
         """ main computation for graph
@@ -418,30 +606,283 @@ class WorkloadDag(BaseGraph):
 
 
 class ExperimentGraph(BaseGraph):
+    # artifacts of these types are stored as serialized blobs in the data storage and not inside the graph
+    OBJECT_TYPES = ['Agg', 'SK_Model', 'Evaluation', 'GroupBy']
+
     def __init__(self, data_storage=SimpleStorageManager(), graph=None, roots=None):
         super(ExperimentGraph, self).__init__(graph, roots)
         self.data_storage = data_storage
+        # changes since the last (incremental) save, None if the changes are not logged (see history_log)
+        self.change_log = None
+        # the environment folder that contains the snapshot the change log is based on
+        self.change_log_folder = None
+        self.suspend_change_log = False
+        # fitted from the loads of the artifacts, estimates the load cost of the new vertices
+        self.load_cost_model = LoadCostModel()
+        # secondary indexes, kept up to date by add_node, update_node, and add_graph_edge
+        # type -> vertices of the type and type -> materialized vertices of the type
+        self.type_index = {}
+        self.materialized_index = {}
+        # (training vertex, model class) -> SK_Model vertices, the name of a training edge is the class of its model
+        self.model_index = {}
+        # (score, vertex) of the SK_Model vertices ordered by the score, NaN scores are indexed as -inf
+        self.model_scores = []
+        for node_id in self.graph.nodes:
+            self.index_vertex(node_id)
+        for source, destination in self.graph.edges:
+            self.index_model(source, destination)
+        # number of workloads the graph is extended with, every vertex keeps the last workload that contained it
+        self.workload_count = max([w for _, w in self.graph.nodes(data='last_workload', default=0)] + [0])
+        # compact snapshot of the graph (see compact_snapshot), dropped when a vertex or an edge is added or removed
+        self.compact_graph = None
 
-    def retrieve_data(self, node_id):
+    def add_node(self, node_id, **meta):
+        if node_id in self.graph:
+            self.unindex_vertex(node_id)
+        else:
+            self.compact_graph = None
+        super(ExperimentGraph, self).add_node(node_id, **meta)
+        self.index_vertex(node_id)
+
+    def remove_node(self, node_id):
+        self.compact_graph = None
+        self.unindex_vertex(node_id)
+        for source, _, model_class in self.graph.in_edges(node_id, data='name'):
+            if (source, model_class) in self.model_index:
+                self.model_index[(source, model_class)].discard(node_id)
+        super(ExperimentGraph, self).remove_node(node_id)
+
+    def update_node(self, node_id, attributes):
+        self.unindex_vertex(node_id)
+        super(ExperimentGraph, self).update_node(node_id, attributes)
+        self.index_vertex(node_id)
+
+    def add_graph_edge(self, source, destination, attributes):
+        if not self.graph.has_edge(source, destination):
+            self.compact_graph = None
+        self.graph.add_edge(source, destination, **attributes)
+        self.index_edge(source, destination, attributes['hash'])
+        self.index_model(source, destination)
+
+    def compact_snapshot(self, names=None, edge_names=None):
+        """
+        returns an up to date compact snapshot of the graph. The snapshot is kept between the calls, while the graph
+        has the same vertices and edges only the attributes are read again (see CompactGraph.refresh)
+        :param names: the vertex attributes that should be up to date, None for all of them
+        :param edge_names: the edge attributes that should be up to date, None for all of them
+        :rtype: CompactGraph
+        """
+        if self.compact_graph is None:
+            self.compact_graph = CompactGraph(self.graph)
+        else:
+            self.compact_graph.refresh(self.graph, names, edge_names)
+        return self.compact_graph
+
+    def index_vertex(self, node_id):
+        node = self.graph.nodes[node_id]
+        self.type_index.setdefault(node['type'], set()).add(node_id)
+        if node.get('mat'):
+            self.materialized_index.setdefault(node['type'], set()).add(node_id)
+        if node['type'] == 'SK_Model' and node.get('score') is not None:
+            bisect.insort(self.model_scores, (ExperimentGraph.indexed_score(node['score']), node_id))
+
+    def unindex_vertex(self, node_id):
+        node = self.graph.nodes[node_id]
+        self.type_index[node['type']].discard(node_id)
+        if node.get('mat'):
+            self.materialized_index[node['type']].discard(node_id)
+        if node['type'] == 'SK_Model' and node.get('score') is not None:
+            position = bisect.bisect_left(self.model_scores, (ExperimentGraph.indexed_score(node['score']), node_id))
+            del self.model_scores[position]
+
+    @staticmethod
+    def indexed_score(score):
+        # NaN is not ordered, it would break the order of model_scores, a model without a valid score is the worst
+        return -np.inf if np.isnan(score) else score
+
+    def index_model(self, source, destination):
+        if self.graph.nodes[destination]['type'] == 'SK_Model':
+            model_class = self.graph.edges[source, destination]['name']
+            self.model_index.setdefault((source, model_class), set()).add(destination)
+
+    def vertices_of_type(self, node_type, mat_only=False):
+        """
+        :param mat_only: only return the materialized vertices
+        :return: set of the vertices of the given type, the set should not be modified
+        """
+        index = self.materialized_index if mat_only else self.type_index
+        return index.get(node_type, set())
+
+    def models_trained_on(self, training_vertex, model_class, mat_only=False):
+        """
+        :param training_vertex: the vertex the models are trained on, i.e., the source of the training edges
+        :param model_class: name of the class of the models (e.g., LogisticRegression)
+        :param mat_only: only return the materialized models
+        :return: list of SK_Model vertices
+        """
+        models = self.model_index.get((training_vertex, model_class), set())
+        if mat_only:
+            return [m for m in models if self.graph.nodes[m]['mat']]
+        return list(models)
+
+    def best_models(self, n=1, mat_only=False, min_score=None):
+        """
+        :param n: number of models
+        :param mat_only: only return the materialized models
+        :param min_score: only return the models with a higher score
+        :return: list of (vertex, score) of the models with the highest scores, from the best to the worst
+        """
+        models = []
+        for score, node_id in reversed(self.model_scores):
+            if len(models) == n or (min_score is not None and score <= min_score):
+                break
+            if not mat_only or self.graph.nodes[node_id]['mat']:
+                models.append((node_id, self.graph.nodes[node_id]['score']))
+        return models
+
+    def start_change_log(self, environment_folder):
+        self.change_log = []
+        self.change_log_folder = environment_folder
+
+    def log_change(self, *record):
+        if self.change_log is not None and not self.suspend_change_log:
+            self.change_log.append(record)
+
+    def pop_change_log(self):
+        """
+        returns the logged changes since the last call and clears the log.
+        The attributes of the vertices and edges are logged by reference, so the records contain their latest values.
+        Materializations are logged by the id of the vertex and their content is read from the data storage here
+        """
+        records = []
+        for record in self.change_log:
+            if record[0] == 'materialize':
+                # the vertex is pruned or unmaterialized before the flush, the replay skips the later records as well
+                if record[1] in self.graph.nodes and self.graph.nodes[record[1]]['mat']:
+                    records.append(('materialize', record[1], self.stored_artifact(record[1])))
+            elif record[0] == 'node':
+                node_id, attributes = record[1], record[2]
+                data = copy.copy(attributes['data'])
+                if data is not None:
+                    data.underlying_data = None
+                records.append(('node', node_id, {k: v for k, v in attributes.items() if k not in ['data', 'mat']},
+                                data))
+            elif record[0] == 'edge':
+                records.append(('edge', record[1], record[2], dict(record[3])))
+            else:
+                records.append(record)
+        self.change_log = []
+        return records
+
+    def replay(self, records):
+        """
+        applies the records of a change log to the graph and the data storage and recomputes the heuristics
+        (recreation cost and potential) of the graph
+        """
+        for record in records:
+            if record[0] == 'node':
+                _, node_id, attributes, data = record
+                if node_id in self.graph.nodes:
+                    self.update_node(node_id, attributes)
+                else:
+                    self.add_node(node_id, data=data, mat=False, **attributes)
+                    self.restore_pruned_vertex(node_id)
+            elif record[0] == 'edge':
+                self.add_graph_edge(record[1], record[2], record[3])
+            elif record[0] == 'roots':
+                self.roots = record[1]
+            elif record[0] == 'materialize':
+                if not self.graph.nodes[record[1]]['mat']:
+                    self.materialize(record[1], record[2])
+            elif record[0] == 'unmaterialize':
+                if self.graph.nodes[record[1]]['mat']:
+                    self.unmaterialize(record[1])
+            elif record[0] == 'prune':
+                if record[1] in self.graph.nodes:
+                    self.prune_vertex(*record[1:])
+            else:
+                raise Exception('Unknown log record: {}'.format(record[0]))
+        if records:
+            self.workload_count = max([w for _, w in self.graph.nodes(data='last_workload', default=0)] +
+                                      [self.workload_count])
+        if records and not self.is_empty():
+            compute_cost_and_potential(self.graph, self.compact_snapshot(HEURISTIC_ATTRIBUTES,
+                                                                         HEURISTIC_EDGE_ATTRIBUTES))
+
+    def retrieve_data(self, node_id, columns=None):
+        """
+        :param node_id:
+        :param columns: list of column names, if given, only these columns of the Dataset are loaded
+        """
         node = self.graph.nodes[node_id]
         if node['mat'] is not True:
             print(node)
             raise Exception('The node ({}) is not materialized'.format(node_id))
 
+        if node['type'] == 'Dataset' or node['type'] == 'Feature':
+            self.data_storage.record_access_frequency(node_id, node['meta_freq'])
+
         if node['type'] == 'Dataset':
-            return DataFrame(column_names=node['data'].underlying_data.get_column(),
-                             column_hashes=node['data'].underlying_data.get_column_hash(),
-                             pandas_df=self.data_storage.get(node_id))
+            if columns is None:
+                tier = self.data_storage.storage_tier(node_id)
+                start = datetime.now()
+                pandas_df = self.data_storage.get(node_id)
+                self.observe_load(node_id, tier, (datetime.now() - start).total_seconds() * 1000.0)
+                return DataFrame(column_names=node['data'].underlying_data.get_column(),
+                                 column_hashes=node['data'].underlying_data.get_column_hash(),
+                                 pandas_df=pandas_df)
+            all_columns = node['data'].underlying_data.get_column()
+            all_hashes = node['data'].underlying_data.get_column_hash()
+            column_hashes = [all_hashes[all_columns.index(c)] for c in columns]
+            return DataFrame(column_names=list(columns),
+                             column_hashes=column_hashes,
+                             pandas_df=self.data_storage.get(node_id, columns=column_hashes))
         elif node['type'] == 'Feature':
+            tier = self.data_storage.storage_tier(node_id)
+            start = datetime.now()
+            pandas_series = self.data_storage.get(node_id)
+            self.observe_load(node_id, tier, (datetime.now() - start).total_seconds() * 1000.0)
             return DataSeries(column_name=node['data'].underlying_data.get_column(),
                               column_hash=node['data'].underlying_data.get_column_hash(),
-                              pandas_series=self.data_storage.get(node_id))
+                              pandas_series=pandas_series)
+        elif node['type'] in ExperimentGraph.OBJECT_TYPES:
+            tier = self.data_storage.storage_tier(node_id)
+            start = datetime.now()
+            obj = self.data_storage.get_object(node_id)
+            self.observe_load(node_id, tier, (datetime.now() - start).total_seconds() * 1000.0)
+            return obj
         else:
             return copy.deepcopy(self.graph.nodes[node_id]['data'].underlying_data)
 
+    def stored_artifact(self, node_id):
+        """
+        returns a copy of the artifact of a materialized vertex with its content read from the data storage.
+        Unlike retrieve_data, the access frequencies and the load cost model are not updated
+        """
+        node = self.graph.nodes[node_id]
+        artifact = copy.copy(node['data'])
+        if node['type'] == 'Dataset':
+            artifact.underlying_data = DataFrame(column_names=node['data'].underlying_data.get_column(),
+                                                 column_hashes=node['data'].underlying_data.get_column_hash(),
+                                                 pandas_df=self.data_storage.get(node_id))
+        elif node['type'] == 'Feature':
+            artifact.underlying_data = DataSeries(column_name=node['data'].underlying_data.get_column(),
+                                                  column_hash=node['data'].underlying_data.get_column_hash(),
+                                                  pandas_series=self.data_storage.get(node_id))
+        elif node['type'] in ExperimentGraph.OBJECT_TYPES:
+            artifact.underlying_data = self.data_storage.get_object(node_id)
+        return artifact
+
+    def get_dtypes(self, node_id):
+        """
+        returns the dtypes of the columns of a materialized Dataset without loading it
+        """
+        return self.data_storage.get_dtypes(node_id)
+
     def get_real_size(self):
-        return self.get_artifact_sizes(exclude_types=['Dataset', 'Feature'],
-                                       mat_only=True) + self.data_storage.total_size()
+        return self.get_artifact_sizes(exclude_types=['Dataset', 'Feature'] + ExperimentGraph.OBJECT_TYPES,
+                                       mat_only=True) + self.data_storage.total_size() + \
+               self.data_storage.objects_total_size()
 
     def materialize(self, node_id, artifact):
         if node_id not in self.graph:
@@ -455,18 +896,28 @@ class ExperimentGraph(BaseGraph):
                 # assert isinstance(artifact, Dataset)
                 # or node['type'] == 'Feature':
                 self.data_storage.put(node_id, artifact.underlying_data)
-                # artifact.underlying_data.pandas_df = None
+                self.data_storage.record_access_frequency(node_id, node['meta_freq'])
+                # the content is only kept in the data storage, the graph keeps the columns (see retrieve_data)
                 node['data'] = copy.copy(artifact)
+                node['data'].underlying_data = artifact.underlying_data.schema()
 
             elif node['type'] == 'Feature':
                 # assert isinstance(artifact, Feature)
                 self.data_storage.put(node_id, artifact.underlying_data)
-                # artifact.underlying_data.pandas_series = None
+                self.data_storage.record_access_frequency(node_id, node['meta_freq'])
+                node['data'] = copy.copy(artifact)
+                node['data'].underlying_data = artifact.underlying_data.schema()
+            elif node['type'] in ExperimentGraph.OBJECT_TYPES:
+                self.data_storage.put_object(node_id, artifact.underlying_data)
                 node['data'] = copy.copy(artifact)
+                # the content is only kept in the data storage, so it is not pickled together with the graph
+                node['data'].underlying_data = None
             else:
                 node['data'] = copy.copy(artifact)
 
-            node['mat'] = True
+            self.set_materialized(node_id, True)
+            # only the id is logged, so the log does not keep the content of the artifact alive until the next save
+            self.log_change('materialize', node_id)
 
     def unmaterialize(self, node_id):
         if node_id not in self.graph:
@@ -475,20 +926,28 @@ class ExperimentGraph(BaseGraph):
             node = self.graph.nodes[node_id]
             if node['type'] == 'Dataset' or node['type'] == 'Feature':
                 self.data_storage.delete(node_id)
+            elif node['type'] in ExperimentGraph.OBJECT_TYPES:
+                self.data_storage.delete_object(node_id)
+                node['data'].remove_content()
             else:
                 node['data'].remove_content()
-            node['mat'] = False
+            self.set_materialized(node_id, False)
+            self.log_change('unmaterialize', node_id)
 
     def extend(self, workload):
         # make sure the workload graph is post processed, i.e., the model scores are added to the graph
         if not workload.post_processed:
             raise Exception('Workload is not post processed')
 
-        self.roots = list(set(self.roots + workload.roots))
+        self.workload_count += 1
+        new_roots = [r for r in workload.roots if r not in self.roots]
+        if new_roots:
+            self.roots = self.roots + new_roots
+            self.log_change('roots', self.roots)
 
         for node_id, node_attributes in workload.graph.nodes(data=True):
-            # Only artifacts which are computed should be updated
-            if node_attributes['data'].computed:
+            # Only artifacts which are computed should be updated, the released vertices are computed as well
+            if node_attributes['data'].computed or node_attributes.get('released', False):
                 self.add_node_to_experiment_graph(node_id, node_attributes)
                 self.compute_load_cost(node_id, node_attributes['data'])
 
@@ -504,41 +963,140 @@ class ExperimentGraph(BaseGraph):
 
         for s, d, data in workload.graph.edges(data=True):
             # TODO make a proper edge and node classes
-            # print s,d,data
+            # the edges that are already in the graph take the attributes of the latest execution (e.g., freq and
+            # execution_time)
             if data['executed']:
                 if s in self.graph.nodes and d in self.graph.nodes:
-                    self.graph.add_edge(s, d, **data)
-        import gc
-        gc.collect()
+                    self.add_graph_edge(s, d, self.edge_attributes(data))
+                    self.log_change('edge', s, d, self.graph.edges[s, d])
+
+    @staticmethod
+    def edge_attributes(workload_edge):
+        """
+        the attributes of an edge of the workload dag that are kept in the experiment graph. The arguments of the
+        operation (e.g., the model objects of the training operations) are not kept, the hash of the edge already
+        identifies them
+        """
+        return {k: v for k, v in workload_edge.items() if k != 'args'}
 
     def mock_extend(self, workload):
         self.roots = list(set(self.roots + workload.roots))
 
         for node_id, node_attributes in workload.graph.nodes(data=True):
             # self.add_node_to_experiment_graph(node_id, node_attributes)
-            self.graph.add_node(node_id, **node_attributes)
+            self.add_node(node_id, **node_attributes)
 
         for s, d, data in workload.graph.edges(data=True):
             if s in self.graph.nodes and d in self.graph.nodes:
-                self.graph.add_edge(s, d, **data)
+                self.add_graph_edge(s, d, data)
 
     def add_node_to_experiment_graph(self, node_id, node_attributes):
         if node_id not in self.graph.nodes:
-            eg_attributes = {}
-            for k, v in node_attributes.items():
-                if k != 'data':
-                    eg_attributes[k] = copy.deepcopy(v)
+            # the attributes (type, size, score, ...) are not modified by the workload dag after it is executed, so
+            # they are shared instead of copied
+            eg_attributes = {k: v for k, v in node_attributes.items() if k != 'data'}
             eg_attributes['data'] = None
             eg_attributes['meta_freq'] = 1
             eg_attributes['mat'] = False
-            self.graph.add_node(node_id, **eg_attributes)
+            eg_attributes['last_workload'] = self.workload_count
+            self.add_node(node_id, **eg_attributes)
+            self.restore_pruned_vertex(node_id)
         else:
             self.graph.nodes[node_id]['meta_freq'] += 1
+            self.graph.nodes[node_id]['last_workload'] = self.workload_count
+        self.log_change('node', node_id, self.graph.nodes[node_id])
+
+    def prune(self, horizon, max_potential=0.0):
+        """
+        removes the cold parts of the graph, i.e., the unmaterialized vertices without children that are only part of
+        one workload (meta_freq == 1), are not part of the last horizon workloads, and have a potential of at most
+        max_potential. Removing a vertex can make its parents prunable, so whole chains of cold vertices are removed.
+        The heuristics (recreation cost and potential) should be computed before pruning. The parents of the pruned
+        vertices keep the best potential of their pruned children (pruned_potential) and the graph keeps the
+        weighted costs and the scores of the pruned vertices, so the heuristics of the remaining vertices do not
+        change (see compute_recreation_cost and compute_vertex_potential)
+        :param horizon: number of the latest workloads whose vertices are kept
+        :param max_potential: vertices with a higher potential are kept
+        :return: number of the pruned vertices
+        """
+
+        def prunable(n):
+            d = self.graph.nodes[n]
+            return not d['root'] and not d['mat'] and d['meta_freq'] == 1 and self.graph.out_degree(n) == 0 and \
+                d.get('last_workload', 0) <= self.workload_count - horizon and 'potential' in d and \
+                'recreation_cost' in d and d['potential'] <= max_potential
+
+        candidates = deque(n for n in self.graph.nodes if prunable(n))
+        pruned = 0
+        while candidates:
+            node_id = candidates.popleft()
+            if node_id not in self.graph.nodes or not prunable(node_id):
+                continue
+            node = self.graph.nodes[node_id]
+            parents = list(self.graph.predecessors(node_id))
+            weighted_cost = 0.0 if node['size'] is None else \
+                node['meta_freq'] * node['recreation_cost'] / node['size']
+            # the score the vertex adds to the total potential, a terminal vertex without a positive potential
+            # does not add to it
+            score = node['potential'] if node['potential'] > 0 or 'pruned_potential' in node else 0.0
+            self.prune_vertex(node_id, weighted_cost, score, node['potential'])
+            pruned += 1
+            candidates.extend(parents)
+        return pruned
+
+    def prune_vertex(self, node_id, weighted_cost, score, potential):
+        # pruned vertex -> its contribution to the summaries and its parents, and parent -> its pruned children, so
+        # the contribution can be removed again when a workload adds the vertex back (see restore_pruned_vertex)
+        pruned_vertices = self.graph.graph.setdefault('pruned_vertices', {})
+        pruned_children = self.graph.graph.setdefault('pruned_children', {})
+        parents = list(self.graph.predecessors(node_id))
+        for parent in parents:
+            parent_node = self.graph.nodes[parent]
+            parent_node['pruned_potential'] = max(parent_node.get('pruned_potential', -1), potential)
+            pruned_children.setdefault(parent, set()).add(node_id)
+            self.log_change('node', parent, parent_node)
+        pruned_vertices[node_id] = (weighted_cost, score, potential, parents)
+        self.graph.graph['pruned_weighted_cost'] = self.graph.graph.get('pruned_weighted_cost', 0.0) + weighted_cost
+        self.graph.graph['pruned_score'] = self.graph.graph.get('pruned_score', 0.0) + score
+        self.remove_node(node_id)
+        self.log_change('prune', node_id, weighted_cost, score, potential)
+
+    def restore_pruned_vertex(self, node_id):
+        """
+        removes the contribution of a pruned vertex to the summaries of the pruned vertices (see prune_vertex), after
+        the vertex is added to the graph again. The vertex and its parents keep the best potential of their
+        remaining pruned children
+        """
+        pruned_vertices = self.graph.graph.get('pruned_vertices', {})
+        if node_id not in pruned_vertices:
+            return
+        weighted_cost, score, _, parents = pruned_vertices.pop(node_id)
+        self.graph.graph['pruned_weighted_cost'] -= weighted_cost
+        self.graph.graph['pruned_score'] -= score
+        pruned_children = self.graph.graph['pruned_children']
+        for parent in parents:
+            pruned_children[parent].discard(node_id)
+            if not pruned_children[parent]:
+                del pruned_children[parent]
+            if parent in self.graph.nodes:
+                self.update_pruned_potential(parent)
+        self.update_pruned_potential(node_id)
+
+    def update_pruned_potential(self, node_id):
+        node = self.graph.nodes[node_id]
+        children = self.graph.graph.get('pruned_children', {}).get(node_id)
+        if children:
+            pruned_vertices = self.graph.graph['pruned_vertices']
+            node['pruned_potential'] = max([-1] + [pruned_vertices[c][2] for c in children])
+        else:
+            node.pop('pruned_potential', None)
+        self.log_change('node', node_id, node)
 
     def compute_load_cost(self, node_id, artifact):
         """
-        Since using a profile to estimate the load cost gives us not accurate result, we actually add a node
-        compute its load cost and then remove it from the graph
+        estimates the load cost of a new vertex with the load cost model. As long as the model does not have enough
+        observations for the type of the vertex, we actually add a node compute its load cost and then remove it
+        from the graph, every such load is an observation for the model as well
         :param workload:
         :return:
         """
@@ -546,11 +1104,68 @@ class ExperimentGraph(BaseGraph):
         if not self.graph.has_node(node_id):
             raise Exception('Every vertex should be in Experiment Graph by now !!!')
 
-        if 'load_cost' not in self.graph.nodes[node_id]:
-            self.materialize(node_id, artifact)
-            start = datetime.now()
-            dummy = self.retrieve_data(node_id)
-            load_time = ((datetime.now() - start).microseconds / 1000.0)
-            self.unmaterialize(node_id)
-            del dummy
-            self.graph.nodes[node_id]['load_cost'] = load_time
+        node = self.graph.nodes[node_id]
+        if 'load_cost' not in node:
+            load_time = self.load_cost_model.estimate(node['type'], dtype_class(self.artifact_dtypes(artifact)),
+                                                      self.data_storage.storage_tier(), node['size'] or 0.0,
+                                                      self.column_count(artifact))
+            if load_time is None and artifact.computed:
+                # the temporary materialization is not a change of the history
+                self.suspend_change_log = True
+                self.materialize(node_id, artifact)
+                dummy = self.retrieve_data(node_id)
+                load_time = node['load_cost']
+                self.unmaterialize(node_id)
+                self.suspend_change_log = False
+                del dummy
+            else:
+                # the vertex keeps the artifact without its content, as if it was materialized and unmaterialized
+                node['data'] = copy.copy(artifact)
+                if node['type'] == 'Dataset' or node['type'] == 'Feature':
+                    node['data'].underlying_data = artifact.underlying_data.schema()
+                else:
+                    node['data'].remove_content()
+                if load_time is None:
+                    # only the vertices with estimated load costs are released (see WorkloadDag.releasable_vertices),
+                    # the vertex is not a materialization candidate until its load cost is measured
+                    node['data'].unmaterializable = True
+                    return
+            node['load_cost'] = load_time
+
+    def observe_load(self, node_id, tier, load_time):
+        """
+        adds a load of the vertex to the load cost model and updates the load cost of the vertex. The load cost is
+        the estimate of the model, which smooths the noise of single loads, or the observed load time as long as the
+        model does not have enough observations
+        :param tier: the storage tier of the vertex before it was loaded
+        :param load_time: in ms
+        """
+        node = self.graph.nodes[node_id]
+        if node['type'] in ExperimentGraph.OBJECT_TYPES:
+            dtypes = None
+        else:
+            dtypes = self.data_storage.get_dtypes(node_id)
+        features = (node['type'], dtype_class(dtypes), tier, node['size'] or 0.0, self.column_count(node['data']))
+        self.load_cost_model.observe(*(features + (load_time,)))
+        estimate = self.load_cost_model.estimate(*features)
+        node['load_cost'] = load_time if estimate is None else estimate
+        self.log_change('node', node_id, node)
+
+    @staticmethod
+    def artifact_dtypes(artifact):
+        underlying_data = artifact.underlying_data
+        if isinstance(underlying_data, (DataFrame, DataSeries)) and underlying_data.get_data() is None:
+            # the content of a released vertex is not available
+            return None
+        if isinstance(underlying_data, DataFrame):
+            return underlying_data.get_data().dtypes.tolist()
+        elif isinstance(underlying_data, DataSeries):
+            return [underlying_data.get_data().dtype]
+        return None
+
+    @staticmethod
+    def column_count(artifact):
+        underlying_data = artifact.underlying_data
+        if isinstance(underlying_data, DataFrame):
+            return len(underlying_data.get_column())
+        return 1
@@ -0,0 +1,48 @@
+"""
+Append-only log of the changes to an experiment graph, used for saving the history incrementally.
+An environment folder contains a snapshot (the graph, roots, and storage files written by save_history) and a log
+of the changes that happened after the snapshot. The load cost model is not logged, every save writes all of it. Every record is a tuple whose first element is the type of change:
+    ('node', node_id, attributes, data): a vertex is added or its attributes (e.g., meta_freq) are updated.
+        data is the artifact object without its content, it is only used for new vertices
+    ('edge', source, destination, attributes): an edge is added or updated
+    ('roots', roots): the roots of the graph
+    ('materialize', node_id, artifact): a vertex is materialized, artifact contains the content of the vertex, which
+        is read from the data storage when the log is written (see ExperimentGraph.pop_change_log)
+    ('unmaterialize', node_id): a vertex is unmaterialized
+    ('prune', node_id, weighted_cost, score, potential): a vertex is pruned (see ExperimentGraph.prune)
+Records are pickled one after the other, loading the history replays them in order on top of the snapshot.
+"""
+import os
+import pickle
+
+LOG_FILE = 'log'
+
+
+def log_path(environment_folder):
+    return os.path.join(environment_folder, LOG_FILE)
+
+
+def append_records(path, records):
+    with open(path, 'ab') as output:
+        for record in records:
+            pickle.dump(record, output, pickle.HIGHEST_PROTOCOL)
+
+
+def read_records(path):
+    records = []
+    with open(path, 'rb') as d_input:
+        while True:
+            try:
+                records.append(pickle.load(d_input))
+            except EOFError:
+                break
+    return records
+
+
+def truncate_log(path):
+    open(path, 'wb').close()
+
+
+def remove_log(path):
+    if os.path.exists(path):
+        os.remove(path)
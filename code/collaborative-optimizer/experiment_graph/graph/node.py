@@ -1,6 +1,7 @@
 import copy
 import hashlib
 import uuid
+import warnings
 from abc import abstractmethod
 from datetime import datetime
 from typing import List
@@ -455,7 +456,8 @@ class Dataset(Node):
         return self.generate_dataset_node('set_columns', {'columns': columns})
 
     def p_set_columns(self, columns):
-        df = self.get_materialized_data().copy()
+        # a shallow copy with its own column names, the columns are shared with the dataset (copy-on-write)
+        df = self.get_materialized_data().copy(deep=False)
         # self.execution_environment.data_storage.store_dataset(self.c_hash, df)
         # df.columns = columns
         return DataFrame(column_names=columns,
@@ -561,9 +563,10 @@ class Dataset(Node):
         return self.generate_dataset_node('copy')
 
     def p_copy(self):
+        # the copy shares the columns with the dataset until one of them is modified (copy-on-write)
         return DataFrame(column_names=self.get_column(),
                          column_hashes=self.get_column_hash(),
-                         pandas_df=self.underlying_data.pandas_df)
+                         pandas_df=self.underlying_data.pandas_df.copy(deep=False))
 
     def head(self, size=5):
         return self.generate_dataset_node('head', {'size': size})
@@ -821,7 +824,7 @@ class Dataset(Node):
         start = datetime.now()
         if warm_start:
             model.warm_start = True
-        model.fit(self.get_materialized_data())
+        model = self.execution_environment.fit_model(model, self.get_materialized_data())
         self.execution_environment.update_time(BenchmarkMetrics.MODEL_TRAINING,
                                                (datetime.now() - start).total_seconds())
         return model
@@ -1202,7 +1205,7 @@ class Feature(Node):
         start = datetime.now()
         if warm_start:
             model.warm_start = True
-        model.fit(self.get_materialized_data())
+        model = self.execution_environment.fit_model(model, self.get_materialized_data())
         self.execution_environment.update_time(BenchmarkMetrics.MODEL_TRAINING,
                                                (datetime.now() - start).total_seconds())
         return copy.deepcopy(model)
@@ -1494,9 +1497,11 @@ class SuperNode(Node):
         if warm_start:
             model.warm_start = True
         if custom_args is None:
-            model.fit(self.nodes[0].get_materialized_data(), self.nodes[1].get_materialized_data())
+            model = self.execution_environment.fit_model(model, self.nodes[0].get_materialized_data(),
+                                                         self.nodes[1].get_materialized_data())
         else:
-            model.fit(self.nodes[0].get_materialized_data(), self.nodes[1].get_materialized_data())
+            model = self.execution_environment.fit_model(model, self.nodes[0].get_materialized_data(),
+                                                         self.nodes[1].get_materialized_data())
         # update the model training time in the graph
         self.execution_environment.update_time(BenchmarkMetrics.MODEL_TRAINING,
                                                (datetime.now() - start).total_seconds())
@@ -1589,7 +1594,18 @@ class SuperNode(Node):
         c_names.append(col_names)
         c_hash = copy.copy(self.nodes[0].get_column_hash())
         c_hash.append(copy.copy(self.nodes[1].get_column_hash()))
-        data = pd.concat([self.nodes[0].get_materialized_data(), self.nodes[1].get_materialized_data()], axis=1)
+        d1 = self.nodes[0].get_materialized_data()
+        d2 = self.nodes[1].get_materialized_data()
+        if isinstance(d2, pd.Series) and d1.index.equals(d2.index):
+            # the new dataset shares the columns of the dataset (copy-on-write) and only the added column is new, so
+            # adding columns one at a time does not copy the dataset every time
+            data = d1.copy(deep=False)
+            with warnings.catch_warnings():
+                # every added column is a separate block of the frame
+                warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+                data.insert(len(c_names) - 1, col_names, d2, allow_duplicates=True)
+        else:
+            data = pd.concat([d1, d2], axis=1)
         data.columns = c_names
         # self.execution_environment.data_storage.store_dataset(c_hash, data)
         return DataFrame(column_names=c_names,
@@ -1617,12 +1633,13 @@ class SuperNode(Node):
         d1 = self.nodes[0].get_materialized_data()
         d2 = self.nodes[1].get_materialized_data()
 
-        temp = d1.copy()
-        temp[col_names] = d2
+        # the unchanged columns are shared with the dataset (copy-on-write)
+        data = d1.copy(deep=False)
+        data[col_names] = d2
         # self.execution_environment.data_storage.store_dataset(c_hashes, d1[c_names])
         return DataFrame(column_names=c_names,
                          column_hashes=c_hashes,
-                         pandas_df=d1[c_names])
+                         pandas_df=data)
 
     def p_corr_with(self):
         return self.nodes[0].get_materialized_data().corr(self.nodes[1].get_materialized_data())
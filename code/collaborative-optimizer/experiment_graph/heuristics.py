@@ -1,4 +1,11 @@
 import networkx as nx
+import numpy as np
+
+from experiment_graph.graph.compact_graph import CompactGraph
+
+# the attributes that compute_cost_and_potential reads from the snapshot
+HEURISTIC_ATTRIBUTES = ['type', 'root', 'size', 'meta_freq', 'score', 'pruned_potential']
+HEURISTIC_EDGE_ATTRIBUTES = ['execution_time']
 
 
 def compute_load_costs(graph, cost_profile):
@@ -15,7 +22,8 @@ def compute_recreation_cost(graph):
     :type graph: nx.DiGraph
     """
     recreation_costs = {node: -1 for node in graph.nodes}
-    total_weighted_cost = 0.0
+    # the weighted costs of the pruned vertices (see ExperimentGraph.prune) are still part of the normalization
+    total_weighted_cost = graph.graph.get('pruned_weighted_cost', 0.0)
     for n in nx.topological_sort(graph):
         if graph.nodes[n]['root']:
             recreation_costs[n] = 0
@@ -64,8 +72,11 @@ def compute_vertex_potential(graph):
                 potentials[node[0]] = node[1]['score']
         else:
             potentials[node[0]] = 0.0
-    total_score = 0.0  # for keeping track of the sum of score to compute the score for out of reach nodes
-    if len(ml_models) > 0:
+    # for keeping track of the sum of score to compute the score for out of reach nodes, including the scores of the
+    # pruned vertices (see ExperimentGraph.prune)
+    total_score = graph.graph.get('pruned_score', 0.0)
+    # the pruned vertices can be the only ones with a positive potential
+    if len(ml_models) > 0 or total_score > 0:
         # TODO so far the only edges going out of a model are the feature importance operation and score operation
         #  which has two levels
         for m in ml_models:
@@ -79,8 +90,9 @@ def compute_vertex_potential(graph):
                 # The node is a ml model, direct evaluation node or a direct test node
                 total_score += current_score
             else:
-                best_potential = -1
-                terminal = True
+                # a vertex whose children are pruned keeps the best potential of the pruned children
+                best_potential = graph.nodes[n].get('pruned_potential', -1)
+                terminal = 'pruned_potential' not in graph.nodes[n]
                 for _, destination in graph.out_edges(n):
                     terminal = False
                     neighbor_potential = potentials[destination]
@@ -103,5 +115,94 @@ def compute_vertex_potential(graph):
             n[1]['n_potential'] = 0
 
 
+def compute_cost_and_potential(graph, compact_graph=None):
+    """
+    computes the recreation cost and the potential of every vertex over a compact snapshot of the graph (see
+    compact_graph) and writes them back to the graph. The results are the same as compute_recreation_cost and
+    compute_vertex_potential
+    :type graph: nx.DiGraph
+    :param compact_graph: an up to date snapshot of the graph, at least the HEURISTIC_ATTRIBUTES and the
+                          HEURISTIC_EDGE_ATTRIBUTES (see ExperimentGraph.compact_snapshot), a new snapshot is built if
+                          it is None
+    :type compact_graph: CompactGraph
+    """
+    if compact_graph is None:
+        compact_graph = CompactGraph(graph)
+    compute_compact_recreation_cost(compact_graph)
+    compute_compact_vertex_potential(compact_graph)
+    compact_graph.write_back(graph, ['compute_cost', 'recreation_cost', 'n_recreation_cost', 'potential',
+                                     'n_potential'])
+
+
+def compute_compact_recreation_cost(compact_graph):
+    """
+    compute_recreation_cost over the arrays of the compact graph, the vertices of every topological level are
+    processed together
+    :type compact_graph: CompactGraph
+    """
+    vertex_count = len(compact_graph)
+    execution_time = compact_graph.edge_column('execution_time')
+    is_root = compact_graph.column('root') & compact_graph.defined('root')
+    recreation_costs = np.zeros(vertex_count)
+    compute_costs = np.zeros(vertex_count)
+    for level in compact_graph.topological_levels():
+        edges, sources, destinations = compact_graph.in_edges_of(level[~is_root[level]])
+        np.add.at(recreation_costs, destinations, recreation_costs[sources] + execution_time[edges])
+        np.add.at(compute_costs, destinations, execution_time[edges])
+
+    has_size = compact_graph.defined('size')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted_costs = np.where(has_size, compact_graph.column('meta_freq') * recreation_costs /
+                                  compact_graph.column('size'), 0.0)
+        total_weighted_cost = weighted_costs[~is_root].sum() + \
+            compact_graph.graph_attributes.get('pruned_weighted_cost', 0.0)
+        normalized_costs = np.where(has_size, weighted_costs / total_weighted_cost, 0.0)
+    compact_graph.vertex_attributes.set_column('compute_cost', compute_costs)
+    compact_graph.vertex_attributes.set_column('recreation_cost', recreation_costs)
+    compact_graph.vertex_attributes.set_column('n_recreation_cost', normalized_costs)
+
+
+def compute_compact_vertex_potential(compact_graph):
+    """
+    compute_vertex_potential over the arrays of the compact graph, the topological levels are processed in reverse
+    :type compact_graph: CompactGraph
+    """
+    vertex_count = len(compact_graph)
+    is_model = compact_graph.vertices_of_type('SK_Model')
+    potentials = np.where(is_model, compact_graph.column('score'), 0.0)
+    ml_models = np.flatnonzero(is_model & (potentials > 0.0))
+    total_score = compact_graph.graph_attributes.get('pruned_score', 0.0)
+    # the pruned vertices can be the only ones with a positive potential
+    if len(ml_models) > 0 or total_score > 0:
+        # the two levels after a model (e.g., the score and the evaluation) get the potential of the model, the
+        # models are processed one by one, since a model can be after another model
+        for m in ml_models:
+            for out in compact_graph.successors(m):
+                potentials[out] = potentials[m]
+                potentials[compact_graph.successors(out)] = potentials[m]
+        # a vertex whose children are pruned keeps the best potential of the pruned children
+        has_pruned = compact_graph.defined('pruned_potential')
+        best_potentials = np.where(has_pruned, compact_graph.column('pruned_potential'), -np.inf)
+        out_degree = np.diff(compact_graph.out_indptr)
+        for level in reversed(compact_graph.topological_levels()):
+            current = potentials[level]
+            total_score += current[current > 0].sum()
+            pending = level[current <= 0]
+            _, sources, destinations = compact_graph.out_edges(pending)
+            np.maximum.at(best_potentials, sources, potentials[destinations])
+            best = best_potentials[pending]
+            terminal = (out_degree[pending] == 0) & ~has_pruned[pending]
+            if np.any(~terminal & (best <= -1)):
+                raise Exception('something went wrong, a node has no neighbors and is not a terminal node')
+            potentials[pending] = np.where(terminal, 0.0, best)
+            total_score += best[~terminal].sum()
+    if total_score > 0:
+        compact_graph.vertex_attributes.set_column('potential', potentials)
+        compact_graph.vertex_attributes.set_column('n_potential', potentials / total_score)
+    else:
+        compact_graph.vertex_attributes.set_column('potential', np.zeros(vertex_count))
+        compact_graph.vertex_attributes.set_column('n_potential', np.zeros(vertex_count))
+
+
 def cost(graph, source, destination):
     return graph.edges[source, destination]['execution_time']
@@ -0,0 +1,76 @@
+"""
+Online model of the load cost (time in ms to retrieve an artifact from the data storage).
+The load cost is a linear function of the size (KB) and the number of columns of the artifact, fitted with least
+squares from the loads that are observed (see ExperimentGraph.retrieve_data). A separate function is fitted for every
+(type, dtype class, storage tier) group. Groups without enough observations fall back to the observations of all
+the artifacts of the same type and tier and then of the same type.
+"""
+import numpy as np
+
+# the kinds of numpy dtypes that are stored in plain buffers
+NUMERIC_KINDS = 'biufcmM'
+
+
+def dtype_class(dtypes):
+    """
+    :param dtypes: list of the dtypes of the columns of the artifact, None for artifacts that are not datasets or
+                   features (models, aggregates, ...)
+    :return: 'numeric' if all the columns are numeric, 'object' if at least one column is not, and 'blob' otherwise
+    """
+    if dtypes is None:
+        return 'blob'
+    if all(isinstance(d, np.dtype) and d.kind in NUMERIC_KINDS for d in dtypes):
+        return 'numeric'
+    return 'object'
+
+
+class LoadCostModel(object):
+    # number of observations a group needs before it is used for estimating
+    MIN_OBSERVATIONS = 3
+
+    def __init__(self):
+        # group -> [X^T X, X^T y, number of observations]
+        self.groups = {}
+
+    @staticmethod
+    def features(size, column_count):
+        return np.array([1.0, size, column_count])
+
+    @staticmethod
+    def groups_of(node_type, dtype_class_name, tier):
+        # from the most specific to the most general group
+        return [(node_type, dtype_class_name, tier), (node_type, None, tier), (node_type, None, None)]
+
+    def observe(self, node_type, dtype_class_name, tier, size, column_count, load_cost):
+        """
+        adds an observed load of an artifact to all of its groups
+        """
+        x = self.features(size, column_count)
+        for group in self.groups_of(node_type, dtype_class_name, tier):
+            if group not in self.groups:
+                self.groups[group] = [np.zeros((3, 3)), np.zeros(3), 0]
+            statistics = self.groups[group]
+            statistics[0] += np.outer(x, x)
+            statistics[1] += x * load_cost
+            statistics[2] += 1
+
+    def can_estimate(self, node_type):
+        """
+        :return: True if the load cost of every artifact of the type can be estimated, i.e., the most general group of
+                 the type has enough observations
+        """
+        statistics = self.groups.get((node_type, None, None))
+        return statistics is not None and statistics[2] >= self.MIN_OBSERVATIONS
+
+    def estimate(self, node_type, dtype_class_name, tier, size, column_count):
+        """
+        :return: the estimated load cost or None if none of the groups of the artifact has enough observations
+        """
+        x = self.features(size, column_count)
+        for group in self.groups_of(node_type, dtype_class_name, tier):
+            statistics = self.groups.get(group)
+            if statistics is not None and statistics[2] >= self.MIN_OBSERVATIONS:
+                # the minimum norm solution, the columns are collinear if, e.g., all the artifacts have one column
+                coefficients = np.linalg.lstsq(statistics[0], statistics[1], rcond=None)[0]
+                return max(0.0, float(x.dot(coefficients)))
+        return None
@@ -15,9 +15,13 @@ class Materializer(object):
         self.modify_graph = modify_graph
         self.alpha = alpha
 
-    def compute_rhos(self, e_graph, w_dag):
+    def compute_rhos(self, e_graph, w_dag, vertices=None):
+        """
+        :param vertices: if given, only the utility of these vertices is computed
+        """
         rhos = []
-        for node in e_graph.nodes(data=True):
+        nodes = e_graph.nodes(data=True) if vertices is None else ((v, e_graph.nodes[v]) for v in vertices)
+        for node in nodes:
             if node[1]['root']:
                 rho = float('inf')
 
@@ -78,9 +82,13 @@ class Materializer(object):
         # print 'should_materialize: {}'.format(should_materialize)
         for node_id, attributes in experiment_graph.graph.nodes(data=True):
             if node_id in should_materialize:
-                if not attributes['mat']:
+                # the roots are always selected, even the partially parsed ones (see ExecutionEnvironment.load) of this
+                # or an earlier workload, which are not materialized
+                if not attributes['mat'] and workload_dag.has_node(node_id):
                     artifact = workload_dag.graph.nodes[node_id]['data']
-                    experiment_graph.materialize(node_id=node_id, artifact=artifact)
+                    # the content of a released vertex (see WorkloadDag.releasable_vertices) is not available
+                    if not artifact.unmaterializable and artifact.computed:
+                        experiment_graph.materialize(node_id=node_id, artifact=artifact)
             else:
                 if attributes['mat']:
                     # print 'unmaterialize node {}'.format(node_id)
@@ -133,14 +141,14 @@ class TopNModelMaterializer(Materializer):
 
     def run(self, experiment_graph, workload_dag, verbose):
         graph = experiment_graph.graph
-        rhos = self.compute_rhos(graph, workload_dag.graph)
+        # only the models are candidates, so the utility of the other vertices is not computed
+        rhos = self.compute_rhos(graph, workload_dag.graph, experiment_graph.vertices_of_type('SK_Model'))
         materialization_candidates = self.get_root_nodes(graph)
 
         i = 0
         while rhos:
             top = rhos.pop(0)
-            if experiment_graph.graph.nodes[top.node_id]['type'] == 'SK_Model' and \
-                    experiment_graph.graph.nodes[top.node_id]['score'] > 0:
+            if experiment_graph.graph.nodes[top.node_id]['score'] > 0:
                 if i < self.n:
                     materialization_candidates.append(top.node_id)
                     i += 1
@@ -162,17 +170,11 @@ class OracleBestModelMaterializer(Materializer):
         graph = experiment_graph.graph
         materialization_candidates = self.get_root_nodes(graph)
 
-        best_model_score = 0
-        best_model_id = ''
-
-        current_model_mat = []
-        for n, d in graph.nodes(data=True):
-            if d['type'] == 'SK_Model' and d['score'] > 0:
-                if d['mat']:
-                    current_model_mat.append((n, d['score']))
-                if best_model_score < d['score']:
-                    best_model_score = d['score']
-                    best_model_id = n
+        best_models = experiment_graph.best_models(n=1, min_score=0)
+        best_model_id, best_model_score = best_models[0] if best_models else ('', 0)
+
+        materialized_models = experiment_graph.vertices_of_type('SK_Model', mat_only=True)
+        current_model_mat = [(n, graph.nodes[n]['score']) for n in materialized_models if graph.nodes[n]['score'] > 0]
         assert len(current_model_mat) <= 1
 
         if len(current_model_mat) == 1 and current_model_mat[0][1] >= best_model_score:
@@ -273,21 +275,28 @@ class StorageAwareMaterializer(Materializer):
         """
         current_size = 0.0
         all_columns = set()
+        # the storage manager reports the size of the columns inside its column store (e.g., compressed)
+        storage = experiment_graph.data_storage
         for node_id in materialization_candidates:
             node = experiment_graph.graph.nodes[node_id]
             if not node['mat']:
-                node = workload_dag.graph.nodes[node_id]
+                node = StorageAwareMaterializer.parsed_vertex(workload_dag, node_id)
+                if node is None:
+                    continue
                 if node['type'] == 'Dataset':
                     underlying_data = node['data'].underlying_data
-                    for column_hash in underlying_data.get_column_hash():
+                    for i, column_hash in enumerate(underlying_data.get_column_hash()):
                         if column_hash not in all_columns:
-                            current_size += underlying_data.column_sizes[column_hash]
+                            current_size += storage.column_storage_size(column_hash,
+                                                                        underlying_data.get_data().iloc[:, i],
+                                                                        underlying_data.column_sizes[column_hash])
                             all_columns.add(column_hash)
                 elif node['type'] == 'Feature':
                     underlying_data = node['data'].underlying_data
                     column_hash = underlying_data.get_column_hash()
                     if column_hash not in all_columns:
-                        current_size += underlying_data.get_size()
+                        current_size += storage.column_storage_size(column_hash, underlying_data.get_data(),
+                                                                    underlying_data.get_size())
                         all_columns.add(column_hash)
                 else:
                     current_size += node['size']
@@ -295,7 +304,9 @@ class StorageAwareMaterializer(Materializer):
         for rho in remaining_rhos:
             node = experiment_graph.graph.nodes[rho.node_id]
             if not node['mat']:
-                node = workload_dag.graph.nodes[rho.node_id]
+                node = StorageAwareMaterializer.parsed_vertex(workload_dag, rho.node_id)
+                if node is None:
+                    continue
                 if node['type'] == 'Feature':
                     underlying_data = node['data'].underlying_data
                     column_hash = underlying_data.get_column_hash()
@@ -309,6 +320,21 @@ class StorageAwareMaterializer(Materializer):
 
         return current_size
 
+    @staticmethod
+    def parsed_vertex(workload_dag, node_id):
+        """
+        returns the attributes of the vertex in the workload dag or None if its content is not available. The roots
+        are always candidates, even the lazy roots (see ExecutionEnvironment.load) that are not materialized, which
+        are not part of the workload dag in later workloads or are not parsed if their operations are reused
+        """
+        if not workload_dag.has_node(node_id):
+            return None
+        node = workload_dag.graph.nodes[node_id]
+        underlying_data = node['data'].underlying_data
+        if node['type'] in ['Dataset', 'Feature'] and underlying_data.get_data() is None:
+            return None
+        return node
+
 
 class HelixMaterializer(Materializer):
     """
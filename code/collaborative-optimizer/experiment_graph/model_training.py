@@ -0,0 +1,165 @@
+"""
+Fitting models in a pool of worker processes.
+The training data is not pickled to the workers. Every numeric column (and index) is copied once into a shared memory
+block and the worker builds the dataframe on top of the blocks, only the names of the blocks, the column names, and
+the non numeric columns are pickled. The fitted model is pickled back and becomes the result of the training edge as
+if it was fitted inline. Together with the parallel execution of the workload dag (see WorkloadDag.workers), the
+independent training edges of a workload are fitted at the same time.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+import pandas as pd
+
+# the kinds of numpy dtypes that are put into shared memory, other columns are pickled
+SHARED_KINDS = 'biufcmM'
+
+
+class SharedArray(object):
+    """
+    a numpy array inside a shared memory block, only the name, shape, and dtype of the block are pickled
+    """
+
+    def __init__(self, array):
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.name = self.memory.name
+        np.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)[...] = array
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['memory']
+        return state
+
+    def attach(self, memories):
+        """
+        :param memories: list of the attached blocks, they should be closed after the array is not used anymore
+        :return: the array on top of the shared memory block
+        """
+        memory = shared_memory.SharedMemory(name=self.name)
+        memories.append(memory)
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=memory.buf)
+
+    def release(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+def is_shared(values):
+    return isinstance(values, np.ndarray) and values.dtype.kind in SHARED_KINDS
+
+
+def share(data, arrays):
+    """
+    describes the data (a dataframe, series, or numpy array), where the numeric arrays are moved to shared memory
+    :param arrays: list that collects the created SharedArrays, the caller releases them after the training
+    :return: picklable description of the data, see attach
+    """
+    if isinstance(data, pd.DataFrame):
+        return 'frame', [share_values(data.iloc[:, i], arrays) for i in range(data.shape[1])], list(data.columns), \
+               share(data.index, arrays)
+    if isinstance(data, pd.Series):
+        return 'series', share_values(data, arrays), data.name, share(data.index, arrays)
+    if isinstance(data, pd.Index) and not isinstance(data, pd.RangeIndex):
+        return 'index', share_values(data, arrays), data.name
+    if is_shared(data):
+        shared_array = SharedArray(data)
+        arrays.append(shared_array)
+        return 'array', shared_array
+    return 'object', data
+
+
+def share_values(data, arrays):
+    """
+    describes the values of a series or an index, the values with extension dtypes (e.g., strings) are pickled
+    """
+    if isinstance(data.dtype, np.dtype) and data.dtype.kind in SHARED_KINDS:
+        return share(data.to_numpy(), arrays)
+    return 'object', data.array
+
+
+def attach(description, memories):
+    """
+    builds the data of a description created by share
+    :param memories: list that collects the attached shared memory blocks
+    """
+    kind = description[0]
+    if kind == 'frame':
+        _, columns, names, index = description
+        frame = pd.DataFrame({i: attach(c, memories) for i, c in enumerate(columns)}, index=attach(index, memories))
+        frame.columns = names
+        return frame
+    if kind == 'series':
+        _, values, name, index = description
+        return pd.Series(attach(values, memories), index=attach(index, memories), name=name, copy=False)
+    if kind == 'index':
+        _, values, name = description
+        return pd.Index(attach(values, memories), name=name, copy=False)
+    if kind == 'array':
+        return description[1].attach(memories)
+    return description[1]
+
+
+def fit_shared(model, shared_x, shared_y):
+    """
+    fits the model in a worker process on the data in shared memory
+    :return: the fitted model
+    """
+    memories = []
+    try:
+        x = attach(shared_x, memories)
+        if shared_y is None:
+            model.fit(x)
+        else:
+            model.fit(x, attach(shared_y, memories))
+        del x
+        return model
+    finally:
+        for memory in memories:
+            try:
+                memory.close()
+            except BufferError:
+                # the model keeps a view of the training data, the block is closed when the view is removed
+                pass
+
+
+class ModelTrainingPool(object):
+    def __init__(self, processes):
+        """
+        :param processes: number of worker processes, the processes are started with the first fit
+        """
+        self.processes = processes
+        self.executor = None
+        # the threads of the workload dag fit their models at the same time, only one of them creates the executor
+        self.executor_lock = threading.Lock()
+
+    def get_executor(self):
+        with self.executor_lock:
+            if self.executor is None:
+                # the workers are spawned, forking a process that runs the threads of the workload dag is not safe
+                self.executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context('spawn'))
+            return self.executor
+
+    def fit(self, model, x, y=None):
+        """
+        fits the model in one of the worker processes and waits for the result
+        :return: the fitted model, a copy of the given model
+        """
+        executor = self.get_executor()
+        arrays = []
+        try:
+            shared_x = share(x, arrays)
+            shared_y = None if y is None else share(y, arrays)
+            return executor.submit(fit_shared, model, shared_x, shared_y).result()
+        finally:
+            for shared_array in arrays:
+                shared_array.release()
+
+    def shutdown(self):
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
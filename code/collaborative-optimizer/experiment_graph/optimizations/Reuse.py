@@ -72,7 +72,14 @@ class Reuse:
             # the node exists but it is not materialized
             return 1
 
-    def check_for_warmstarting(self, history, workload, all_models):
+    def check_for_warmstarting(self, experiment_graph, workload, all_models):
+        """
+        the edges of the experiment graph do not keep the model objects of the training operations, the candidates
+        for warmstarting are the materialized models of the same type that are trained on the same vertex, which are
+        found with the model index of the experiment graph and loaded from the experiment graph
+        :type experiment_graph: ExperimentGraph
+        """
+        history = experiment_graph.graph
         warmstarting_candidates = set()
         for m in all_models:
             training_datasets = list(workload.predecessors(m))
@@ -88,24 +95,18 @@ class Reuse:
                     continue
                 if not workload_training_edge['should_warmstart']:
                     continue
-                results = set()
-                for _, hm, history_training_edge in history.out_edges(training_dataset, data=True):
-                    history_node = history.nodes[hm]
-                    if history_node['type'] == 'SK_Model':
-                        if not history_training_edge['warm_startable']:
-                            continue
-                        # the condition for warmstarting is that the models are of the same type
-                        elif history_training_edge['args']['model'].__class__.__name__ == \
-                                workload_training_edge['args']['model'].__class__.__name__:
-                            results.add((history_training_edge['args']['model'], history_node['score']))
-                if results:
-                    best_model = -1
-                    best_score = -1
-                    for model, score in results:
-                        if score > best_score:
-                            best_score = score
-                            best_model = model
-                    model_to_warmstart = copy.deepcopy(best_model)
+                # the condition for warmstarting is that the models are of the same type
+                model_class = workload_training_edge['args']['model'].__class__.__name__
+                best_model = -1
+                best_score = -1
+                for hm in experiment_graph.models_trained_on(training_dataset, model_class, mat_only=True):
+                    if not history.edges[training_dataset, hm]['warm_startable']:
+                        continue
+                    if history.nodes[hm]['score'] > best_score:
+                        best_score = history.nodes[hm]['score']
+                        best_model = hm
+                if best_model != -1:
+                    model_to_warmstart = copy.deepcopy(experiment_graph.retrieve_data(best_model))
                     model_to_warmstart.random_state = workload_training_edge['random_state']
                     warmstarting_candidates.add((training_dataset, m, model_to_warmstart))
         return warmstarting_candidates
@@ -142,7 +143,7 @@ class AllMaterializedReuse(Reuse):
                                                                                     e_graph=history.graph,
                                                                                     verbose=verbose)
 
-        warmstarting_candidates = self.check_for_warmstarting(history.graph, workload_subgraph, all_models)
+        warmstarting_candidates = self.check_for_warmstarting(history, workload_subgraph, all_models)
         if verbose == 1:
             print('materialized_vertices: {}'.format(materialized_vertices))
             print('warmstarting_candidates: {}'.format(warmstarting_candidates))
@@ -195,7 +196,7 @@ class LinearTimeReuse(Reuse):
             to_warmstart=to_warmstart,
             verbose=verbose)
 
-        warmstarting_candidates = self.check_for_warmstarting(history.graph, workload_subgraph, to_warmstart)
+        warmstarting_candidates = self.check_for_warmstarting(history, workload_subgraph, to_warmstart)
         if verbose == 1:
             print('materialized_vertices: {}'.format(materialized_vertices))
             print('warmstarting_candidates: {}'.format(warmstarting_candidates))
@@ -407,7 +408,7 @@ class BottomUpReuse(Reuse):
         materialized_vertices, execution_vertices, model_candidates = self.reverse_bfs(terminal=vertex,
                                                                                        workload_subgraph=e_subgraph,
                                                                                        history=history.graph)
-        warmstarting_candidates = self.check_for_warmstarting(history.graph, e_subgraph, model_candidates)
+        warmstarting_candidates = self.check_for_warmstarting(history, e_subgraph, model_candidates)
         return materialized_vertices, execution_vertices, warmstarting_candidates
 
     def reverse_bfs(self, terminal, workload_subgraph, history):
@@ -3,9 +3,12 @@ The CollaborativeScheduler module performs the scheduling and Reuse
 It receives the workload execution graph and the historical execution graph and a reuse algorirthm and
 optimizes the workload execution graph and returns the scheduled execution path
 """
+import copy
 from abc import abstractmethod
 from datetime import datetime
 
+import pandas as pd
+
 from experiment_graph.optimizations.Reuse import Reuse
 from experiment_graph.graph.graph_representations import ExperimentGraph
 from experiment_graph.graph.graph_representations import WorkloadDag
@@ -13,6 +16,8 @@ from experiment_graph.graph.graph_representations import WorkloadDag
 
 class CollaborativeScheduler:
     NAME = 'BASE_SCHEDULER'
+    # operations that only need a subset of the columns of their input dataset
+    PROJECTION_OPERATIONS = ['p_project', 'p_drop', 'p_select_dtypes']
 
     def __init__(self, reuse_type='fast-bottomup'):
         # dictionary for storing pair of materialized nodes between the workload and history graph
@@ -57,9 +62,104 @@ class CollaborativeScheduler:
 
         workload_node['data'].computed = True
         workload_node['data'].size = size
-        workload_node['size'] = size
+        workload_dag.set_size(node_id, size)
         workload_node['data'].underlying_data = underlying_data
 
+    @staticmethod
+    def find_projection_only_vertices(workload_dag, experiment_graph, vertex, materialized_vertices,
+                                      execution_vertices):
+        """
+        finds the materialized datasets that in the execution path are only used by projections (project, drop, and
+        select_dtypes). Such datasets do not have to be loaded completely, instead, every projection is computed
+        from a partial load of the dataset
+        :type workload_dag: WorkloadDag
+        :type experiment_graph: ExperimentGraph
+        :return: dictionary of {materialized dataset: [children computed by projections]}
+        """
+        projection_only = {}
+        for m in materialized_vertices:
+            if m == vertex or experiment_graph.graph.nodes[m]['type'] != 'Dataset':
+                continue
+            children = [c for c in workload_dag.graph.successors(m) if c in execution_vertices]
+            if not children:
+                continue
+            is_projection_only = True
+            for c in children:
+                if workload_dag.graph.edges[m, c]['oper'] not in CollaborativeScheduler.PROJECTION_OPERATIONS \
+                        or workload_dag.graph.nodes[c]['data'].computed or c in materialized_vertices:
+                    is_projection_only = False
+                    break
+            if is_projection_only:
+                projection_only[m] = children
+        return projection_only
+
+    @staticmethod
+    def projected_columns(experiment_graph, node_id, edge):
+        """
+        returns the names of the columns of the materialized dataset that the projection edge needs
+        :type experiment_graph: ExperimentGraph
+        """
+        all_columns = experiment_graph.graph.nodes[node_id]['data'].underlying_data.get_column()
+        args = edge['args']
+        if edge['oper'] == 'p_project':
+            columns = args['columns'] if isinstance(args['columns'], list) else [args['columns']]
+            # keep the order of the columns and load every column once
+            return list(dict.fromkeys(columns))
+        elif edge['oper'] == 'p_drop':
+            dropped = [args['columns']] if isinstance(args['columns'], str) else args['columns']
+            return [c for c in all_columns if c not in dropped]
+        else:
+            # an empty dataframe with the same dtypes for finding the columns selected by select_dtypes
+            dtypes = experiment_graph.get_dtypes(node_id)
+            empty = pd.DataFrame({i: pd.Series(dtype=dtypes[i]) for i in range(len(dtypes))})
+            return [all_columns[i] for i in empty.select_dtypes(args['data_type']).columns]
+
+    @staticmethod
+    def compute_from_partial_load(workload_dag, experiment_graph, node_id, children):
+        """
+        computes the children of the materialized dataset, where every child only loads the columns it needs from
+        the experiment graph. The dataset itself is not loaded into the workload dag
+        :type workload_dag: WorkloadDag
+        :type experiment_graph: ExperimentGraph
+        """
+        for c in children:
+            edge = workload_dag.graph.edges[node_id, c]
+            partial_node = copy.copy(workload_dag.graph.nodes[node_id]['data'])
+            partial_node.underlying_data = experiment_graph.retrieve_data(
+                node_id, columns=CollaborativeScheduler.projected_columns(experiment_graph, node_id, edge))
+            partial_node.computed = True
+
+            start_time = datetime.now()
+            child = workload_dag.graph.nodes[c]
+            child['data'].underlying_data = workload_dag.compute_next({'data': partial_node}, edge)
+            child['data'].computed = True
+            edge['execution_time'] = (datetime.now() - start_time).total_seconds() * 1000.0
+            edge['executed'] = True
+
+    @staticmethod
+    def load_lazy_roots(workload_dag, subgraph, vertex):
+        """
+        parses the columns of the lazy roots (see ExecutionEnvironment.load) that the execution subgraph uses. A root
+        that is only used by projections is parsed for the projected columns, a root that is used by any other
+        operation or is the requested vertex itself is parsed completely
+        :type workload_dag: WorkloadDag
+        :param vertex: the requested vertex
+        """
+        for r in workload_dag.roots:
+            node = workload_dag.graph.nodes[r]
+            if r not in subgraph or not node.get('lazy', False):
+                continue
+            # the children that are already computed (e.g., loaded from the experiment graph) do not need the root
+            children = [c for c in subgraph.successors(r) if not workload_dag.graph.nodes[c]['data'].computed]
+            if r == vertex or any(workload_dag.graph.edges[r, c]['oper'] != 'p_project' for c in children):
+                node['data'].execution_environment.load_root_columns(r)
+            elif children:
+                columns = []
+                for c in children:
+                    projected = workload_dag.graph.edges[r, c]['args']['columns']
+                    columns.extend(projected if isinstance(projected, list) else [projected])
+                node['data'].execution_environment.load_root_columns(r, columns)
+
     @staticmethod
     def get_scheduler(optimizer_type, reuse_type):
         optimizer_type = optimizer_type.upper()
@@ -85,6 +185,7 @@ class HashBasedCollaborativeScheduler(CollaborativeScheduler):
             workload_subgraph = workload.compute_execution_subgraph(v_id)
             reuse_optimization = 0
 
+        self.load_lazy_roots(workload, workload_subgraph, v_id)
         final_schedule = workload.compute_result_with_subgraph(workload_subgraph)
         if verbose == 1:
             schedule_length = len(final_schedule)
@@ -118,8 +219,15 @@ class HashBasedCollaborativeScheduler(CollaborativeScheduler):
                 history=history,
                 verbose=verbose)
         reuse_time = (datetime.now() - start).total_seconds()
+        projection_only = self.find_projection_only_vertices(workload, history, vertex, materialized_vertices,
+                                                             execution_vertices)
         for m in materialized_vertices:
-            self.retrieve_from_history(workload, history, m)
+            if m in projection_only:
+                self.compute_from_partial_load(workload, history, m, projection_only[m])
+            else:
+                self.retrieve_from_history(workload, history, m)
+        # the children of the partially loaded datasets are computed, the datasets are not needed anymore
+        execution_vertices = set(execution_vertices).difference(projection_only.keys())
 
         for source, destination, model in warmstarting_candidates:
             workload.graph.edges[source, destination]['args']['model'] = model
@@ -0,0 +1,194 @@
+"""
+Lightweight encodings for single columns (pandas Series) in the deduplicated column store.
+encode_column tries every codec that applies to the column and keeps the smallest encoding:
+    bitpack: boolean columns, 8 values per byte (e.g., the result of isnull, notna, and one-hot encoding)
+    dict: low cardinality non-numeric columns, stored as integer codes and the distinct values
+    rle: numeric columns with long runs of the same value, stored as run values and run lengths
+    zlib/lzma: any other numeric column, compressed with the given stdlib codec
+If no codec makes the column smaller, the column is kept as it is.
+"""
+import lzma
+import zlib
+
+import numpy as np
+import pandas as pd
+
+AS_KB = 1024.0
+
+# a non-numeric column is dictionary encoded only if it has at most this ratio of distinct values
+DICT_MAX_DISTINCT_RATIO = 0.5
+# a numeric column is run-length encoded only if it has at most this ratio of runs
+RLE_MAX_RUN_RATIO = 0.25
+
+STDLIB_CODECS = {'zlib': (zlib.compress, zlib.decompress), 'lzma': (lzma.compress, lzma.decompress)}
+
+
+class EncodedColumn(object):
+    def __init__(self, codec, payload, length, dtype, index, name, size):
+        """
+        :param codec: name of the codec
+        :param payload: codec specific content
+        :param length: number of values in the column
+        :param dtype: dtype of the original column
+        :param index: index of the original column
+        :param name: name of the original column
+        :param size: size of the encoded values in KB
+        """
+        self.codec = codec
+        self.payload = payload
+        self.length = length
+        self.dtype = dtype
+        self.index = index
+        self.name = name
+        self.size = size
+
+
+def column_size(data_series):
+    return data_series.memory_usage(index=False, deep=True) / AS_KB
+
+
+def is_numeric(data_series):
+    return isinstance(data_series.dtype, np.dtype) and data_series.dtype.kind in 'iufcmM'
+
+
+def is_boolean(data_series):
+    return isinstance(data_series.dtype, np.dtype) and data_series.dtype.kind == 'b'
+
+
+def smallest_int_type(max_value):
+    for int_type in [np.int8, np.int16, np.int32]:
+        if max_value < np.iinfo(int_type).max:
+            return int_type
+    return np.int64
+
+
+def encode_bitpack(data_series):
+    packed = np.packbits(data_series.to_numpy())
+    return packed, packed.nbytes / AS_KB
+
+
+def decode_bitpack(encoded):
+    return np.unpackbits(encoded.payload, count=encoded.length).astype(bool)
+
+
+def encode_dict(data_series):
+    codes, uniques = pd.factorize(data_series)
+    if len(uniques) > DICT_MAX_DISTINCT_RATIO * len(data_series):
+        return None, None
+    codes = codes.astype(smallest_int_type(len(uniques)))
+    uniques = pd.Index(uniques)
+    return (codes, uniques), (codes.nbytes + uniques.memory_usage(deep=True)) / AS_KB
+
+
+def decode_dict(encoded):
+    codes, uniques = encoded.payload
+    # missing values have the code -1
+    return pd.Categorical.from_codes(codes, categories=uniques)
+
+
+def bit_patterns(values):
+    """
+    views every value as a row of unsigned integers of the same size, e.g., one uint64 for float64 and two for
+    complex128
+    """
+    values = np.ascontiguousarray(values)
+    for unsigned in [np.uint64, np.uint32, np.uint16, np.uint8]:
+        if values.dtype.itemsize % np.dtype(unsigned).itemsize == 0:
+            return values.view(unsigned).reshape(len(values), -1)
+
+
+def encode_rle(data_series):
+    values = data_series.to_numpy()
+    if len(values) == 0:
+        return None, None
+    if values.dtype.kind in 'fc':
+        # the floats are compared by their bit patterns, so -0.0 and 0.0 are different runs and consecutive NaNs
+        # belong to the same run
+        bits = bit_patterns(values)
+        different = (bits[1:] != bits[:-1]).any(axis=1)
+    else:
+        different = values[1:] != values[:-1]
+    run_starts = np.concatenate([[0], np.flatnonzero(different) + 1])
+    if len(run_starts) > RLE_MAX_RUN_RATIO * len(values):
+        return None, None
+    run_values = values[run_starts]
+    run_lengths = np.diff(np.append(run_starts, len(values))).astype(np.int32)
+    return (run_values, run_lengths), (run_values.nbytes + run_lengths.nbytes) / AS_KB
+
+
+def decode_rle(encoded):
+    run_values, run_lengths = encoded.payload
+    return np.repeat(run_values, run_lengths)
+
+
+def stdlib_encoder(codec):
+    compress = STDLIB_CODECS[codec][0]
+
+    def encode(data_series):
+        values = np.ascontiguousarray(data_series.to_numpy())
+        payload = compress(values.tobytes())
+        return payload, len(payload) / AS_KB
+
+    return encode
+
+
+def stdlib_decoder(codec):
+    decompress = STDLIB_CODECS[codec][1]
+
+    def decode(encoded):
+        return np.frombuffer(decompress(encoded.payload), dtype=encoded.dtype, count=encoded.length)
+
+    return decode
+
+
+def applicable_codecs(data_series, stdlib_codec):
+    if is_boolean(data_series):
+        return [('bitpack', encode_bitpack)]
+    elif is_numeric(data_series):
+        return [('rle', encode_rle), (stdlib_codec, stdlib_encoder(stdlib_codec))]
+    else:
+        return [('dict', encode_dict)]
+
+
+def encode_column(data_series, stdlib_codec='zlib'):
+    """
+    encodes the column with the codec that results in the smallest size
+    :type data_series: pd.Series
+    :param stdlib_codec: 'zlib' or 'lzma'
+    :return: EncodedColumn or the original column if no codec reduces its size
+    """
+    if stdlib_codec not in STDLIB_CODECS:
+        raise Exception('Unknown codec: {}'.format(stdlib_codec))
+    best_codec, best_payload, best_size = None, None, column_size(data_series)
+    for codec, encoder in applicable_codecs(data_series, stdlib_codec):
+        payload, size = encoder(data_series)
+        if payload is not None and size < best_size:
+            best_codec, best_payload, best_size = codec, payload, size
+    if best_codec is None:
+        return data_series
+    return EncodedColumn(best_codec, best_payload, len(data_series), data_series.dtype, data_series.index,
+                         data_series.name, best_size)
+
+
+DECODERS = {'bitpack': decode_bitpack, 'dict': decode_dict, 'rle': decode_rle, 'zlib': stdlib_decoder('zlib'),
+            'lzma': stdlib_decoder('lzma')}
+
+
+def decode_column(encoded):
+    """
+    :param encoded: EncodedColumn or a column that was kept as it is
+    :rtype: pd.Series
+    """
+    if not isinstance(encoded, EncodedColumn):
+        return encoded
+    values = DECODERS[encoded.codec](encoded)
+    data_series = pd.Series(values, index=encoded.index, name=encoded.name, copy=False)
+    if data_series.dtype != encoded.dtype:
+        data_series = data_series.astype(encoded.dtype)
+    return data_series
+
+
+def encoded_size(encoded):
+    if isinstance(encoded, EncodedColumn):
+        return encoded.size
+    return column_size(encoded)
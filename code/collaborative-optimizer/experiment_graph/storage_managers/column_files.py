@@ -0,0 +1,130 @@
+"""
+Helpers for keeping single columns (pandas Series) in binary files.
+Columns with a plain numpy dtype (numeric, boolean, datetime and timedelta) are written as .npy files and are
+memory-mapped when they are read back. Every other column (strings, categories, nullable extension types, ...)
+is pickled.
+The index of the column is stored next to it. A RangeIndex is only stored as (start, stop, step).
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+MEMORY_MAPPABLE_KINDS = 'biufcmM'
+
+
+class ColumnFile(object):
+    """
+    describes where and how a column is stored on disk
+    """
+
+    def __init__(self, values_path, index, name):
+        """
+        :param values_path: path of the file containing the values of the column (.npy or .pkl)
+        :param index: either a (start, stop, step) tuple for range indices or the path of the index file
+        :param name: name of the series
+        """
+        self.values_path = values_path
+        self.index = index
+        self.name = name
+
+    def paths(self):
+        if isinstance(self.index, tuple):
+            return [self.values_path]
+        else:
+            return [self.values_path, self.index]
+
+
+def is_memory_mappable(values):
+    return isinstance(values.dtype, np.dtype) and values.dtype.kind in MEMORY_MAPPABLE_KINDS
+
+
+def write_array(path_prefix, values):
+    """
+    writes the values either as a .npy file (if possible) or as a pickle file and returns the path of the file
+    """
+    if is_memory_mappable(values):
+        path = path_prefix + '.npy'
+        np.save(path, np.ascontiguousarray(np.asarray(values)), allow_pickle=False)
+    else:
+        path = path_prefix + '.pkl'
+        with open(path, 'wb') as output:
+            pickle.dump(values, output, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def read_array(path, mmap_mode='r'):
+    if path.endswith('.npy'):
+        values = np.load(path, mmap_mode=mmap_mode)
+        # a plain ndarray view on the memory-mapped file, so operations on the column return normal arrays
+        return values.view(np.ndarray) if isinstance(values, np.memmap) else values
+    else:
+        with open(path, 'rb') as d_input:
+            return pickle.load(d_input)
+
+
+def write_column_file(folder, column_hash, data_series):
+    """
+    :type data_series: pd.Series
+    :rtype: ColumnFile
+    """
+    path_prefix = os.path.join(folder, column_hash)
+    index = data_series.index
+    if isinstance(index, pd.RangeIndex):
+        index_location = (index.start, index.stop, index.step)
+    else:
+        index_location = write_array(path_prefix + '.index', index)
+
+    if is_memory_mappable(data_series):
+        values_path = write_array(path_prefix, data_series.to_numpy())
+    else:
+        # extension types (e.g., categorical) are stored together with their dtype
+        values_path = write_array(path_prefix, data_series.array)
+    return ColumnFile(values_path, index_location, data_series.name)
+
+
+def read_column_file(column_file):
+    """
+    :type column_file: ColumnFile
+    :rtype: pd.Series
+    """
+    if isinstance(column_file.index, tuple):
+        index = pd.RangeIndex(*column_file.index)
+    else:
+        index = pd.Index(read_array(column_file.index, mmap_mode=None))
+    values = read_array(column_file.values_path)
+    return pd.Series(values, index=index, name=column_file.name, copy=False)
+
+
+def remove_column_file(column_file):
+    for path in column_file.paths():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class EncodedColumnFile(object):
+    """
+    describes where an encoded column (see column_codecs) is stored on disk, encoded columns are pickled as they are
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def paths(self):
+        return [self.path]
+
+
+def write_encoded_column_file(folder, column_hash, encoded_column):
+    """
+    :rtype: EncodedColumnFile
+    """
+    path = os.path.join(folder, column_hash + '.enc.pkl')
+    with open(path, 'wb') as output:
+        pickle.dump(encoded_column, output, pickle.HIGHEST_PROTOCOL)
+    return EncodedColumnFile(path)
+
+
+def read_encoded_column_file(encoded_column_file):
+    with open(encoded_column_file.path, 'rb') as d_input:
+        return pickle.load(d_input)
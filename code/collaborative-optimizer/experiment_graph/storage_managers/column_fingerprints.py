@@ -0,0 +1,45 @@
+"""
+Content fingerprints for single columns (pandas Series).
+Two columns have the same fingerprint if they have the same dtype, the same index, and byte-identical values.
+The name of the column is not part of the fingerprint.
+Columns with a plain numpy dtype are hashed directly from their buffer, every other column (strings, categories,
+nullable extension types, ...) is first hashed row by row with pandas' vectorized hash_pandas_object.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from experiment_graph.storage_managers.column_files import is_memory_mappable
+
+DIGEST_SIZE = 16
+
+
+def update_with_values(digest, values):
+    if is_memory_mappable(values):
+        values = np.ascontiguousarray(np.asarray(values))
+        if values.dtype.kind in 'mM':
+            values = values.view(np.int64)
+        digest.update(memoryview(values).cast('B'))
+    else:
+        digest.update(memoryview(pd.util.hash_pandas_object(values, index=False).to_numpy()).cast('B'))
+
+
+def fingerprint_column(data_series):
+    """
+    :type data_series: pd.Series
+    :return: hex digest of the dtype, index, and values of the column
+    """
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(repr(data_series.dtype).encode('utf-8'))
+    digest.update(str(len(data_series)).encode('utf-8'))
+
+    index = data_series.index
+    if isinstance(index, pd.RangeIndex):
+        digest.update('range({},{},{})'.format(index.start, index.stop, index.step).encode('utf-8'))
+    else:
+        digest.update(repr(index.dtype).encode('utf-8'))
+        update_with_values(digest, pd.Series(index, copy=False))
+
+    update_with_values(digest, data_series)
+    return digest.hexdigest()
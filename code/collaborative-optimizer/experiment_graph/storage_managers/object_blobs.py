@@ -0,0 +1,146 @@
+"""
+Serialized blobs for the artifacts that are not stored column by column (models, aggregates, evaluations, ...).
+An object is pickled with protocol 5, the large binary buffers inside the object (e.g., numpy arrays of a fitted
+model) are kept out-of-band, next to the pickle payload, so they can be written to disk as they are and
+memory-mapped when the object is loaded again.
+The content hash covers the payload and the buffers, two objects with the same content (e.g., identical fitted
+models) have the same content hash.
+"""
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+AS_KB = 1024.0
+PICKLE_PROTOCOL = 5
+# buffers are aligned inside the buffer file, so the memory-mapped arrays are aligned as well
+BUFFER_ALIGNMENT = 64
+
+
+class ObjectBlob(object):
+    def __init__(self, payload, buffers):
+        """
+        :param payload: pickled object (bytes)
+        :param buffers: list of the out-of-band buffers (bytes)
+        """
+        self.payload = payload
+        self.buffers = buffers
+
+    def size(self):
+        return (len(self.payload) + sum(len(b) for b in self.buffers)) / AS_KB
+
+
+class ObjectFile(object):
+    """
+    describes where a blob is stored on disk
+    """
+
+    def __init__(self, payload_path, buffers_path, offsets, size):
+        """
+        :param payload_path: path of the file containing the pickle payload
+        :param buffers_path: path of the file containing the out-of-band buffers (None if there are no buffers)
+        :param offsets: list of (start, length) of every buffer inside the buffer file
+        :param size: size of the blob in KB
+        """
+        self.payload_path = payload_path
+        self.buffers_path = buffers_path
+        self.offsets = offsets
+        self.size = size
+
+    def paths(self):
+        if self.buffers_path is None:
+            return [self.payload_path]
+        else:
+            return [self.payload_path, self.buffers_path]
+
+
+def serialize_object(obj):
+    """
+    :rtype: ObjectBlob
+    """
+    pickle_buffers = []
+    payload = pickle.dumps(obj, protocol=PICKLE_PROTOCOL, buffer_callback=pickle_buffers.append)
+    return ObjectBlob(payload, [b.raw().tobytes() for b in pickle_buffers])
+
+
+def content_hash(blob):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(blob.payload)
+    for b in blob.buffers:
+        digest.update(len(b).to_bytes(8, 'little'))
+        digest.update(b)
+    return digest.hexdigest()
+
+
+def deserialize_object(blob):
+    """
+    the arrays inside the object are read-only views on the buffers of the blob, the blob is not copied
+    :type blob: ObjectBlob
+    """
+    return pickle.loads(blob.payload, buffers=[memoryview(b) for b in blob.buffers])
+
+
+def write_object_file(folder, key, blob):
+    """
+    :type blob: ObjectBlob
+    :rtype: ObjectFile
+    """
+    path_prefix = os.path.join(folder, key)
+    payload_path = path_prefix + '.obj.pkl'
+    with open(payload_path, 'wb') as output:
+        output.write(blob.payload)
+
+    if not blob.buffers:
+        return ObjectFile(payload_path, None, [], blob.size())
+    buffers_path = path_prefix + '.obj.buffers'
+    offsets = []
+    position = 0
+    with open(buffers_path, 'wb') as output:
+        for b in blob.buffers:
+            padding = -position % BUFFER_ALIGNMENT
+            output.write(b'\0' * padding)
+            position += padding
+            offsets.append((position, len(b)))
+            output.write(b)
+            position += len(b)
+    return ObjectFile(payload_path, buffers_path, offsets, blob.size())
+
+
+def read_object_file(object_file):
+    """
+    the out-of-band buffers are memory-mapped in copy-on-write mode, modifying the loaded object does not change the
+    file on disk
+    :type object_file: ObjectFile
+    """
+    with open(object_file.payload_path, 'rb') as d_input:
+        payload = d_input.read()
+    if object_file.buffers_path is not None and os.path.getsize(object_file.buffers_path) > 0:
+        mapped = np.memmap(object_file.buffers_path, dtype=np.uint8, mode='c')
+        buffers = [memoryview(mapped[start:start + length]) for start, length in object_file.offsets]
+    else:
+        buffers = [b'' for _ in object_file.offsets]
+    return pickle.loads(payload, buffers=buffers)
+
+
+def read_blob_file(object_file):
+    """
+    reads the blob back without deserializing it
+    :type object_file: ObjectFile
+    :rtype: ObjectBlob
+    """
+    with open(object_file.payload_path, 'rb') as d_input:
+        payload = d_input.read()
+    buffers = []
+    if object_file.buffers_path is not None:
+        with open(object_file.buffers_path, 'rb') as d_input:
+            for start, length in object_file.offsets:
+                d_input.seek(start)
+                buffers.append(d_input.read(length))
+    return ObjectBlob(payload, buffers)
+
+
+def remove_object_file(object_file):
+    for path in object_file.paths():
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,129 @@
+"""
+Persistent cache of the parsed csv files of the roots (see ExecutionEnvironment.load).
+An entry is keyed by the path of the file and the parameters of read_csv. It keeps the size and the modification time
+of the file when it was parsed, an entry is only used while they match the file, otherwise the file is parsed again
+and the entry is replaced. Every column is kept in its own binary file (see column_files), so the dtypes are
+preserved, the numeric columns are memory-mapped when they are read, and a subset of the columns can be read without
+reading the others.
+The cache is independent of the storage manager and the materialization budget of the experiment graph.
+"""
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from experiment_graph.storage_managers.column_files import write_array, read_array, write_column_file, \
+    read_column_file
+
+
+class CachedFrame(object):
+    """
+    describes a parsed csv file inside the cache
+    """
+
+    def __init__(self, file_size, modification_time, column_names, column_files, index, index_name):
+        """
+        :param column_files: list of the ColumnFiles of the columns, the columns are stored without their index
+        :param index: either a (start, stop, step) tuple for range indices or the path of the index file
+        """
+        self.file_size = file_size
+        self.modification_time = modification_time
+        self.column_names = column_names
+        self.column_files = column_files
+        self.index = index
+        self.index_name = index_name
+
+    def is_valid(self, stat):
+        return self.file_size == stat.st_size and self.modification_time == stat.st_mtime_ns
+
+    def paths(self):
+        paths = [p for column_file in self.column_files for p in column_file.paths()]
+        if not isinstance(self.index, tuple):
+            paths.append(self.index)
+        return paths
+
+
+class ParseCache(object):
+    def __init__(self, cache_folder):
+        """
+        :param cache_folder: folder for storing the parsed files, created if it does not exist
+        """
+        self.cache_folder = cache_folder
+        if not os.path.exists(cache_folder):
+            os.makedirs(cache_folder)
+
+    @staticmethod
+    def key(loc, extra_params):
+        parameters = sorted((k, repr(v)) for k, v in extra_params.items())
+        return hashlib.md5((os.path.abspath(loc) + repr(parameters)).encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_folder, key + '.entry.pkl')
+
+    def lookup(self, loc, extra_params):
+        """
+        :return: the CachedFrame of the csv file or None if the file is not cached or has changed since it was cached
+        """
+        path = self.entry_path(self.key(loc, extra_params))
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as d_input:
+            cached_frame = pickle.load(d_input)
+        return cached_frame if cached_frame.is_valid(os.stat(loc)) else None
+
+    def get(self, loc, extra_params, columns=None):
+        """
+        :param columns: names of the columns to read, None for all the columns
+        :return: the parsed csv file (pd.DataFrame) or None if it is not in the cache
+        """
+        cached_frame = self.lookup(loc, extra_params)
+        if cached_frame is None:
+            return None
+        if columns is None:
+            return self.read(cached_frame)
+        return self.read(cached_frame, [cached_frame.column_names.index(c) for c in columns])
+
+    @staticmethod
+    def read(cached_frame, positions=None):
+        if positions is None:
+            positions = range(len(cached_frame.column_names))
+        if isinstance(cached_frame.index, tuple):
+            index = pd.RangeIndex(*cached_frame.index, name=cached_frame.index_name)
+        else:
+            index = pd.Index(read_array(cached_frame.index, mmap_mode=None), name=cached_frame.index_name)
+        frame = pd.DataFrame({i: read_column_file(cached_frame.column_files[i]).array for i in positions},
+                             index=index, copy=False)
+        frame.columns = [cached_frame.column_names[i] for i in positions]
+        return frame
+
+    def put(self, loc, extra_params, frame):
+        """
+        stores the parsed csv file, the previous entry of the file (if any) is replaced
+        :type frame: pd.DataFrame
+        """
+        stat = os.stat(loc)
+        key = self.key(loc, extra_params)
+        self.remove(key)
+        path_prefix = os.path.join(self.cache_folder, key)
+        if isinstance(frame.index, pd.RangeIndex):
+            index = (frame.index.start, frame.index.stop, frame.index.step)
+        else:
+            index = write_array(path_prefix + '.index', frame.index)
+        column_files = []
+        for i in range(frame.shape[1]):
+            column = frame.iloc[:, i].reset_index(drop=True)
+            column_files.append(write_column_file(self.cache_folder, '{}.{}'.format(key, i), column))
+        cached_frame = CachedFrame(stat.st_size, stat.st_mtime_ns, list(frame.columns), column_files, index,
+                                   frame.index.name)
+        with open(self.entry_path(key), 'wb') as output:
+            pickle.dump(cached_frame, output, pickle.HIGHEST_PROTOCOL)
+
+    def remove(self, key):
+        path = self.entry_path(key)
+        if os.path.exists(path):
+            with open(path, 'rb') as d_input:
+                cached_frame = pickle.load(d_input)
+            for stored in cached_frame.paths() + [path]:
+                if os.path.exists(stored):
+                    os.remove(stored)
@@ -0,0 +1,178 @@
+"""
+Packed storage for small records (e.g., the blobs of tiny aggregates, such as shapes, means, and scores).
+Instead of keeping every record as its own object (or file), records are appended to shared segments and an offset
+index maps the key of every record to (segment, offset, length). Loading or saving thousands of small records then
+costs a few sequential reads and writes of the segments.
+Removing a record only updates the index, a segment is dropped when all of its records are removed and compact
+rewrites the segments that mostly contain removed records.
+"""
+import os
+import struct
+
+SEGMENT_SIZE = 4 * 1024 * 1024
+# segments with less than this ratio of live bytes are rewritten by compact
+MIN_LIVE_RATIO = 0.5
+
+BUFFER_COUNT = struct.Struct('<I')
+BUFFER_LENGTH = struct.Struct('<Q')
+
+
+def pack_blob(blob):
+    """
+    packs an ObjectBlob into a single record: number of buffers, length of every buffer, payload, and buffers
+    """
+    header = BUFFER_COUNT.pack(len(blob.buffers)) + b''.join(BUFFER_LENGTH.pack(len(b)) for b in blob.buffers)
+    return b''.join([header, blob.payload] + list(blob.buffers))
+
+
+def unpack_blob(record):
+    """
+    :param record: bytes-like object created by pack_blob
+    :return: (payload, buffers) as memoryviews on the record
+    """
+    record = memoryview(record)
+    buffer_count = BUFFER_COUNT.unpack_from(record, 0)[0]
+    position = BUFFER_COUNT.size
+    lengths = []
+    for _ in range(buffer_count):
+        lengths.append(BUFFER_LENGTH.unpack_from(record, position)[0])
+        position += BUFFER_LENGTH.size
+    payload_end = len(record) - sum(lengths)
+    payload = record[position:payload_end]
+    buffers = []
+    position = payload_end
+    for length in lengths:
+        buffers.append(record[position:position + length])
+        position += length
+    return payload, buffers
+
+
+class SegmentStore(object):
+    """
+    keeps the segments in memory (bytearrays), pickling the store (e.g., in save_history) writes a few large
+    byte strings instead of one object per record
+    """
+
+    def __init__(self, segment_size=SEGMENT_SIZE):
+        self.segment_size = segment_size
+        # key -> (segment id, offset, length)
+        self.index = {}
+        # segment id -> number of bytes that belong to records that are not removed
+        self.live_bytes = {}
+        self.segment_lengths = {}
+        self.open_segment = None
+        self.next_segment = 0
+        self.segments = {}
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def append(self, key, record):
+        if key in self.index:
+            raise Exception('Record {} already exists'.format(key))
+        if self.open_segment is None or self.segment_lengths[self.open_segment] + len(record) > self.segment_size:
+            self.open_segment = self.next_segment
+            self.next_segment += 1
+            self.create_segment(self.open_segment)
+            self.segment_lengths[self.open_segment] = 0
+            self.live_bytes[self.open_segment] = 0
+        offset = self.segment_lengths[self.open_segment]
+        self.write_record(self.open_segment, record)
+        self.index[key] = (self.open_segment, offset, len(record))
+        self.segment_lengths[self.open_segment] += len(record)
+        self.live_bytes[self.open_segment] += len(record)
+
+    def read(self, key):
+        """
+        returns a copy of the record, so the segment can grow while the record is in use
+        """
+        segment, offset, length = self.index[key]
+        return self.segment_content(segment)[offset:offset + length]
+
+    def remove(self, key):
+        segment, _, length = self.index.pop(key)
+        self.live_bytes[segment] -= length
+        if self.live_bytes[segment] == 0:
+            self.drop_segment(segment)
+            if segment == self.open_segment:
+                self.open_segment = None
+
+    def compact(self, min_live_ratio=MIN_LIVE_RATIO):
+        """
+        moves the records of the segments that mostly contain removed records into new segments
+        """
+        sparse = [s for s in self.live_bytes if s != self.open_segment and
+                  self.live_bytes[s] < min_live_ratio * self.segment_lengths[s]]
+        if not sparse:
+            return
+        for key in [k for k, (s, _, _) in self.index.items() if s in sparse]:
+            record = bytes(self.read(key))
+            self.remove(key)
+            self.append(key, record)
+
+    def total_bytes(self):
+        return sum(self.segment_lengths.values())
+
+    def dead_bytes(self):
+        return self.total_bytes() - sum(self.live_bytes.values())
+
+    def drop_segment(self, segment):
+        del self.live_bytes[segment]
+        del self.segment_lengths[segment]
+        self.delete_segment(segment)
+
+    # the physical representation of the segments, DiskSegmentStore keeps them in files
+    def create_segment(self, segment):
+        self.segments[segment] = bytearray()
+
+    def write_record(self, segment, record):
+        self.segments[segment] += record
+
+    def segment_content(self, segment):
+        return self.segments[segment]
+
+    def delete_segment(self, segment):
+        del self.segments[segment]
+
+
+class DiskSegmentStore(SegmentStore):
+    """
+    keeps every segment in a file inside the storage folder. A segment is read completely (one sequential read) the
+    first time one of its records is accessed, the loaded segments are not pickled
+    """
+
+    def __init__(self, storage_folder, segment_size=SEGMENT_SIZE):
+        super(DiskSegmentStore, self).__init__(segment_size)
+        self.storage_folder = storage_folder
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['segments'] = {}
+        return state
+
+    def segment_path(self, segment):
+        return os.path.join(self.storage_folder, 'segment_{}.bin'.format(segment))
+
+    def create_segment(self, segment):
+        open(self.segment_path(segment), 'wb').close()
+
+    def write_record(self, segment, record):
+        with open(self.segment_path(segment), 'ab') as output:
+            output.write(record)
+        if segment in self.segments:
+            self.segments[segment] += record
+
+    def segment_content(self, segment):
+        if segment not in self.segments:
+            with open(self.segment_path(segment), 'rb') as d_input:
+                self.segments[segment] = bytearray(d_input.read())
+        return self.segments[segment]
+
+    def delete_segment(self, segment):
+        self.segments.pop(segment, None)
+        path = self.segment_path(segment)
+        if os.path.exists(path):
+            os.remove(path)
@@ -29,7 +29,7 @@ def profile_experiment_graph(profile_name, experiment_graph, result_folder, TRIA
                 for i in range(TRIAL):
                     temp = experiment_graph.retrieve_data(node)
                 end = datetime.now()
-                time = ((end - start).microseconds / 1000.0) / TRIAL
+                time = ((end - start).total_seconds() * 1000.0) / TRIAL
                 if d_type not in time_size:
                     time_size[d_type] = {'size': [], 'time': []}
 
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+import pandas as pd
+
+from experiment_graph.data_storage import DedupedStorageManager
+from experiment_graph.execution_environment import ExecutionEnvironment
+from experiment_graph.optimizations.Reuse import AllMaterializedReuse
+
+
+class RecordingStorageManager(DedupedStorageManager):
+    def __init__(self):
+        super(RecordingStorageManager, self).__init__()
+        self.requested_columns = []
+
+    def get(self, key, columns=None):
+        self.requested_columns.append(columns)
+        return super(RecordingStorageManager, self).get(key, columns)
+
+
+class TestCollaborativeScheduler(TestCase):
+    def setUp(self):
+        self.pandas_df = pd.DataFrame({'a': [1, 2, None, 4], 'b': [0.5, 1.5, 2.5, 3.5], 'c': ['w', 'x', 'y', 'z']})
+        self.storage = RecordingStorageManager()
+        self.ee = ExecutionEnvironment(self.storage, reuse_type=AllMaterializedReuse.NAME)
+
+        # first workload, materialize the result of ffill
+        filled = self.ee.load_from_pandas(self.pandas_df, 'root').ffill()
+        filled.data()
+        self.filled_id = filled.id
+        self.ee.workload_dag.post_process()
+        self.ee.update_history()
+        self.ee.experiment_graph.materialize(self.filled_id, self.ee.workload_dag.graph.nodes[self.filled_id]['data'])
+        self.ee.new_workload()
+        self.storage.requested_columns = []
+
+    def test_projections_load_only_needed_columns(self):
+        filled = self.ee.load_from_pandas(self.pandas_df, 'root').ffill()
+        expected = self.pandas_df.ffill()
+
+        pd.testing.assert_frame_equal(filled[['b', 'a']].data(), expected[['b', 'a']])
+        pd.testing.assert_frame_equal(filled.drop('b').data(), expected.drop(columns='b'))
+        pd.testing.assert_frame_equal(filled.select_dtypes('number').data(), expected.select_dtypes('number'))
+
+        materialized = self.ee.experiment_graph.graph.nodes[self.filled_id]['data']
+        self.assertEqual(self.storage.requested_columns,
+                         [[materialized.get_c_hash(c) for c in columns] for columns in [['b', 'a'], ['a', 'c'],
+                                                                                        ['a', 'b']]])
+        # the materialized dataset itself is never loaded into the workload
+        self.assertFalse(filled.computed)
+
+    def test_other_operations_load_the_whole_dataset(self):
+        filled = self.ee.load_from_pandas(self.pandas_df, 'root').ffill()
+        pd.testing.assert_frame_equal(filled.dropna().data(), self.pandas_df.ffill().dropna())
+        self.assertEqual(self.storage.requested_columns, [None])
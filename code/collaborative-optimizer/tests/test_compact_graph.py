@@ -0,0 +1,87 @@
+import copy
+import pickle
+from unittest import TestCase
+
+import networkx as nx
+import numpy as np
+
+from experiment_graph.graph.compact_graph import CompactGraph
+from experiment_graph.graph.graph_representations import ExperimentGraph
+from experiment_graph.heuristics import compute_recreation_cost, compute_vertex_potential, \
+    compute_cost_and_potential, HEURISTIC_ATTRIBUTES, HEURISTIC_EDGE_ATTRIBUTES
+
+
+def random_experiment_graph(vertex_count=60, seed=0):
+    rs = np.random.RandomState(seed)
+    graph = nx.DiGraph()
+    for i in range(vertex_count):
+        vertex_type = 'Dataset' if i < 3 else str(rs.choice(['Dataset', 'Feature', 'Agg', 'SK_Model']))
+        attributes = {'type': vertex_type, 'root': i < 3, 'mat': bool(rs.rand() < 0.3),
+                      'meta_freq': int(rs.randint(1, 5)), 'data': None,
+                      'size': None if vertex_type == 'Agg' else float(rs.rand() * 100 + 1)}
+        if vertex_type == 'SK_Model':
+            attributes['score'] = float(rs.rand())
+        graph.add_node('v{}'.format(i), **attributes)
+        if i >= 3:
+            for p in set(rs.randint(0, i, size=rs.randint(1, 3))):
+                graph.add_edge('v{}'.format(p), 'v{}'.format(i), execution_time=float(rs.rand()), freq=1,
+                               name='op', args={})
+    return graph
+
+
+class TestCompactGraph(TestCase):
+    def test_round_trip(self):
+        graph = random_experiment_graph()
+        restored = pickle.loads(pickle.dumps(CompactGraph(graph))).to_graph()
+        self.assertEqual(list(graph.nodes), list(restored.nodes))
+        self.assertEqual(list(graph.edges), list(restored.edges))
+        for n, d in graph.nodes(data=True):
+            self.assertEqual(d, restored.nodes[n])
+        for s, t, d in graph.edges(data=True):
+            self.assertEqual(d, restored.edges[s, t])
+
+    def test_adjacency(self):
+        graph = random_experiment_graph()
+        compact_graph = CompactGraph(graph)
+        for v in graph.nodes:
+            vertex_id = compact_graph.vertex_ids[v]
+            self.assertEqual(list(graph.successors(v)),
+                             [compact_graph.vertices[i] for i in compact_graph.successors(vertex_id)])
+            self.assertEqual(sorted(graph.predecessors(v)),
+                             sorted(compact_graph.vertices[i] for i in compact_graph.predecessors(vertex_id)))
+        position = {v: level for level, vertices in enumerate(compact_graph.topological_levels()) for v in vertices}
+        for s, t in graph.edges:
+            self.assertLess(position[compact_graph.vertex_ids[s]], position[compact_graph.vertex_ids[t]])
+
+    def test_heuristics_match_the_graph_heuristics(self):
+        expected = random_experiment_graph()
+        actual = copy.deepcopy(expected)
+        compute_recreation_cost(expected)
+        compute_vertex_potential(expected)
+        compute_cost_and_potential(actual)
+        for n, d in expected.nodes(data=True):
+            for attribute in ['compute_cost', 'recreation_cost', 'n_recreation_cost', 'potential', 'n_potential']:
+                self.assertAlmostEqual(d[attribute], actual.nodes[n][attribute])
+
+    def test_snapshot_is_reused(self):
+        experiment_graph = ExperimentGraph(graph=random_experiment_graph())
+        snapshot = experiment_graph.compact_snapshot(HEURISTIC_ATTRIBUTES, HEURISTIC_EDGE_ATTRIBUTES)
+        experiment_graph.update_node('v10', {'meta_freq': 7, 'size': None})
+        experiment_graph.graph.edges['v0', 'v3']['execution_time'] = 5.0
+        self.assertIs(snapshot, experiment_graph.compact_snapshot(HEURISTIC_ATTRIBUTES, HEURISTIC_EDGE_ATTRIBUTES))
+        vertex_id = snapshot.vertex_ids['v10']
+        self.assertEqual(7, snapshot.column('meta_freq')[vertex_id])
+        self.assertFalse(snapshot.defined('size')[vertex_id])
+        self.assertIn(vertex_id, snapshot.vertex_attributes.objects['size'])
+
+        expected = copy.deepcopy(experiment_graph.graph)
+        compute_cost_and_potential(expected)
+        compute_cost_and_potential(experiment_graph.graph, snapshot)
+        for n, d in expected.nodes(data=True):
+            for attribute in ['recreation_cost', 'potential']:
+                self.assertAlmostEqual(d[attribute], experiment_graph.graph.nodes[n][attribute])
+
+        # a new vertex or edge changes the structure of the graph
+        experiment_graph.add_node('v_new', type='Feature', root=False, size=1.0, meta_freq=1, data=None)
+        self.assertIsNot(snapshot, experiment_graph.compact_snapshot())
+        self.assertEqual(len(experiment_graph.graph), len(experiment_graph.compact_snapshot()))
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from experiment_graph.csv_ingestion import ParallelCsvReader
+from experiment_graph.execution_environment import ExecutionEnvironment
+
+
+class TestParallelCsvReader(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'train.csv')
+        rs = np.random.RandomState(0)
+        row_count = 400
+        integers = pd.Series(rs.randint(0, 100, row_count), dtype='float64')
+        # missing values only appear in the last rows, after the sample
+        integers[row_count - 5:] = np.nan
+        codes = pd.Series(rs.randint(0, 10, row_count).astype(str))
+        codes[:20] = 'code'
+        pd.DataFrame({'a': rs.rand(row_count), 'b': integers, 'c': codes,
+                      'd': pd.date_range('2020-01-01', periods=row_count).astype(str)}) \
+            .to_csv(self.path, index=False)
+        self.reader = ParallelCsvReader(3, min_size=0, sample_rows=50)
+
+    def tearDown(self):
+        self.reader.shutdown()
+        shutil.rmtree(self.folder)
+
+    def test_chunk_boundaries(self):
+        boundaries = self.reader.chunk_boundaries(self.path)
+        self.assertEqual(3, len(boundaries))
+        self.assertEqual(os.path.getsize(self.path), boundaries[-1][1])
+        with open(self.path, 'rb') as d_input:
+            content = d_input.read()
+        for start, end in boundaries:
+            self.assertEqual(b'\n', content[start - 1:start])
+
+    def test_parallel_parse_matches_the_serial_parse(self):
+        for extra_params in [{}, {'parse_dates': ['d']}, {'usecols': [0, 2]}, {'usecols': ['c', 'b']}]:
+            pd.testing.assert_frame_equal(pd.read_csv(self.path, **extra_params),
+                                          self.reader.read_parallel(self.path, extra_params))
+        self.assertFalse(self.reader.is_parallel(self.path, {'nrows': 10}))
+        self.assertFalse(ParallelCsvReader(3).is_parallel(self.path, {}))
+
+    def test_quoted_line_breaks_are_parsed_serially(self):
+        # most of every value is before its line break, so the chunks start inside the quoted values
+        pandas_df = pd.DataFrame({'a': np.arange(100), 'text': ['x' * 100 + '\n' + str(i) for i in range(100)]})
+        pandas_df.to_csv(self.path, index=False)
+        self.assertIsNone(self.reader.read_parallel(self.path, {}))
+        pd.testing.assert_frame_equal(pandas_df, self.reader.read(self.path, {}))
+
+        # quoted values without line breaks are parsed in parallel
+        pandas_df['text'] = ['x, "{}"'.format(i) for i in range(100)]
+        pandas_df.to_csv(self.path, index=False)
+        pd.testing.assert_frame_equal(pandas_df, self.reader.read_parallel(self.path, {}))
+
+    def test_load_with_parse_processes(self):
+        execution_environment = ExecutionEnvironment(parse_processes=2)
+        execution_environment.csv_reader.min_size = 0
+        try:
+            root = execution_environment.load(self.path)
+            serial_root = ExecutionEnvironment().load(self.path)
+            self.assertEqual(serial_root.get_column_hash(), root.get_column_hash())
+            pd.testing.assert_frame_equal(serial_root.data(), root.data())
+        finally:
+            execution_environment.close()
+        self.assertIsNone(execution_environment.csv_reader.executor)
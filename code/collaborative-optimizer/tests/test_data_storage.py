@@ -0,0 +1,241 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from experiment_graph.data_storage import DedupedStorageManager, DiskDedupedStorageManager, TieredStorageManager
+from experiment_graph.graph.auxilary import DataFrame, DataSeries
+from experiment_graph.storage_managers.column_codecs import encode_column, decode_column
+
+
+def sample_dataframe():
+    pandas_df = pd.DataFrame({'a': [1, 2, 3], 'b': [0.5, np.nan, 1.5], 'c': ['x', 'y', 'x'], 'd': [True, False, True]})
+    return DataFrame(column_names=['a', 'b', 'c', 'd'], column_hashes=['h_a', 'h_b', 'h_c', 'h_d'],
+                     pandas_df=pandas_df)
+
+
+def memory_base(array):
+    while array.base is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array
+
+
+class TestDedupedStorageManager(TestCase):
+    def setUp(self):
+        self.storage = DedupedStorageManager()
+
+    def test_put_get_delete(self):
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        feature = DataSeries(column_name='a', column_hash='h_a', pandas_series=df.pandas_df['a'])
+        self.storage.put('n2', feature)
+
+        pd.testing.assert_frame_equal(self.storage.get('n1'), df.pandas_df)
+        pd.testing.assert_series_equal(self.storage.get('n2'), df.pandas_df['a'])
+        self.assertEqual(self.storage.column_count['h_a'], 2)
+
+        self.storage.delete('n1')
+        self.assertEqual(self.storage.column_count['h_a'], 1)
+        self.assertNotIn('h_b', self.storage.column_size)
+        pd.testing.assert_series_equal(self.storage.get('n2'), df.pandas_df['a'])
+
+    def test_objects_are_deduplicated(self):
+        model = {'coef': np.arange(1000, dtype=np.float64), 'params': {'C': 1.0}}
+        self.storage.put_object('m1', model)
+        self.storage.put_object('m2', {'coef': np.arange(1000, dtype=np.float64), 'params': {'C': 1.0}})
+        self.storage.put_object('m3', {'coef': np.zeros(1000), 'params': {'C': 1.0}})
+        self.assertEqual(len(self.storage.object_count), 2)
+
+        loaded = self.storage.get_object('m2')
+        np.testing.assert_array_equal(loaded['coef'], model['coef'])
+        self.assertEqual(loaded['params'], model['params'])
+
+        self.storage.delete_object('m1')
+        np.testing.assert_array_equal(self.storage.get_object('m2')['coef'], model['coef'])
+        self.storage.delete_object('m2')
+        self.storage.delete_object('m3')
+        self.assertEqual(len(self.storage.object_count), 0)
+        self.assertEqual(self.storage.objects_total_size(), 0)
+
+    def test_small_objects_are_packed(self):
+        self.storage.segment_store.segment_size = 1024
+        for i in range(100):
+            self.storage.put_object('agg_{}'.format(i), (i, 'shape'))
+        self.storage.put_object('large', np.arange(10000))
+        self.assertEqual(len(self.storage.segment_store), 100)
+        self.assertEqual(list(self.storage.object_store.keys()), [self.storage.object_keys['large']])
+        self.assertLess(len(self.storage.segment_store.segment_lengths), 10)
+
+        for i in range(90):
+            self.storage.delete_object('agg_{}'.format(i))
+        self.assertLessEqual(self.storage.segment_store.dead_bytes(), self.storage.segment_store.segment_size)
+        for i in range(90, 100):
+            self.assertEqual(self.storage.get_object('agg_{}'.format(i)), (i, 'shape'))
+        np.testing.assert_array_equal(self.storage.get_object('large'), np.arange(10000))
+
+    def test_frame_cache(self):
+        self.storage.frame_cache_size = 1
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        first = self.storage.get('n1')
+        first['e'] = 1
+        pd.testing.assert_frame_equal(self.storage.get('n1'), df.pandas_df)
+        self.assertEqual(len(self.storage.frame_cache), 1)
+
+        self.storage.delete('n1')
+        self.assertEqual(len(self.storage.frame_cache), 0)
+
+    def test_frame_cache_drops_removed_columns(self):
+        self.storage.frame_cache_size = 2
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        self.storage.put('n2', DataSeries(column_name='d', column_hash='h_d', pandas_series=df.pandas_df['d']))
+        self.storage.get('n1', columns=['h_a', 'h_b'])
+        self.storage.get('n1', columns=['h_c', 'h_d'])
+
+        # h_a and h_b are removed with n1, h_d is still stored as n2
+        self.storage.delete('n1')
+        self.assertEqual(list(self.storage.frame_cache.keys()), [])
+        # a column that is stored again under a removed hash is not read from the cache
+        replaced = pd.DataFrame({'a': [4, 5, 6], 'b': [1.0, 2.0, 3.0]})
+        self.storage.put('n3', DataFrame(column_names=['a', 'b'], column_hashes=['h_a', 'h_b'], pandas_df=replaced))
+        pd.testing.assert_frame_equal(self.storage.get('n3'), replaced)
+
+
+class TestFingerprintDedupedStorageManager(TestDedupedStorageManager):
+    def setUp(self):
+        self.storage = DedupedStorageManager(fingerprint=True)
+
+    def test_identical_columns_are_stored_once(self):
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        # same content under random hashes and different names, e.g., the result of a merge
+        merged = DataFrame(column_names=['a_x', 'b_x'], column_hashes=['h_1', 'h_2'],
+                           pandas_df=df.pandas_df[['a', 'b']].rename(columns={'a': 'a_x', 'b': 'b_x'}))
+        self.storage.put('n2', merged)
+
+        self.assertEqual(len(self.storage.column_store), 4)
+        self.assertEqual(self.storage.column_count['h_a'], 2)
+        pd.testing.assert_frame_equal(self.storage.get('n2'), merged.pandas_df)
+
+        self.storage.delete('n1')
+        pd.testing.assert_frame_equal(self.storage.get('n2'), merged.pandas_df)
+        self.storage.delete('n2')
+        self.assertEqual(len(self.storage.column_store), 0)
+        self.assertEqual(len(self.storage.column_alias), 0)
+        self.assertEqual(len(self.storage.canonical_aliases), 0)
+        self.assertEqual(len(self.storage.fingerprints), 0)
+
+    def test_different_index_is_not_deduplicated(self):
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        shifted = df.pandas_df['a'].copy()
+        shifted.index = shifted.index + 1
+        self.storage.put('n2', DataSeries(column_name='a', column_hash='h_shifted', pandas_series=shifted))
+        self.assertIn('h_shifted', self.storage.column_store)
+
+
+class TestDiskDedupedStorageManager(TestDedupedStorageManager):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.storage = DiskDedupedStorageManager(self.storage_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def test_numeric_columns_are_memory_mapped(self):
+        self.storage.put('n1', sample_dataframe())
+        self.assertIsInstance(memory_base(self.storage.read_column('h_a').to_numpy()), np.memmap)
+        # assembling the dataframe does not copy the memory-mapped columns
+        self.assertIsInstance(memory_base(self.storage.get('n1')['b'].to_numpy()), np.memmap)
+        self.assertEqual(self.storage.total_size(), sum(self.storage.column_size.values()))
+
+        self.storage.delete('n1')
+        self.assertEqual(len(self.storage.column_store), 0)
+        self.assertEqual(len(os.listdir(self.storage_folder)), 0)
+
+
+class TestTieredStorageManager(TestDedupedStorageManager):
+    def setUp(self):
+        self.storage_folder = tempfile.mkdtemp()
+        self.storage = TieredStorageManager(self.storage_folder, memory_budget=1000.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_folder)
+
+    def test_cold_columns_are_demoted(self):
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        self.assertTrue(all(self.storage.in_memory(ch) for ch in df.get_column_hash()))
+
+        # shrinking the memory tier to a single column keeps only the most recently used column in memory
+        self.storage.memory_budget = max(self.storage.column_size.values())
+        self.storage.read_column('h_c')
+        self.storage.enforce_memory_budget()
+        self.assertTrue(self.storage.in_memory('h_c'))
+        self.assertFalse(self.storage.in_memory('h_a'))
+
+        pd.testing.assert_frame_equal(self.storage.get('n1'), df.pandas_df)
+        self.assertGreater(self.storage.tier_stats['disk']['hit'], 0)
+        self.assertGreater(self.storage.tier_stats['memory']['miss'], 0)
+
+    def test_lfu_keeps_frequently_used_columns(self):
+        self.storage.eviction_policy = TieredStorageManager.LFU
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        self.storage.put('n2', DataSeries(column_name='d', column_hash='h_d', pandas_series=df.pandas_df['d']))
+        self.storage.record_access_frequency('n2', 10)
+
+        self.storage.memory_budget = self.storage.column_size['h_d']
+        self.storage.enforce_memory_budget()
+        self.assertEqual(list(self.storage.memory_tier.keys()), ['h_d'])
+
+    def test_detached_copy(self):
+        df = sample_dataframe()
+        self.storage.put('n1', df)
+        detached = self.storage.detached_copy(os.path.join(self.storage_folder, 'payload'))
+        self.assertEqual(len(detached.memory_tier), 0)
+        self.assertTrue(all(self.storage.in_memory(ch) for ch in df.get_column_hash()))
+
+        # changing the storage manager does not change the copy
+        self.storage.put('n2', DataSeries(column_name='e', column_hash='h_e', pandas_series=df.pandas_df['a'] + 1))
+        self.storage.read_column('h_a')
+        self.assertNotIn('n2', detached.key_value)
+        self.assertNotIn('h_e', detached.column_store)
+        self.assertEqual(detached.tier_stats['memory']['hit'], 0)
+        pd.testing.assert_frame_equal(detached.get('n1'), df.pandas_df)
+
+
+class TestCompressedDedupedStorageManager(TestDedupedStorageManager):
+    def setUp(self):
+        self.storage = DedupedStorageManager(compress=True)
+
+    def test_columns_are_encoded(self):
+        n = 10000
+        pandas_df = pd.DataFrame({'flag': np.arange(n) % 3 == 0,
+                                  'city': np.array(['a', 'b', 'c', 'd'])[np.arange(n) % 4],
+                                  'zero': np.zeros(n), 'noise': np.random.RandomState(0).rand(n)})
+        df = DataFrame(column_names=list(pandas_df.columns), column_hashes=['h_flag', 'h_city', 'h_zero', 'h_noise'],
+                       pandas_df=pandas_df)
+        self.storage.put('n1', df)
+
+        pd.testing.assert_frame_equal(self.storage.get('n1'), pandas_df)
+        raw_sizes = pandas_df.memory_usage(index=False, deep=True) / 1024.0
+        for column, ch in [('flag', 'h_flag'), ('city', 'h_city'), ('zero', 'h_zero')]:
+            self.assertLess(self.storage.column_size[ch], raw_sizes[column] / 4)
+        self.assertLessEqual(self.storage.column_size['h_noise'], raw_sizes['noise'])
+
+    def test_run_length_encoding_keeps_signed_zeros(self):
+        values = np.zeros(10000)
+        values[5000:] = -0.0
+        values[8000:] = np.nan
+        encoded = encode_column(pd.Series(values))
+        self.assertEqual('rle', encoded.codec)
+        self.assertEqual(3, len(encoded.payload[0]))
+
+        decoded = decode_column(encoded).to_numpy()
+        np.testing.assert_array_equal(np.signbit(values), np.signbit(decoded))
+        np.testing.assert_array_equal(np.isnan(values), np.isnan(decoded))
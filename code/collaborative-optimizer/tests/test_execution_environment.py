@@ -1,8 +1,16 @@
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 
+import numpy as np
 import pandas as pd
 
+from data_storage import DedupedStorageManager
 from execution_environment import ExecutionEnvironment, UserDefinedFunction
+from heuristics import compute_cost_and_potential
+from materialization_methods import AllMaterializer, StorageAwareMaterializer
+from experiment_graph.optimizations.Reuse import AllMaterializedReuse
 
 
 class TestExecutionEnvironment(TestCase):
@@ -27,3 +35,108 @@ class TestExecutionEnvironment(TestCase):
         execution_environment = ExecutionEnvironment()
         data_with_option = execution_environment.load('data/openml/task_id=31/datasets/train.csv', nrows=100)
         print(data_with_option.data())
+
+
+class TestLazyRoots(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'train.csv')
+        rs = np.random.RandomState(0)
+        self.pandas_df = pd.DataFrame({'a': rs.rand(20), 'b': rs.randint(0, 5, 20), 'c': ['x', 'y'] * 10,
+                                       'd': rs.rand(20)})
+        self.pandas_df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_only_the_projected_columns_are_parsed(self):
+        eager = ExecutionEnvironment().load(self.path)
+        execution_environment = ExecutionEnvironment(lazy_roots=True)
+        root = execution_environment.load(self.path)
+        self.assertEqual(eager.get_column_hash(), root.get_column_hash())
+        self.assertFalse(root.computed)
+
+        projected = root[['c', 'a']]
+        pd.testing.assert_frame_equal(self.pandas_df[['c', 'a']], projected.data())
+        eager[['c', 'a']].data()
+        self.assertEqual(eager[['c', 'a']].get_column_hash(), projected.get_column_hash())
+        self.assertEqual(['a', 'c'], root.get_column())
+        self.assertTrue(root.unmaterializable)
+
+        # the columns that are parsed later are added in the order of the csv file
+        pd.testing.assert_series_equal(self.pandas_df['b'], root['b'].data())
+        self.assertEqual(['a', 'b', 'c'], root.get_column())
+        self.assertEqual(eager.get_column_hash()[:3], root.get_column_hash())
+
+        # any other operation parses the whole file
+        pd.testing.assert_frame_equal(self.pandas_df.drop(columns='b'), root.drop('b').data())
+        self.assertEqual(eager.get_column_hash(), root.get_column_hash())
+        self.assertFalse(root.unmaterializable)
+
+    def test_usecols_of_the_load(self):
+        # usecols skips the columns before the parsed ones
+        root = ExecutionEnvironment(lazy_roots=True).load(self.path, usecols=['c', 'd'])
+        pd.testing.assert_frame_equal(self.pandas_df[['d']], root[['d']].data())
+        # any other operation parses the columns of usecols
+        pd.testing.assert_frame_equal(self.pandas_df[['d']], root.drop('c').data())
+        self.assertEqual(['c', 'd'], root.get_column())
+
+        cache_folder = os.path.join(self.folder, 'cache')
+        ExecutionEnvironment(parse_cache_folder=cache_folder).load(self.path, usecols=[3, 2])
+        cached_root = ExecutionEnvironment(lazy_roots=True, parse_cache_folder=cache_folder).load(self.path,
+                                                                                                 usecols=[3, 2])
+        pd.testing.assert_frame_equal(self.pandas_df[['d']], cached_root[['d']].data())
+
+    @staticmethod
+    def materialize_storage_aware(execution_environment):
+        execution_environment.workload_dag.post_process()
+        execution_environment.update_history()
+        compute_cost_and_potential(execution_environment.experiment_graph.graph)
+        StorageAwareMaterializer(storage_budget=1000.0).run_and_materialize(execution_environment.experiment_graph,
+                                                                            execution_environment.workload_dag)
+        execution_environment.new_workload()
+
+    def test_storage_aware_materialization_of_lazy_roots(self):
+        execution_environment = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME,
+                                                     lazy_roots=True)
+        root = execution_environment.load(self.path)
+        projection = root[['a', 'c']]
+        projection.data()
+        self.materialize_storage_aware(execution_environment)
+        graph = execution_environment.experiment_graph.graph
+        self.assertTrue(graph.nodes[projection.id]['mat'])
+
+        # the lazy root of the first workload is not part of a workload on another root
+        other_path = os.path.join(self.folder, 'other.csv')
+        self.pandas_df.to_csv(other_path, index=False)
+        other_root = execution_environment.load(other_path)
+        pd.testing.assert_frame_equal(self.pandas_df[['b']], other_root[['b']].data())
+        self.materialize_storage_aware(execution_environment)
+        self.assertFalse(graph.nodes[root.id]['mat'])
+
+        # the projection is reused, the reloaded root is not parsed
+        root = execution_environment.load(self.path)
+        pd.testing.assert_frame_equal(self.pandas_df[['a', 'c']], root[['a', 'c']].data())
+        self.assertIsNone(root.underlying_data.get_data())
+        self.materialize_storage_aware(execution_environment)
+        self.assertFalse(graph.nodes[root.id]['mat'])
+        self.assertTrue(graph.nodes[projection.id]['mat'])
+
+    def test_partially_parsed_roots_are_not_materialized(self):
+        execution_environment = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME,
+                                                     lazy_roots=True)
+        root = execution_environment.load(self.path)
+        root[['a', 'c']].data()
+        execution_environment.workload_dag.post_process()
+        execution_environment.update_history()
+        AllMaterializer().run_and_materialize(execution_environment.experiment_graph,
+                                              execution_environment.workload_dag)
+        self.assertFalse(execution_environment.experiment_graph.graph.nodes[root.id]['mat'])
+        self.assertTrue(execution_environment.experiment_graph.graph.nodes[root[['a', 'c']].id]['mat'])
+
+        execution_environment.new_workload()
+        root = execution_environment.load(self.path)
+        pd.testing.assert_frame_equal(self.pandas_df[['a', 'c']], root[['a', 'c']].data())
+        self.assertFalse(root.computed)
+        pd.testing.assert_frame_equal(self.pandas_df[['d']], root[['d']].data())
+        self.assertEqual(['d'], root.get_column())
@@ -0,0 +1,351 @@
+import threading
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+
+from sklearn.linear_model import LogisticRegression
+
+from experiment_graph.data_storage import DedupedStorageManager
+from experiment_graph.execution_environment import ExecutionEnvironment
+from experiment_graph.graph.graph_representations import ExperimentGraph
+from experiment_graph.heuristics import compute_cost_and_potential, compute_recreation_cost, \
+    compute_vertex_potential
+from experiment_graph.materialization_algorithms.materialization_methods import AllMaterializer
+from experiment_graph.optimizations.Reuse import AllMaterializedReuse
+
+
+class TestBaseGraph(TestCase):
+    def setUp(self):
+        self.ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        rs = np.random.RandomState(0)
+        self.root = self.ee.load_from_pandas(pd.DataFrame({'a': rs.rand(10), 'b': rs.rand(10)}), 'root')
+
+    def test_repeated_operation_returns_the_existing_vertex(self):
+        first = self.root['a']
+        second = self.root['a']
+        self.assertIs(first, second)
+        graph = self.ee.workload_dag.graph
+        self.assertEqual(1, graph.out_degree(self.root.id))
+        edge = graph.edges[self.root.id, first.id]
+        self.assertEqual(2, edge['freq'])
+        self.assertEqual(first.id, self.ee.workload_dag.child(self.root.id, edge['hash']))
+
+    def test_experiment_graph_index(self):
+        feature = self.root['a']
+        feature.data()
+        self.ee.workload_dag.post_process()
+        self.ee.update_history()
+        edge_hash = self.ee.experiment_graph.graph.edges[self.root.id, feature.id]['hash']
+        self.assertEqual(feature.id, self.ee.experiment_graph.child(self.root.id, edge_hash))
+
+        # the index is rebuilt for graphs that are loaded
+        loaded = ExperimentGraph(graph=self.ee.experiment_graph.graph, roots=self.ee.experiment_graph.roots)
+        self.assertEqual(feature.id, loaded.child(self.root.id, edge_hash))
+        self.assertIsNone(loaded.child(feature.id, edge_hash))
+
+    def test_removed_vertex_is_unindexed(self):
+        feature = self.root['a']
+        doubled = feature * 2
+        doubled.data()
+        self.ee.workload_dag.post_process()
+        self.ee.update_history()
+        graph = self.ee.experiment_graph.graph
+        in_hash = graph.edges[self.root.id, feature.id]['hash']
+        out_hash = graph.edges[feature.id, doubled.id]['hash']
+
+        self.ee.experiment_graph.remove_node(feature.id)
+        self.assertIsNone(self.ee.experiment_graph.child(self.root.id, in_hash))
+        self.assertIsNone(self.ee.experiment_graph.child(feature.id, out_hash))
+
+
+class TestWorkloadDag(TestCase):
+    def setUp(self):
+        self.ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        rs = np.random.RandomState(0)
+        self.pandas_df = pd.DataFrame({'a': rs.rand(10), 'b': rs.rand(10)})
+        self.root = self.ee.load_from_pandas(self.pandas_df, 'root')
+
+    def test_schedule_follows_the_dependencies(self):
+        total = self.root['a'] + self.root['b']
+        result = (total * 2).sum()
+        dag = self.ee.workload_dag
+        schedule = dag.compute_result_with_subgraph(dag.compute_execution_subgraph(result.id))
+        # every edge is executed after the edges that compute its source
+        order = {edge: i for i, edge in enumerate(schedule)}
+        for (source, destination), i in order.items():
+            for parent in dag.graph.predecessors(source):
+                if (parent, source) in order:
+                    self.assertLess(order[(parent, source)], i)
+        self.assertIn(result.id, [destination for _, destination in schedule])
+        self.assertAlmostEqual(((self.pandas_df['a'] + self.pandas_df['b']) * 2).sum(), result.data())
+
+    def test_positions_are_recomputed_after_an_edge_to_an_existing_vertex(self):
+        feature = self.root['a']
+        dag = self.ee.workload_dag
+        self.assertLess(dag.topological_positions()[self.root.id], dag.topological_positions()[feature.id])
+        dag.add_node('late', type='Dataset', root=True, data=None, size=0.0)
+        dag.add_edge('late', feature.id, None, {'hash': 'h', 'oper': 'p_x', 'name': 'x', 'args': {},
+                                                'execution_time': -1, 'executed': False}, 'Feature')
+        positions = dag.topological_positions()
+        self.assertLess(positions['late'], positions[feature.id])
+
+    def test_parallel_execution(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME, workers=4)
+        root = ee.load_from_pandas(self.pandas_df, 'root')
+        # independent branches that are merged by a supernode
+        left = (root['a'] * 2) + 1
+        right = (root['b'] - 1) * 3
+        total = (left + right).sum()
+        self.assertEqual(4, ee.workload_dag.workers)
+        self.assertAlmostEqual(((self.pandas_df['a'] * 2 + 1) + (self.pandas_df['b'] - 1) * 3).sum(), total.data())
+        for _, _, executed in ee.workload_dag.graph.edges(data='executed'):
+            self.assertTrue(executed)
+        ee.new_workload()
+        self.assertEqual(4, ee.workload_dag.workers)
+
+    def test_parallel_execution_updates_the_graph_in_the_calling_thread(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME, workers=4)
+        root = ee.load_from_pandas(self.pandas_df, 'root')
+        total = ((root['a'] * 2) + (root['b'] - 1)).sum()
+        workload_dag = ee.workload_dag
+        apply_edge_result = workload_dag.apply_edge_result
+        threads = set()
+
+        def record_thread(*args):
+            threads.add(threading.current_thread())
+            return apply_edge_result(*args)
+
+        with mock.patch.object(workload_dag, 'apply_edge_result', side_effect=record_thread):
+            total.data()
+        self.assertEqual({threading.current_thread()}, threads)
+        for _, _, executed in workload_dag.graph.edges(data='executed'):
+            self.assertTrue(executed)
+
+    def test_chains_release_the_intermediate_results(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME,
+                                  release_intermediates=True)
+        root = ee.load_from_pandas(self.pandas_df, 'root')
+        # without observations of the load cost model, nothing is released
+        root['b'].fillna(0).sum().data()
+        self.assertTrue(root['b'].computed)
+        for size in [1.0, 2.0, 4.0]:
+            ee.experiment_graph.load_cost_model.observe('Feature', 'numeric', 'memory', size, 1, size / 10.0)
+
+        projected = root['a']
+        filled = projected.fillna(0)
+        converted = filled.astype(float)
+        doubled = converted * 2
+        total = doubled.sum()
+        self.assertAlmostEqual((self.pandas_df['a'] * 2).sum(), total.data())
+
+        dag = ee.workload_dag
+        for intermediate in [projected, filled, converted]:
+            self.assertFalse(intermediate.computed)
+            self.assertTrue(dag.graph.nodes[intermediate.id]['released'])
+            self.assertEqual(['a'], [intermediate.underlying_data.get_column()])
+        # the last vertex of the chain is used by an aggregation
+        self.assertTrue(doubled.computed)
+
+        dag.post_process()
+        ee.update_history()
+        AllMaterializer().run_and_materialize(ee.experiment_graph, dag)
+        graph = ee.experiment_graph.graph
+        for intermediate in [projected, filled, converted]:
+            self.assertFalse(graph.nodes[intermediate.id]['mat'])
+            self.assertGreater(graph.nodes[intermediate.id]['size'], 0.0)
+            # the released vertices are materialization candidates of the next workloads
+            self.assertGreaterEqual(graph.nodes[intermediate.id]['load_cost'], 0.0)
+            self.assertFalse(graph.nodes[intermediate.id]['data'].unmaterializable)
+        self.assertTrue(graph.nodes[doubled.id]['mat'])
+        self.assertTrue(graph.has_edge(filled.id, converted.id))
+
+        # a released vertex is recomputed when it is requested
+        pd.testing.assert_series_equal(self.pandas_df['a'], filled.data(), check_names=False)
+
+        # the workload dag asks the load cost model of the current experiment graph, e.g., after loading a history
+        self.assertTrue(ee.workload_dag.release_intermediates('Feature'))
+        ee.load_history_from_memory(ExperimentGraph(DedupedStorageManager()))
+        self.assertFalse(ee.workload_dag.release_intermediates('Feature'))
+
+
+class TestExperimentGraph(TestCase):
+    def setUp(self):
+        self.ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        rs = np.random.RandomState(0)
+        self.pandas_df = pd.DataFrame({'a': rs.rand(50), 'b': rs.rand(50), 'y': rs.randint(0, 2, 50)})
+
+    def fit_model(self, c):
+        root = self.ee.load_from_pandas(self.pandas_df, 'root')
+        model = root[['a', 'b']].fit_sk_model_with_labels(LogisticRegression(C=c, random_state=1), root['y'],
+                                                          should_warmstart=True)
+        fitted = model.data()
+        self.ee.workload_dag.post_process()
+        self.ee.update_history()
+        AllMaterializer().run_and_materialize(self.ee.experiment_graph, self.ee.workload_dag)
+        self.ee.new_workload()
+        return model.id, fitted
+
+    def test_extend_only_adds_new_edges_without_arguments(self):
+        model_id, _ = self.fit_model(1.0)
+        graph = self.ee.experiment_graph.graph
+        for _, _, attributes in graph.edges(data=True):
+            self.assertNotIn('args', attributes)
+        edges = {(s, d): dict(attributes) for s, d, attributes in graph.edges(data=True)}
+
+        self.fit_model(1.0)
+        self.assertEqual(edges, {(s, d): attributes for s, d, attributes in graph.edges(data=True)})
+        self.assertEqual(2, graph.nodes[model_id]['meta_freq'])
+
+    def test_warmstart_from_materialized_model(self):
+        self.fit_model(1.0)
+        _, fitted = self.fit_model(0.5)
+        # the model is warmstarted from the materialized model of the first workload
+        self.assertTrue(fitted.warm_start)
+        self.assertEqual(1.0, fitted.C)
+
+    def test_size_totals_follow_the_graph(self):
+        def scanned_size(mat_only):
+            return sum(d['size'] for _, d in graph.nodes(data=True)
+                       if d['size'] is not None and d['type'] != 'GroupBy' and (d['mat'] or not mat_only))
+
+        model_id, _ = self.fit_model(1.0)
+        experiment_graph = self.ee.experiment_graph
+        graph = experiment_graph.graph
+        self.assertAlmostEqual(scanned_size(False), experiment_graph.get_total_size())
+        self.assertAlmostEqual(scanned_size(True), experiment_graph.get_total_materialized_size())
+        self.assertGreater(experiment_graph.get_total_materialized_size(), 0.0)
+
+        experiment_graph.unmaterialize(model_id)
+        self.assertAlmostEqual(scanned_size(True), experiment_graph.get_total_materialized_size())
+        storage = experiment_graph.data_storage
+        self.assertAlmostEqual(sum(storage.column_size.values()), storage.total_size())
+        self.assertAlmostEqual(sum(storage.object_size.values()), storage.objects_total_size())
+
+        # the totals are recomputed for graphs that are loaded
+        loaded = ExperimentGraph(graph=graph, roots=experiment_graph.roots)
+        self.assertAlmostEqual(experiment_graph.get_total_materialized_size(), loaded.get_total_materialized_size())
+        self.assertAlmostEqual(experiment_graph.get_total_size(), loaded.get_total_size())
+
+    def test_secondary_indexes(self):
+        first_id, _ = self.fit_model(1.0)
+        second_id, _ = self.fit_model(0.01)
+        experiment_graph = self.ee.experiment_graph
+        graph = experiment_graph.graph
+        for node_type in ['Dataset', 'Feature', 'SK_Model', 'SuperNode']:
+            self.assertEqual({n for n, t in graph.nodes(data='type') if t == node_type},
+                             experiment_graph.vertices_of_type(node_type))
+        training_vertex = list(graph.predecessors(first_id))[0]
+        self.assertEqual({first_id, second_id},
+                         set(experiment_graph.models_trained_on(training_vertex, 'LogisticRegression')))
+        self.assertEqual([], experiment_graph.models_trained_on(training_vertex, 'SVC'))
+
+        scores = sorted(((graph.nodes[n]['score'], n) for n in [first_id, second_id]), reverse=True)
+        self.assertEqual([(n, s) for s, n in scores], experiment_graph.best_models(n=2))
+        experiment_graph.unmaterialize(scores[0][1])
+        self.assertNotIn(scores[0][1], experiment_graph.vertices_of_type('SK_Model', mat_only=True))
+        self.assertEqual([(scores[1][1], scores[1][0])], experiment_graph.best_models(mat_only=True))
+
+    def test_prune_keeps_the_heuristics_of_the_remaining_vertices(self):
+        cold_vertices = []
+        for i in range(3):
+            root = self.ee.load_from_pandas(self.pandas_df, 'root')
+            model = root[['a', 'b']].fit_sk_model_with_labels(LogisticRegression(C=1.0, random_state=1), root['y'])
+            model.score(root[['a', 'b']], root['y']).data()
+            # a chain that is only part of one workload
+            total = (root['a'] * (i + 2)).sum()
+            total.data()
+            cold_vertices.append(total.id)
+            self.ee.workload_dag.post_process()
+            self.ee.update_history()
+            self.ee.new_workload()
+
+        experiment_graph = self.ee.experiment_graph
+        graph = experiment_graph.graph
+        compute_cost_and_potential(graph)
+        attributes = ['recreation_cost', 'n_recreation_cost', 'potential', 'n_potential']
+        expected = {n: [d[a] for a in attributes] for n, d in graph.nodes(data=True)}
+
+        self.assertEqual(4, experiment_graph.prune(horizon=1))
+        self.assertNotIn(cold_vertices[0], graph)
+        self.assertNotIn(cold_vertices[1], graph)
+        # the vertices of the last workload are kept
+        self.assertIn(cold_vertices[2], graph)
+        self.assertEqual({n for n, t in graph.nodes(data='type') if t == 'Agg'},
+                         experiment_graph.vertices_of_type('Agg'))
+
+        compute_cost_and_potential(graph)
+        for n, d in graph.nodes(data=True):
+            for a, value in zip(attributes, expected[n]):
+                self.assertAlmostEqual(value, d[a])
+        compute_recreation_cost(graph)
+        compute_vertex_potential(graph)
+        for n, d in graph.nodes(data=True):
+            for a, value in zip(attributes, expected[n]):
+                self.assertAlmostEqual(value, d[a])
+
+    def test_pruned_vertices_added_again_leave_the_summaries(self):
+        def run_workload(factor):
+            root = self.ee.load_from_pandas(self.pandas_df, 'root')
+            feature = root['a']
+            product = feature * factor
+            total = product.sum()
+            total.data()
+            self.ee.workload_dag.post_process()
+            self.ee.update_history()
+            self.ee.new_workload()
+            return feature.id, [product.id, total.id]
+
+        feature_id, first_chain = run_workload(2)
+        _, second_chain = run_workload(3)
+        run_workload(4)
+        experiment_graph = self.ee.experiment_graph
+        graph = experiment_graph.graph
+        compute_cost_and_potential(graph)
+        self.assertEqual(4, experiment_graph.prune(horizon=1))
+        pruned = dict(graph.graph['pruned_vertices'])
+        self.assertEqual(set(first_chain + second_chain), set(pruned))
+
+        # the first chain is added again, only the second chain is still part of the summaries
+        run_workload(2)
+        self.assertTrue(all(n in graph for n in first_chain))
+        self.assertEqual(set(second_chain), set(graph.graph['pruned_vertices']))
+        self.assertAlmostEqual(sum(pruned[n][0] for n in second_chain), graph.graph['pruned_weighted_cost'])
+        self.assertAlmostEqual(sum(pruned[n][1] for n in second_chain), graph.graph['pruned_score'])
+        self.assertEqual(max(-1, pruned[second_chain[0]][2]), graph.nodes[feature_id]['pruned_potential'])
+        self.assertNotIn('pruned_potential', graph.nodes[first_chain[0]])
+
+    def test_extend_refreshes_the_attributes_of_existing_edges(self):
+        def run_workload(repetitions):
+            root = self.ee.load_from_pandas(self.pandas_df, 'root')
+            for _ in range(repetitions):
+                feature = root['a']
+            feature.sum().data()
+            workload_edge = dict(self.ee.workload_dag.graph.edges[root.id, feature.id])
+            self.ee.workload_dag.post_process()
+            self.ee.update_history()
+            self.ee.new_workload()
+            return root.id, feature.id, workload_edge
+
+        run_workload(1)
+        root_id, feature_id, workload_edge = run_workload(3)
+        edge = self.ee.experiment_graph.graph.edges[root_id, feature_id]
+        self.assertEqual(3, edge['freq'])
+        self.assertEqual(workload_edge['execution_time'], edge['execution_time'])
+        self.assertNotIn('args', edge)
+
+    def test_models_with_nan_scores_are_the_worst(self):
+        first_id, _ = self.fit_model(1.0)
+        second_id, _ = self.fit_model(0.01)
+        experiment_graph = self.ee.experiment_graph
+        experiment_graph.update_node(first_id, {'score': np.nan})
+        best_id, best_score = experiment_graph.best_models(n=1)[0]
+        self.assertEqual(second_id, best_id)
+        self.assertEqual(experiment_graph.graph.nodes[second_id]['score'], best_score)
+        self.assertEqual([second_id, first_id], [n for n, _ in experiment_graph.best_models(n=2)])
+
+        experiment_graph.update_node(second_id, {'score': np.nan})
+        experiment_graph.update_node(first_id, {'score': 0.5})
+        self.assertEqual([(first_id, 0.5)], experiment_graph.best_models(n=1))
+        experiment_graph.remove_node(second_id)
+        self.assertEqual([first_id], [n for _, n in experiment_graph.model_scores])
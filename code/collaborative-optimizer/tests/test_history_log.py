@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from experiment_graph.data_storage import DedupedStorageManager, SimpleStorageManager
+from experiment_graph.execution_environment import ExecutionEnvironment
+from experiment_graph.graph.history_log import log_path
+from experiment_graph.materialization_algorithms.materialization_methods import AllMaterializer
+from experiment_graph.optimizations.Reuse import AllMaterializedReuse
+from experiment_graph.storage_managers.object_blobs import ObjectFile
+
+
+def run_workload(execution_environment, columns):
+    rs = np.random.RandomState(0)
+    pandas_df = pd.DataFrame({'a': rs.rand(50), 'b': rs.rand(50), 'c': rs.rand(50)})
+    projected = execution_environment.load_from_pandas(pandas_df, 'root')[columns]
+    projected.mean().data()
+    execution_environment.workload_dag.post_process()
+    execution_environment.update_history()
+    AllMaterializer().run_and_materialize(execution_environment.experiment_graph, execution_environment.workload_dag)
+    execution_environment.new_workload()
+
+
+class TestHistoryLog(TestCase):
+    def setUp(self):
+        self.environment_folder = os.path.join(tempfile.mkdtemp(), 'history')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.environment_folder))
+
+    def assert_same_history(self, expected, actual):
+        self.assertEqual(sorted(expected.graph.nodes), sorted(actual.graph.nodes))
+        self.assertEqual(sorted(expected.graph.edges), sorted(actual.graph.edges))
+        self.assertEqual(sorted(expected.roots), sorted(actual.roots))
+        for n, d in expected.graph.nodes(data=True):
+            self.assertEqual(d['mat'], actual.graph.nodes[n]['mat'])
+            self.assertEqual(d['meta_freq'], actual.graph.nodes[n]['meta_freq'])
+            if d['mat'] and d['type'] == 'Dataset':
+                pd.testing.assert_frame_equal(expected.retrieve_data(n).get_data(), actual.retrieve_data(n).get_data())
+
+    def test_incremental_save_and_load(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, incremental=True)
+        self.assertEqual(os.path.getsize(log_path(self.environment_folder)), 0)
+        snapshot_time = os.path.getmtime(self.environment_folder + '/graph')
+
+        run_workload(ee, ['a', 'b'])
+        run_workload(ee, ['b', 'c'])
+        ee.save_history(self.environment_folder, incremental=True, compaction_ratio=100.0)
+        self.assertGreater(os.path.getsize(log_path(self.environment_folder)), 0)
+        self.assertEqual(snapshot_time, os.path.getmtime(self.environment_folder + '/graph'))
+
+        loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        self.assert_same_history(ee.experiment_graph, loaded.experiment_graph)
+
+        # the loaded history continues the log of the folder
+        run_workload(loaded, ['a', 'c'])
+        loaded.save_history(self.environment_folder, incremental=True, compaction_ratio=100.0)
+        reloaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        reloaded.load_history_from_disk(self.environment_folder)
+        self.assert_same_history(loaded.experiment_graph, reloaded.experiment_graph)
+
+    def test_compaction_writes_a_new_snapshot(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, incremental=True)
+        run_workload(ee, ['b', 'c'])
+        ee.save_history(self.environment_folder, incremental=True, compaction_ratio=0.0)
+        self.assertGreater(os.path.getsize(log_path(self.environment_folder)), 0)
+        # the log is larger than the allowed ratio of the snapshot, the next save writes a new snapshot
+        run_workload(ee, ['a', 'c'])
+        ee.save_history(self.environment_folder, incremental=True, compaction_ratio=0.0)
+        self.assertEqual(os.path.getsize(log_path(self.environment_folder)), 0)
+
+        loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        self.assert_same_history(ee.experiment_graph, loaded.experiment_graph)
+
+    def test_incremental_save_does_not_overwrite_another_folder(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, incremental=True)
+
+        other = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(other, ['b', 'c'])
+        with self.assertRaises(Exception):
+            other.save_history(self.environment_folder, incremental=True)
+        other.save_history(self.environment_folder, incremental=True, overwrite=True)
+        loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        self.assert_same_history(other.experiment_graph, loaded.experiment_graph)
+
+    def test_log_does_not_keep_the_content_of_materialized_artifacts(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, incremental=True)
+        run_workload(ee, ['b', 'c'])
+        materialized = [r for r in ee.experiment_graph.change_log if r[0] == 'materialize']
+        self.assertTrue(materialized)
+        self.assertTrue(all(len(r) == 2 for r in materialized))
+
+        ee.save_history(self.environment_folder, incremental=True, compaction_ratio=100.0)
+        loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        self.assert_same_history(ee.experiment_graph, loaded.experiment_graph)
+
+    def test_compact_save_and_load(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, compact=True)
+
+        loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        self.assert_same_history(ee.experiment_graph, loaded.experiment_graph)
+
+
+class TestLazyHistory(TestCase):
+    def setUp(self):
+        self.environment_folder = os.path.join(tempfile.mkdtemp(), 'history')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.environment_folder))
+
+    def test_lazy_save_and_load(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, lazy=True)
+        history = ee.experiment_graph
+        for n, d in history.graph.nodes(data=True):
+            if d['type'] == 'Dataset' and d['data'] is not None:
+                self.assertIsNone(d['data'].underlying_data.get_data())
+
+        loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        storage = loaded.experiment_graph.data_storage
+        self.assertTrue(all(not isinstance(c, pd.Series) for c in storage.column_store.values()))
+
+        materialized = [n for n, d in history.graph.nodes(data=True) if d['mat'] and d['type'] == 'Dataset']
+        for n in materialized:
+            pd.testing.assert_frame_equal(history.retrieve_data(n).get_data(),
+                                          loaded.experiment_graph.retrieve_data(n).get_data())
+        self.assertTrue(all(isinstance(c, pd.Series) for c in storage.column_store.values()))
+        for n, d in history.graph.nodes(data=True):
+            if d['mat'] and d['type'] == 'Agg':
+                self.assertEqual(history.retrieve_data(n).tolist(), loaded.experiment_graph.retrieve_data(n).tolist())
+
+    def test_lazy_save_and_load_simple_storage_manager(self):
+        ee = ExecutionEnvironment(SimpleStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, lazy=True)
+
+        loaded = ExecutionEnvironment(SimpleStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        loaded.load_history_from_disk(self.environment_folder)
+        storage = loaded.experiment_graph.data_storage
+        self.assertTrue(all(isinstance(d, ObjectFile) for d in storage.key_value.values()))
+
+        history = ee.experiment_graph
+        materialized = [n for n, d in history.graph.nodes(data=True) if d['mat'] and d['type'] == 'Dataset']
+        self.assertTrue(materialized)
+        for n in materialized:
+            pd.testing.assert_frame_equal(history.retrieve_data(n).get_data(),
+                                          loaded.experiment_graph.retrieve_data(n).get_data())
+            self.assertNotIsInstance(storage.key_value[n], ObjectFile)
+
+    def test_lazy_save_reuses_payload_files(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        run_workload(ee, ['a', 'b'])
+        ee.save_history(self.environment_folder, lazy=True)
+        payload_folder = self.environment_folder + '/payload'
+        written = {f: os.path.getmtime(os.path.join(payload_folder, f)) for f in os.listdir(payload_folder)}
+
+        run_workload(ee, ['b', 'c'])
+        ee.save_history(self.environment_folder, overwrite=True, lazy=True)
+        for f, modified in written.items():
+            self.assertEqual(modified, os.path.getmtime(os.path.join(payload_folder, f)))
+
+        storage = ee.experiment_graph.data_storage
+        for column_hash in list(storage.column_store):
+            storage.remove_column(column_hash)
+        ee.save_history(self.environment_folder, overwrite=True, lazy=True)
+        self.assertFalse([f for f in os.listdir(payload_folder) if f.endswith('.npy')])
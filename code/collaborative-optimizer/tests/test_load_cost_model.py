@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from experiment_graph.data_storage import DedupedStorageManager
+from experiment_graph.execution_environment import ExecutionEnvironment
+from experiment_graph.load_cost_model import LoadCostModel, dtype_class
+from experiment_graph.optimizations.Reuse import AllMaterializedReuse
+
+
+class TestLoadCostModel(TestCase):
+    def test_dtype_class(self):
+        self.assertEqual('blob', dtype_class(None))
+        self.assertEqual('numeric', dtype_class([np.dtype('float64'), np.dtype('int32')]))
+        self.assertEqual('object', dtype_class([np.dtype('float64'), np.dtype('O')]))
+
+    def test_fit_and_fallback(self):
+        model = LoadCostModel()
+        self.assertIsNone(model.estimate('Dataset', 'numeric', 'memory', 10.0, 2))
+        for size, column_count in [(10.0, 1), (20.0, 2), (40.0, 3), (80.0, 5)]:
+            model.observe('Dataset', 'numeric', 'memory', size, column_count, 1.0 + 0.5 * size + 2.0 * column_count)
+        self.assertAlmostEqual(1.0 + 0.5 * 30.0 + 2.0 * 4, model.estimate('Dataset', 'numeric', 'memory', 30.0, 4))
+        # groups without enough observations fall back to the groups of the same type
+        self.assertAlmostEqual(1.0 + 0.5 * 30.0 + 2.0 * 4, model.estimate('Dataset', 'object', 'memory', 30.0, 4))
+        self.assertAlmostEqual(1.0 + 0.5 * 30.0 + 2.0 * 4, model.estimate('Dataset', 'numeric', 'disk', 30.0, 4))
+        self.assertIsNone(model.estimate('Feature', 'numeric', 'memory', 30.0, 1))
+        self.assertEqual(0.0, model.estimate('Dataset', 'numeric', 'memory', -100.0, 0))
+
+
+class TestLoadCostEstimation(TestCase):
+    def test_probing_stops_after_enough_observations(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+        rs = np.random.RandomState(0)
+        root = ee.load_from_pandas(pd.DataFrame({'c{}'.format(i): rs.rand(20) for i in range(6)}), 'root')
+        features = [root['c{}'.format(i)] for i in range(6)]
+        for feature in features:
+            feature.data()
+        ee.workload_dag.post_process()
+        ee.update_history()
+
+        graph = ee.experiment_graph
+        self.assertEqual(LoadCostModel.MIN_OBSERVATIONS, graph.load_cost_model.groups[('Feature', None, None)][2])
+        for feature in features:
+            self.assertFalse(graph.graph.nodes[feature.id]['mat'])
+            self.assertGreaterEqual(graph.graph.nodes[feature.id]['load_cost'], 0.0)
+            # the vertices with estimated load costs keep their schema as well
+            self.assertEqual(feature.underlying_data.get_column_hash(),
+                             graph.graph.nodes[feature.id]['data'].underlying_data.get_column_hash())
+        self.assertEqual(0, len(graph.data_storage.key_value))
+
+        # a slow load changes the load cost by its share of the observations
+        feature = features[0]
+        graph.materialize(feature.id, feature)
+        tier = graph.data_storage.storage_tier(feature.id)
+        graph.observe_load(feature.id, tier, 1000.0)
+        load_cost = graph.graph.nodes[feature.id]['load_cost']
+        self.assertLess(load_cost, 1000.0)
+        self.assertAlmostEqual(graph.load_cost_model.estimate('Feature', 'numeric', tier,
+                                                              graph.graph.nodes[feature.id]['size'], 1), load_cost)
+
+    def test_model_is_saved_with_the_history(self):
+        environment_folder = os.path.join(tempfile.mkdtemp(), 'history')
+        try:
+            ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+            root = ee.load_from_pandas(pd.DataFrame({'a': np.random.RandomState(0).rand(20)}), 'root')
+            root['a'].data()
+            ee.workload_dag.post_process()
+            ee.update_history()
+            model = ee.experiment_graph.load_cost_model
+            for size in [1.0, 2.0, 4.0]:
+                model.observe('Feature', 'numeric', 'memory', size, 1, size / 10.0)
+            ee.save_history(environment_folder, incremental=True)
+
+            loaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+            loaded.load_history_from_disk(environment_folder)
+            self.assertTrue(loaded.experiment_graph.load_cost_model.can_estimate('Feature'))
+            self.assertAlmostEqual(model.estimate('Feature', 'numeric', 'memory', 3.0, 1),
+                                   loaded.experiment_graph.load_cost_model.estimate('Feature', 'numeric', 'memory',
+                                                                                    3.0, 1))
+
+            # the incremental saves that only append to the change log write the model as well
+            for size in [8.0, 16.0, 32.0]:
+                model.observe('Dataset', 'numeric', 'memory', size, 2, size / 10.0)
+            ee.save_history(environment_folder, incremental=True, compaction_ratio=100.0)
+            reloaded = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME)
+            reloaded.load_history_from_disk(environment_folder)
+            self.assertTrue(reloaded.experiment_graph.load_cost_model.can_estimate('Dataset'))
+        finally:
+            shutil.rmtree(os.path.dirname(environment_folder))
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from experiment_graph.data_storage import DedupedStorageManager
+from experiment_graph.execution_environment import ExecutionEnvironment
+from experiment_graph.model_training import share, attach, SharedArray, ModelTrainingPool
+from experiment_graph.optimizations.Reuse import AllMaterializedReuse
+
+
+class TestModelTraining(TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.pandas_df = pd.DataFrame({'a': rs.rand(50), 'b': rs.randint(0, 10, 50), 'c': ['x', 'y'] * 25,
+                                       'y': rs.randint(0, 2, 50)}, index=np.arange(100, 150))
+
+    def test_share_and_attach(self):
+        arrays = []
+        description = share(self.pandas_df, arrays)
+        # the numeric columns and the index are in shared memory, the string column is pickled
+        self.assertEqual(4, len(arrays))
+        memories = []
+        pd.testing.assert_frame_equal(self.pandas_df, attach(description, memories))
+        self.assertIsInstance(description[1][0][1], SharedArray)
+        pd.testing.assert_series_equal(self.pandas_df['y'], attach(share(self.pandas_df['y'], arrays), memories))
+        for memory in memories:
+            memory.close()
+        for shared_array in arrays:
+            shared_array.release()
+
+    def test_fit_in_training_pool(self):
+        ee = ExecutionEnvironment(DedupedStorageManager(), reuse_type=AllMaterializedReuse.NAME, workers=2,
+                                  training_processes=2)
+        try:
+            root = ee.load_from_pandas(self.pandas_df, 'root')
+            models = [root[['a', 'b']].fit_sk_model_with_labels(LogisticRegression(C=c, random_state=1), root['y'])
+                      for c in [0.1, 1.0]]
+            for model, c in zip(models, [0.1, 1.0]):
+                expected = LogisticRegression(C=c, random_state=1).fit(self.pandas_df[['a', 'b']],
+                                                                       self.pandas_df['y'])
+                fitted = model.data()
+                np.testing.assert_allclose(expected.coef_, fitted.coef_)
+                self.assertEqual(['a', 'b'], list(fitted.feature_names_in_))
+        finally:
+            ee.close()
+        self.assertIsNone(ee.training_pool.executor)
+
+    def test_concurrent_fits_share_one_executor(self):
+        training_pool = ModelTrainingPool(2)
+        x, y = self.pandas_df[['a', 'b']], self.pandas_df['y']
+        c_values = [0.1, 1.0, 10.0, 100.0]
+        try:
+            # the same calls as the threads of a workload dag with workers > 1
+            with mock.patch('experiment_graph.model_training.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as \
+                    executor_class, ThreadPoolExecutor(max_workers=len(c_values)) as threads:
+                futures = [threads.submit(training_pool.fit, LogisticRegression(C=c, random_state=1), x, y)
+                           for c in c_values]
+                fitted = [f.result() for f in futures]
+            self.assertEqual(1, executor_class.call_count)
+            for model, c in zip(fitted, c_values):
+                np.testing.assert_allclose(LogisticRegression(C=c, random_state=1).fit(x, y).coef_, model.coef_)
+        finally:
+            training_pool.shutdown()
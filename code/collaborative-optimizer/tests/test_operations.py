@@ -1,5 +1,6 @@
 from unittest import TestCase
 
+import numpy as np
 import pandas as pd
 
 from execution_environment import ExecutionEnvironment, UserDefinedFunction
@@ -76,3 +77,36 @@ class TestExecutionEnvironment(TestCase):
             {'a': [-10, 18, 0], 'b': [6, 18, 0], 'c': [12, 24, 16], 'd': [16, 24, 8]})
 
         pd.testing.assert_frame_equal(result.data(), expected_result)
+
+
+class TestColumnSharing(TestCase):
+    def setUp(self):
+        self.execution_environment = ExecutionEnvironment()
+        self.pandas_df = pd.DataFrame({'a': np.arange(10.0), 'b': np.arange(10, 20), 'c': np.arange(20.0, 30.0)})
+        self.root = self.execution_environment.load_from_pandas(self.pandas_df, 'root')
+
+    def assert_shares(self, parent, child, column):
+        self.assertTrue(np.shares_memory(parent[column].to_numpy(), child[column].to_numpy()))
+
+    def test_set_columns_and_copy(self):
+        renamed = self.root.set_columns(['x', 'y', 'z']).data()
+        self.assertEqual(['x', 'y', 'z'], list(renamed.columns))
+        self.assertEqual(['a', 'b', 'c'], list(self.root.data().columns))
+        self.assertTrue(np.shares_memory(self.root.data()['a'].to_numpy(), renamed['x'].to_numpy()))
+        self.assert_shares(self.root.data(), self.root.copy().data(), 'b')
+
+    def test_add_columns(self):
+        dataset = self.root
+        for i in range(3):
+            dataset = dataset.add_columns('d{}'.format(i), self.root['a'] * i)
+        result = dataset.data()
+        expected = self.pandas_df.assign(**{'d{}'.format(i): self.pandas_df['a'] * i for i in range(3)})
+        pd.testing.assert_frame_equal(expected, result)
+        self.assert_shares(self.root.data(), result, 'c')
+
+    def test_replace_columns(self):
+        replaced = self.root.replace_columns('b', self.root['a'] + 1).data()
+        pd.testing.assert_frame_equal(self.pandas_df.assign(b=self.pandas_df['a'] + 1), replaced)
+        self.assert_shares(self.root.data(), replaced, 'c')
+        # the dataset itself is not modified
+        pd.testing.assert_frame_equal(self.pandas_df, self.root.data())
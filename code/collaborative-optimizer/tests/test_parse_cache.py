@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from experiment_graph.execution_environment import ExecutionEnvironment
+from experiment_graph.storage_managers.parse_cache import ParseCache
+
+
+class TestParseCache(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'train.csv')
+        rs = np.random.RandomState(0)
+        self.pandas_df = pd.DataFrame({'id': np.arange(10, 30), 'a': rs.rand(20), 'b': rs.randint(0, 5, 20),
+                                       'c': ['x', 'y'] * 10, 'd': pd.date_range('2020-01-01', periods=20)})
+        self.pandas_df.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        parse_cache = ParseCache(os.path.join(self.folder, 'cache'))
+        extra_params = {'index_col': 'id', 'parse_dates': ['d']}
+        self.assertIsNone(parse_cache.get(self.path, extra_params))
+        parsed = pd.read_csv(self.path, **extra_params)
+        parse_cache.put(self.path, extra_params, parsed)
+
+        pd.testing.assert_frame_equal(parsed, parse_cache.get(self.path, extra_params))
+        pd.testing.assert_frame_equal(parsed[['c', 'a']], parse_cache.get(self.path, extra_params, ['c', 'a']))
+        # the parameters of read_csv are part of the key
+        self.assertIsNone(parse_cache.get(self.path, {}))
+
+        # a modified file is parsed again
+        self.pandas_df.head(10).to_csv(self.path, index=False)
+        os.utime(self.path, ns=(0, 0))
+        self.assertIsNone(parse_cache.get(self.path, extra_params))
+
+    def test_load_reads_from_the_cache(self):
+        cache_folder = os.path.join(self.folder, 'cache')
+        root = ExecutionEnvironment(parse_cache_folder=cache_folder).load(self.path)
+        self.assertEqual(1, len([f for f in os.listdir(cache_folder) if f.endswith('.entry.pkl')]))
+
+        # the next environment reads the file from the cache, the columns and their hashes are the same
+        cached_root = ExecutionEnvironment(parse_cache_folder=cache_folder).load(self.path)
+        self.assertEqual(root.get_column_hash(), cached_root.get_column_hash())
+        pd.testing.assert_frame_equal(root.data(), cached_root.data())
+
+        lazy_root = ExecutionEnvironment(lazy_roots=True, parse_cache_folder=cache_folder).load(self.path)
+        pd.testing.assert_frame_equal(self.pandas_df[['b']], lazy_root[['b']].data())